@@ -0,0 +1,116 @@
+"""Benchmark: cold-import time of a sandbox environment's packages.
+
+Compares three ways a fresh environment can get its bytecode:
+
+* ``no pycs``   – the environment has no ``.pyc`` files and cannot write
+                  them (read-only env), so every import compiles in memory;
+* ``pip``       – pip's default, compiling every module at install time;
+* ``shared``    – ``server.sandbox.bytecode.precompile`` linking pycs from
+                  the shared store (warmed by an earlier build).
+
+Packages are copied from the interpreter running the benchmark, so no
+network access is needed. Run from the repository root:
+
+    python benchmarks/cold_import.py                     # pip's own sources
+    python benchmarks/cold_import.py --package pandas --module pandas
+"""
+
+import argparse
+import compileall
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server.sandbox.bytecode import precompile  # noqa: E402
+
+
+def _site(venv: Path) -> Path:
+    return (
+        venv
+        / "lib"
+        / f"python{sys.version_info[0]}.{sys.version_info[1]}"
+        / ("site-packages")
+    )
+
+
+def _copy_package(package: str, venv: Path) -> Path:
+    module = __import__(package)
+    source = Path(module.__file__).parent
+    target = _site(venv) / package
+    shutil.copytree(
+        source, target, ignore=shutil.ignore_patterns("__pycache__", "*.pyc")
+    )
+    return target
+
+
+def _import_seconds(venv: Path, module: str, runs: int) -> float:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(_site(venv)),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    samples = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        )
+        for _ in range(runs)
+    ]
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--package", default="pip", help="top-level package to copy")
+    parser.add_argument(
+        "--module", default="pip._internal.cli.main", help="module to import"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = root / "store"
+        rows = []
+
+        bare = root / "bare"
+        _copy_package(args.package, bare)
+        rows.append(("no pycs", 0.0, _import_seconds(bare, args.module, args.runs)))
+
+        pip_style = root / "pip"
+        pkg = _copy_package(args.package, pip_style)
+        start = time.perf_counter()
+        compileall.compile_dir(pkg, quiet=1, force=True)
+        build = time.perf_counter() - start
+        rows.append(("pip", build, _import_seconds(pip_style, args.module, args.runs)))
+
+        precompile(_copy_package(args.package, root / "warm-up").parents[3], store)
+        shared = root / "shared"
+        _copy_package(args.package, shared)
+        build = precompile(shared, store)["seconds"]
+        rows.append(("shared", build, _import_seconds(shared, args.module, args.runs)))
+
+    print(f"import {args.module} (median of {args.runs} cold processes)")
+    print(f"{'bytecode':<10}{'build s':>10}{'import s':>12}")
+    for name, build_s, import_s in rows:
+        print(f"{name:<10}{build_s:>10.3f}{import_s:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
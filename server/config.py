@@ -1,11 +1,65 @@
 """Centralised configuration for PRIMCS.
 
 Environment variables:
-  • PRIMCS_TMP_DIR    – custom temp directory
-  • PRIMCS_TIMEOUT    – max seconds per run (default 10)
-  • PRIMCS_MAX_OUTPUT – cap on stdout/stderr bytes (default 1 MB)
+  • PRIMCS_TMP_DIR     – custom temp directory
+  • PRIMCS_TIMEOUT     – max seconds per run (default 10)
+  • PRIMCS_MAX_OUTPUT  – cap on stdout/stderr bytes (default 1 MB)
+  • PRIMCS_BLOB_DIR    – shared content-addressed mount store (default TMP_DIR/blobs)
+  • PRIMCS_BLOB_BUDGET – disk budget for unreferenced blobs (default 10 GB)
+  • PRIMCS_EXTRACT_MAX_BYTES – cap on bytes extracted from one archive (default 5 GB)
+  • PRIMCS_EXTRACT_MAX_RATIO – cap on extracted/compressed size ratio (default 100)
+  • PRIMCS_EXTRACT_MAX_FILES – cap on entries extracted from one archive (default 100k)
+  • PRIMCS_LOCAL_ROOTS – os.pathsep-separated server directories that file:// mounts
+                         may read from (default none, i.e. local mounts disabled)
+  • PRIMCS_PYCACHE_DIR – content-addressed store of compiled modules shared by all
+                         sandbox environments (default TMP_DIR/pycache)
+  • PRIMCS_LAYER_DIR – shared, read-only package layers that sandbox environments
+                       are composed of (default TMP_DIR/layers)
+  • PRIMCS_LAYER_MAX_BYTES – cap on one shared environment layer; installed packages
+                             do not count against session quotas (default 20 GB;
+                             0 disables)
+  • PRIMCS_ENV_PROFILES – JSON object naming package sets ("profiles") that get a
+                          shared layer of their own, e.g. {"ml": ["scikit-learn"]}
+                          (default: ml, plotting and geo profiles)
+  • PRIMCS_INFER_REQUIREMENTS – install what the code imports (known packages) and
+                                only the default packages it uses (default on)
+  • PRIMCS_FAST_LANE – run stdlib-only code without requirements on the isolated
+                      base interpreter instead of building a venv (default on)
+  • PRIMCS_IMPORT_MAP – JSON file mapping import names to distributions, merged
+                        over the built-in table (default none)
+  • PRIMCS_ARTIFACT_HASH – record a SHA-256 for each artifact (default off)
+  • PRIMCS_UPLOAD_CONCURRENCY – parallel parts per multipart upload (default 4)
+  • PRIMCS_UPLOAD_RETRIES – retries per failed upload part (default 3)
+  • PRIMCS_UPLOAD_MAX_BYTES – cap on one upload to PUT /mounts/<path> (default 5 GB)
+  • PRIMCS_UPLOAD_TOKEN – bearer token required by PUT /mounts/<path> (default none,
+                          i.e. the mcp-session-id header alone authorises uploads)
+  • PRIMCS_METADATA_DB – SQLite database of session metadata (default
+                         TMP_DIR/metadata.db)
+  • PRIMCS_SESSION_TTL – seconds a session may sit idle before its workspace is
+                         deleted (default 6 h; 0 disables)
+  • PRIMCS_HIBERNATE_AFTER – seconds a session may sit idle before it is archived
+                             to disk and restored on next use (default 30 min;
+                             0 disables)
+  • PRIMCS_DISK_HIGH_WATER – fraction of the TMP_DIR filesystem in use above which
+                             idle workspaces are evicted, least recently used
+                             first (default 0.9)
+  • PRIMCS_GC_INTERVAL – seconds between session sweeps (default 60)
+  • PRIMCS_MOUNT_STATUS_TTL – seconds mount_status keeps reporting a finished
+                              background mount (default 1 h)
+  • PRIMCS_QUOTA_BYTES – disk quota per session workspace (default 5 GB; 0 disables)
+  • PRIMCS_QUOTA_INODES – files and directories per session workspace (default
+                          250k; 0 disables)
+  • PRIMCS_EPHEMERAL_DIR – RAM-backed directory for stateless run workspaces
+                           (default /dev/shm/primcs; empty keeps them in TMP_DIR)
+  • PRIMCS_EPHEMERAL_MAX_BYTES – cap on one stateless workspace in RAM; runs go to
+                                 TMP_DIR while less is free (default 2 GB)
+  • PRIMCS_QUOTA_SAMPLE_INTERVAL – seconds between workspace usage samples while
+                                   code or pip runs (default 1)
+  • PRIMCS_ARTIFACT_POLL_INTERVAL – seconds between output/ scans when inotify is
+                                    unavailable (default 0.5)
 """
 
+import json
 import os
 from pathlib import Path
 
@@ -14,3 +68,70 @@ TMP_DIR.mkdir(parents=True, exist_ok=True)
 
 TIMEOUT_SECONDS = int(os.getenv("PRIMCS_TIMEOUT", "100"))
 MAX_OUTPUT_BYTES = int(os.getenv("PRIMCS_MAX_OUTPUT", str(1024 * 1024)))  # 1MB
+
+BLOB_DIR = Path(os.getenv("PRIMCS_BLOB_DIR", str(TMP_DIR / "blobs")))
+BLOB_BUDGET_BYTES = int(
+    os.getenv("PRIMCS_BLOB_BUDGET", str(10 * 1024 * 1024 * 1024))
+)  # 10GB
+
+PYCACHE_DIR = Path(os.getenv("PRIMCS_PYCACHE_DIR", str(TMP_DIR / "pycache")))
+
+LAYER_DIR = Path(os.getenv("PRIMCS_LAYER_DIR", str(TMP_DIR / "layers")))
+LAYER_MAX_BYTES = int(
+    os.getenv("PRIMCS_LAYER_MAX_BYTES", str(20 * 1024 * 1024 * 1024))
+)  # 20GB
+ENV_PROFILES: dict[str, list[str]] = json.loads(
+    os.getenv("PRIMCS_ENV_PROFILES", "")
+    or json.dumps(
+        {
+            "ml": ["scikit-learn", "scipy"],
+            "plotting": ["matplotlib", "seaborn"],
+            "geo": ["shapely", "pyproj"],
+        }
+    )
+)
+
+EXTRACT_MAX_BYTES = int(
+    os.getenv("PRIMCS_EXTRACT_MAX_BYTES", str(5 * 1024 * 1024 * 1024))
+)  # 5GB
+EXTRACT_MAX_RATIO = float(os.getenv("PRIMCS_EXTRACT_MAX_RATIO", "100"))
+EXTRACT_MAX_FILES = int(os.getenv("PRIMCS_EXTRACT_MAX_FILES", "100000"))
+
+LOCAL_MOUNT_ROOTS = [
+    Path(p) for p in os.getenv("PRIMCS_LOCAL_ROOTS", "").split(os.pathsep) if p
+]
+
+INFER_REQUIREMENTS = os.getenv("PRIMCS_INFER_REQUIREMENTS", "1").lower() in {
+    "1",
+    "true",
+    "yes",
+}
+IMPORT_MAP_FILE = os.getenv("PRIMCS_IMPORT_MAP", "")
+FAST_LANE = os.getenv("PRIMCS_FAST_LANE", "1").lower() in {"1", "true", "yes"}
+
+ARTIFACT_HASH = os.getenv("PRIMCS_ARTIFACT_HASH", "").lower() in {"1", "true", "yes"}
+ARTIFACT_POLL_INTERVAL = float(os.getenv("PRIMCS_ARTIFACT_POLL_INTERVAL", "0.5"))
+
+UPLOAD_CONCURRENCY = int(os.getenv("PRIMCS_UPLOAD_CONCURRENCY", "4"))
+UPLOAD_RETRIES = int(os.getenv("PRIMCS_UPLOAD_RETRIES", "3"))
+UPLOAD_MAX_BYTES = int(
+    os.getenv("PRIMCS_UPLOAD_MAX_BYTES", str(5 * 1024 * 1024 * 1024))
+)  # 5GB
+UPLOAD_TOKEN = os.getenv("PRIMCS_UPLOAD_TOKEN", "")
+
+METADATA_DB = Path(os.getenv("PRIMCS_METADATA_DB", str(TMP_DIR / "metadata.db")))
+SESSION_TTL = float(os.getenv("PRIMCS_SESSION_TTL", str(6 * 3600)))  # 6h
+HIBERNATE_AFTER = float(os.getenv("PRIMCS_HIBERNATE_AFTER", str(30 * 60)))  # 30min
+DISK_HIGH_WATER = float(os.getenv("PRIMCS_DISK_HIGH_WATER", "0.9"))
+GC_INTERVAL = float(os.getenv("PRIMCS_GC_INTERVAL", "60"))
+MOUNT_STATUS_TTL = float(os.getenv("PRIMCS_MOUNT_STATUS_TTL", str(3600)))  # 1h
+
+QUOTA_BYTES = int(os.getenv("PRIMCS_QUOTA_BYTES", str(5 * 1024 * 1024 * 1024)))  # 5GB
+QUOTA_INODES = int(os.getenv("PRIMCS_QUOTA_INODES", "250000"))
+QUOTA_SAMPLE_INTERVAL = float(os.getenv("PRIMCS_QUOTA_SAMPLE_INTERVAL", "1"))
+
+_ephemeral_dir = os.getenv("PRIMCS_EPHEMERAL_DIR", "/dev/shm/primcs")
+EPHEMERAL_DIR = Path(_ephemeral_dir) if _ephemeral_dir else None
+EPHEMERAL_MAX_BYTES = int(
+    os.getenv("PRIMCS_EPHEMERAL_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+)  # 2GB
@@ -0,0 +1,85 @@
+"""Process-wide metrics, exposed in the Prometheus text format at /metrics."""
+
+import bisect
+import threading
+
+__all__ = [
+    "HIBERNATIONS",
+    "RESTORE_SECONDS",
+    "Counter",
+    "Histogram",
+    "render",
+]
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self.value = 0.0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> str:
+        return (
+            f"# HELP {self.name} {self.help}\n"
+            f"# TYPE {self.name} counter\n"
+            f"{self.name} {self.value:g}\n"
+        )
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper *buckets*."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts, strict=True):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:g}")
+        lines.append(f"{self.name}_count {self.count}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: list[Counter | Histogram] = []
+
+
+def render() -> str:
+    """Return every registered metric in the Prometheus exposition format."""
+    return "".join(metric.render() for metric in _registry)
+
+
+HIBERNATIONS = Counter(
+    "primcs_hibernations_total", "Idle session workspaces archived to disk."
+)
+RESTORE_SECONDS = Histogram(
+    "primcs_restore_seconds",
+    "Time to restore a hibernated session workspace.",
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
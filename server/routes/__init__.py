@@ -0,0 +1,7 @@
+# register is called from server.main, so import here is enough
+from . import (
+    artifacts,  # noqa: F401
+    export,  # noqa: F401
+    metrics,  # noqa: F401
+    upload,  # noqa: F401
+)
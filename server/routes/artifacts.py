@@ -0,0 +1,193 @@
+"""HTTP route: download session artifacts from output/.
+
+Responses carry a strong ``ETag`` and ``Last-Modified``, answer matching
+``If-None-Match`` / ``If-Modified-Since`` requests with ``304``, honour
+``Range`` (resumable and partial reads) and compress text-like files with
+zstd or gzip on the fly. Bodies are streamed from disk in chunks.
+"""
+
+import asyncio
+import mimetypes
+import os
+import zlib
+from collections.abc import AsyncIterator
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from server.config import TMP_DIR
+from server.sandbox import sessions
+
+_CHUNK_BYTES = 256 * 1024
+# Below this size compression saves less than the headers cost.
+_MIN_COMPRESS_BYTES = 1024
+_COMPRESSIBLE = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/x-yaml",
+    "application/sql",
+    "image/svg+xml",
+}
+
+
+def _resolve(request: Request) -> Path | Response:
+    """Map the request to a file in the session's output/, or an error."""
+    relative_path: str = os.path.normpath(request.path_params["relative_path"])
+    if relative_path.startswith("..") or Path(relative_path).is_absolute():
+        return Response("Invalid artifact path", status_code=400)
+
+    session_id = request.headers.get("mcp-session-id")
+    if not session_id:
+        return Response("Missing mcp-session-id header", status_code=400)
+    if not sessions.valid_id(session_id):
+        return Response("Invalid mcp-session-id header", status_code=400)
+
+    sessions.touch(TMP_DIR / f"session_{session_id}")
+    base_dir = TMP_DIR / f"session_{session_id}" / "output"
+    try:
+        file_path = (base_dir / relative_path).resolve(strict=True)
+    except FileNotFoundError:
+        return Response("File not found", status_code=404)
+
+    # Ensure file is within the output directory
+    if not file_path.is_relative_to(base_dir.resolve()):
+        return Response("Forbidden", status_code=403)
+    if not file_path.is_file():
+        return Response("Not a file", status_code=404)
+    return file_path
+
+
+def _etag(st: os.stat_result, encoding: str | None = None) -> str:
+    # Strong validator: a different size or mtime means different bytes. Each
+    # content-coding is a different representation, so it gets its own tag.
+    tag = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _not_modified(request: Request, etags: set[str], st: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+        candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in candidates or bool(candidates & etags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(st.st_mtime) <= since
+    return False
+
+
+def _choose_encoding(request: Request, mime: str, size: int) -> str | None:
+    """Pick zstd or gzip if the client accepts it and the type compresses."""
+    if size < _MIN_COMPRESS_BYTES or "range" in request.headers:
+        return None
+    if not (mime.startswith("text/") or mime in _COMPRESSIBLE):
+        return None
+    accepted: dict[str, float] = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    if accepted.get("zstd", 0) > 0 and _compressor("zstd") is not None:
+        return "zstd"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding: str) -> Any:
+    """Return a streaming compressor (``compress``/``flush``) or None."""
+    if encoding == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip framing
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+async def _compressed_chunks(path: Path, encoding: str) -> AsyncIterator[bytes]:
+    compressor = _compressor(encoding)
+    with path.open("rb") as fh:
+        while chunk := await asyncio.to_thread(fh.read, _CHUNK_BYTES):
+            if out := compressor.compress(chunk):
+                yield out
+    yield compressor.flush()
+
+
+def _content_disposition(name: str) -> str:
+    quoted = quote(name)
+    if quoted != name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{name}"'
+
+
+async def get_artifact(request: Request) -> Response:
+    """
+    Serve an artifact file for the current session. The client must include
+    the session ID in the "mcp-session-id" header. The URL path is the
+    relative path returned by the tool (e.g. "plots/plot.png"), which is
+    resolved under session_<id>/output/.
+    """
+    session_id = request.headers.get("mcp-session-id")
+    if session_id and sessions.valid_id(session_id):
+        await sessions.ensure_ready(TMP_DIR / f"session_{session_id}")
+    resolved = _resolve(request)
+    if isinstance(resolved, Response):
+        return resolved
+    file_path = resolved
+    st = file_path.stat()
+    mime = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+    encoding = _choose_encoding(request, mime, st.st_size)
+
+    headers = {
+        "ETag": _etag(st, encoding),
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",  # always revalidate; artifacts change
+    }
+    if mime.startswith("text/") or mime in _COMPRESSIBLE:
+        headers["Vary"] = "Accept-Encoding"
+
+    if _not_modified(request, {_etag(st), _etag(st, encoding)}, st):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is None:
+        # FileResponse streams the file and handles Range / If-Range.
+        return FileResponse(
+            str(file_path),
+            filename=file_path.name,
+            media_type=mime,
+            headers=headers,
+            stat_result=st,
+        )
+
+    headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = _content_disposition(file_path.name)
+    if request.method == "HEAD":
+        return Response(status_code=200, headers=headers, media_type=mime)
+    return StreamingResponse(
+        _compressed_chunks(file_path, encoding), headers=headers, media_type=mime
+    )
+
+
+def register(mcp: FastMCP) -> None:
+    """Register the /artifacts route."""
+    mcp.custom_route("/artifacts/{relative_path:path}", methods=["GET", "HEAD"])(
+        get_artifact
+    )
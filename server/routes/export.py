@@ -0,0 +1,61 @@
+"""HTTP route: stream a zip or tar(.gz/.zst) of part of a session workspace.
+
+``GET /export?path=output/plots&format=zip&glob=*.png&since=2024-01-01T00:00``
+with the ``mcp-session-id`` header. Every query parameter is optional; by
+default the whole ``output/`` directory is exported as a zip.
+"""
+
+from urllib.parse import quote
+
+from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from server.config import TMP_DIR
+from server.sandbox import sessions
+from server.sandbox.export import (
+    FORMATS,
+    MEDIA_TYPES,
+    parse_since,
+    resolve_subtree,
+    select_files,
+    stream_archive,
+)
+
+
+async def export_workspace(request: Request) -> Response:
+    """Stream an archive of the requested workspace subtree."""
+    session_id = request.headers.get("mcp-session-id")
+    if not session_id:
+        return Response("Missing mcp-session-id header", status_code=400)
+    if not sessions.valid_id(session_id):
+        return Response("Invalid mcp-session-id header", status_code=400)
+    root = TMP_DIR / f"session_{session_id}"
+    if root.resolve().parent != TMP_DIR.resolve():
+        return Response("Invalid mcp-session-id header", status_code=400)
+    await sessions.ensure_ready(root)
+    sessions.touch(root)
+
+    params = request.query_params
+    fmt = params.get("format", "zip")
+    if fmt not in FORMATS:
+        return Response(f"format must be one of {sorted(FORMATS)}", status_code=400)
+    try:
+        base = resolve_subtree(root, params.get("path", "output"))
+        since = parse_since(params.get("since"))
+    except ValueError as exc:
+        return Response(str(exc), status_code=400)
+    except FileNotFoundError as exc:
+        return Response(str(exc), status_code=404)
+
+    name = f"{base.name}.{fmt}"
+    return StreamingResponse(
+        stream_archive(select_files(base, params.get("glob"), since), fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(name)}"},
+    )
+
+
+def register(mcp: FastMCP) -> None:
+    """Register the /export route."""
+    mcp.custom_route("/export", methods=["GET"])(export_workspace)
@@ -0,0 +1,18 @@
+"""HTTP route: expose server metrics for Prometheus at /metrics."""
+
+from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from server import metrics
+
+
+async def get_metrics(_request: Request) -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def register(mcp: FastMCP) -> None:
+    """Register the /metrics route."""
+    mcp.custom_route("/metrics", methods=["GET"])(get_metrics)
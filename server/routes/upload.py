@@ -0,0 +1,179 @@
+"""HTTP route: stream a file from the client into a session's mounts/.
+
+``PUT /mounts/<path>`` with the ``mcp-session-id`` header writes the raw
+request body to ``mounts/<path>`` in that session's workspace, where
+``run_code`` sees it like any downloaded mount. The body is written to a
+temporary file in the target directory as it arrives and renamed into place
+once complete, so readers never see a partial file and memory use does not
+depend on the upload size.
+
+Optional request headers:
+  • ``Authorization: Bearer <token>`` – required when PRIMCS_UPLOAD_TOKEN is set
+  • ``Content-Digest: sha-256=:<base64>:`` or ``X-Checksum-Sha256: <hex>`` –
+    the upload is rejected (and discarded) unless the body matches
+"""
+
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
+import hmac
+import os
+import re
+import uuid
+from pathlib import Path
+
+from fastmcp import FastMCP
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, Response
+
+from server.config import TMP_DIR, UPLOAD_MAX_BYTES, UPLOAD_TOKEN
+from server.sandbox import metadata, quota, sessions
+
+# Request chunks are small; batch them so each disk write is worth a thread hop.
+_WRITE_BYTES = 1024 * 1024
+_CONTENT_DIGEST = re.compile(r"sha-256=:([A-Za-z0-9+/=]+):")
+
+
+class _Rejected(Exception):
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _authorised(request: Request) -> bool:
+    if not UPLOAD_TOKEN:
+        return True
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode(), UPLOAD_TOKEN.encode()
+    )
+
+
+def _expected_digest(request: Request) -> bytes | None:
+    """Return the SHA-256 the client announced for the body, if any."""
+    if header := request.headers.get("content-digest"):
+        match = _CONTENT_DIGEST.search(header)
+        if match is None:
+            raise _Rejected("Content-Digest must include sha-256", 400)
+        try:
+            return base64.b64decode(match.group(1), validate=True)
+        except binascii.Error:
+            raise _Rejected("Malformed Content-Digest", 400) from None
+    if header := request.headers.get("x-checksum-sha256"):
+        try:
+            return bytes.fromhex(header.strip())
+        except ValueError:
+            raise _Rejected("Malformed X-Checksum-Sha256", 400) from None
+    return None
+
+
+def _target(request: Request, workspace: Path) -> Path:
+    relative = Path(request.path_params["relative_path"])
+    if relative.is_absolute() or ".." in relative.parts or not relative.parts:
+        raise _Rejected("Invalid mount path", 400)
+
+    mounts_dir = workspace / "mounts"
+    target = mounts_dir / relative
+    if target.is_dir():
+        raise _Rejected("Mount path is a directory", 409)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # A symlinked parent (e.g. a local directory mount) must not redirect
+    # the write outside the workspace.
+    if not target.parent.resolve().is_relative_to(mounts_dir.resolve()):
+        raise _Rejected("Mount path escapes mounts/", 403)
+    return target
+
+
+async def _receive(request: Request, tmp: Path) -> tuple[int, bytes]:
+    """Stream the body into *tmp*; return its size and SHA-256."""
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    with tmp.open("wb") as fh:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise _Rejected(
+                    f"Upload exceeds size limit ({UPLOAD_MAX_BYTES} bytes)", 413
+                )
+            digest.update(chunk)
+            buffer += chunk
+            if len(buffer) >= _WRITE_BYTES:
+                await asyncio.to_thread(fh.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(fh.write, bytes(buffer))
+        await asyncio.to_thread(os.fsync, fh.fileno())
+    return size, digest.digest()
+
+
+async def upload_mount(request: Request) -> Response:
+    """Write the request body to ``mounts/<relative_path>`` atomically."""
+    if not _authorised(request):
+        return Response(
+            "Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"}
+        )
+    session_id = request.headers.get("mcp-session-id")
+    if not session_id:
+        return Response("Missing mcp-session-id header", status_code=400)
+    if not sessions.valid_id(session_id):
+        return Response("Invalid mcp-session-id header", status_code=400)
+
+    workspace = TMP_DIR / f"session_{session_id}"
+    # Keep the session from being hibernated or evicted mid-upload.
+    async with sessions.in_use(workspace):
+        await sessions.ensure_ready(workspace)
+        return await _upload(request, workspace)
+
+
+async def _upload(request: Request, workspace: Path) -> Response:
+    try:
+        target = _target(request, workspace)
+        expected = _expected_digest(request)
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > UPLOAD_MAX_BYTES:
+            raise _Rejected(
+                f"Upload exceeds size limit ({UPLOAD_MAX_BYTES} bytes)", 413
+            )
+        quota.check(workspace, int(declared) if declared and declared.isdigit() else 0)
+    except _Rejected as exc:
+        return Response(str(exc), status_code=exc.status_code)
+    except quota.QuotaExceededError as exc:
+        return Response(str(exc), status_code=507)
+
+    # Same directory as the target, so the final rename stays on one filesystem.
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.part")
+    try:
+        size, sha256 = await _receive(request, tmp)
+        if expected is not None and not hmac.compare_digest(sha256, expected):
+            raise _Rejected("Checksum mismatch; upload discarded", 422)
+        tmp.chmod(0o444)
+        tmp.replace(target)
+    except _Rejected as exc:
+        return Response(str(exc), status_code=exc.status_code)
+    except ClientDisconnect:
+        return Response("Client disconnected", status_code=400)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            tmp.unlink()
+
+    relative = Path(request.path_params["relative_path"]).as_posix()
+    metadata.default_store().record_mount(
+        workspace.name, relative, "upload", size, sha256.hex()
+    )
+    sessions.measure(workspace)
+    return JSONResponse(
+        {
+            "mounted_as": f"mounts/{relative}",
+            "bytes": size,
+            "sha256": sha256.hex(),
+        },
+        status_code=201,
+    )
+
+
+def register(mcp: FastMCP) -> None:
+    """Register the PUT /mounts/<path> upload route."""
+    mcp.custom_route("/mounts/{relative_path:path}", methods=["PUT"])(upload_mount)
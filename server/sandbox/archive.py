@@ -0,0 +1,195 @@
+"""Safe extraction of archive mounts (.zip, .tar[.gz|.bz2|.xz|.zst])."""
+
+import os
+import shutil
+import stat
+import tarfile
+import uuid
+import zipfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import IO, Literal, TypedDict
+
+from server.config import (
+    EXTRACT_MAX_BYTES,
+    EXTRACT_MAX_FILES,
+    EXTRACT_MAX_RATIO,
+)
+
+__all__ = ["FORMATS", "ExtractInfo", "detect_format", "extract_archive"]
+
+_CHUNK_BYTES = 1024 * 1024
+
+_SUFFIXES: list[tuple[str, str]] = [
+    (".tar.gz", "tar.gz"),
+    (".tgz", "tar.gz"),
+    (".tar.bz2", "tar.bz2"),
+    (".tar.xz", "tar.xz"),
+    (".tar.zst", "tar.zst"),
+    (".tzst", "tar.zst"),
+    (".tar", "tar"),
+    (".zip", "zip"),
+]
+FORMATS = {fmt for _, fmt in _SUFFIXES}
+_TAR_MODES: dict[str, Literal["r|", "r|gz", "r|bz2", "r|xz"]] = {
+    "tar": "r|",
+    "tar.gz": "r|gz",
+    "tar.bz2": "r|bz2",
+    "tar.xz": "r|xz",
+}
+
+
+class ExtractInfo(TypedDict):
+    files: int
+    bytes: int
+
+
+def detect_format(name: str) -> str | None:
+    """Guess the archive format from a file name or URL path."""
+    lowered = name.lower().split("?", 1)[0]
+    for suffix, fmt in _SUFFIXES:
+        if lowered.endswith(suffix):
+            return fmt
+    return None
+
+
+def _safe_member_path(name: str) -> PurePosixPath:
+    path = PurePosixPath(name.replace("\\", "/"))
+    if (
+        path.is_absolute()
+        or ".." in path.parts
+        or (path.parts and ":" in path.parts[0])
+    ):
+        raise ValueError(f"Unsafe path in archive: {name!r}")
+    return path
+
+
+class _Budget:
+    """Enforce size, ratio and member-count caps against decompression bombs."""
+
+    def __init__(self, compressed_size: int, max_bytes: int, max_ratio: float) -> None:
+        self.limit = min(max_bytes, int(max(compressed_size, 1) * max_ratio))
+        self.written = 0
+        self.files = 0
+
+    def add_file(self) -> None:
+        self.files += 1
+        if self.files > EXTRACT_MAX_FILES:
+            raise ValueError(f"Archive has more than {EXTRACT_MAX_FILES} entries")
+
+    def consume(self, n: int) -> None:
+        self.written += n
+        if self.written > self.limit:
+            raise ValueError(
+                f"Archive expands beyond the extraction limit ({self.limit} bytes)"
+            )
+
+
+def _copy_member(src: IO[bytes], target: Path, budget: _Budget) -> None:
+    # Count the bytes actually produced; header sizes can lie.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        # Which copy should win differs between formats, and the first one
+        # is already read-only.
+        raise ValueError(f"Duplicate path in archive: {target.name!r}")
+    with target.open("wb") as out:
+        while chunk := src.read(_CHUNK_BYTES):
+            budget.consume(len(chunk))
+            out.write(chunk)
+    target.chmod(0o444)
+
+
+@contextmanager
+def _open_tar(src: IO[bytes], fmt: str) -> Iterator[tarfile.TarFile]:
+    if fmt == "tar.zst":
+        try:
+            import zstandard
+        except ImportError as exc:  # pragma: no cover - depends on environment
+            raise RuntimeError(
+                "Extracting .tar.zst requires the 'zstandard' package"
+            ) from exc
+        reader = zstandard.ZstdDecompressor().stream_reader(src, closefd=False)
+        with tarfile.open(fileobj=reader, mode="r|") as tf:
+            yield tf
+        return
+    # Stream mode reads members sequentially without seeking or buffering.
+    with tarfile.open(fileobj=src, mode=_TAR_MODES[fmt]) as tf:
+        yield tf
+
+
+def _extract_tar(src: IO[bytes], dest: Path, fmt: str, budget: _Budget) -> None:
+    with _open_tar(src, fmt) as tf:
+        for member in tf:
+            rel = _safe_member_path(member.name)
+            if member.isdir():
+                (dest / rel).mkdir(parents=True, exist_ok=True)
+                continue
+            if not member.isfile():
+                raise ValueError(
+                    f"Unsupported archive entry (links/devices): {member.name!r}"
+                )
+            budget.add_file()
+            fh = tf.extractfile(member)
+            assert fh is not None
+            _copy_member(fh, dest / rel, budget)
+
+
+def _extract_zip(src: IO[bytes], dest: Path, budget: _Budget) -> None:
+    with zipfile.ZipFile(src) as zf:
+        for info in zf.infolist():
+            rel = _safe_member_path(info.filename)
+            if info.is_dir():
+                (dest / rel).mkdir(parents=True, exist_ok=True)
+                continue
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise ValueError(
+                    f"Unsupported archive entry (symlink): {info.filename!r}"
+                )
+            budget.add_file()
+            with zf.open(info) as fh:
+                _copy_member(fh, dest / rel, budget)
+
+
+def extract_archive(
+    src: IO[bytes],
+    dest: Path,
+    fmt: str,
+    max_bytes: int = EXTRACT_MAX_BYTES,
+    max_ratio: float = EXTRACT_MAX_RATIO,
+) -> ExtractInfo:
+    """Extract the archive open as *src* (format *fmt*) into directory *dest*.
+
+    Members are decompressed as a stream straight into *dest*, rejecting
+    absolute paths, ``..`` components, duplicate names, links and device
+    files. Extraction aborts once the output exceeds *max_bytes* or
+    *max_ratio* times the archive size. *dest* is replaced atomically, so a
+    failed extraction leaves any previous contents untouched. This is
+    blocking; run it in a worker thread.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported archive format: {fmt}")
+
+    budget = _Budget(os.fstat(src.fileno()).st_size, max_bytes, max_ratio)
+    staging = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.extract")
+    staging.mkdir(parents=True)
+    try:
+        if fmt == "zip":
+            _extract_zip(src, staging, budget)
+        else:
+            _extract_tar(src, staging, fmt, budget)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if dest.exists() or dest.is_symlink():
+        old = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.old")
+        dest.replace(old)
+        staging.replace(dest)
+        if old.is_dir() and not old.is_symlink():
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            old.unlink(missing_ok=True)
+    else:
+        staging.replace(dest)
+    return {"files": budget.files, "bytes": budget.written}
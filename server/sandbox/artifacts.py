@@ -0,0 +1,154 @@
+"""Persistent per-workspace index of artifacts under ``output/``."""
+
+import hashlib
+import mimetypes
+import os
+import stat
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NotRequired, TypedDict
+
+from server.config import ARTIFACT_HASH
+from server.sandbox.metadata import ArtifactRow, MetadataStore, default_store
+
+__all__ = ["ArtifactChanges", "ArtifactIndex", "ArtifactMeta", "walk_files"]
+
+_CHUNK_BYTES = 1024 * 1024
+
+
+class ArtifactMeta(TypedDict):
+    name: str
+    relative_path: str
+    size: int
+    mime: str
+    sha256: NotRequired[str]  # only with PRIMCS_ARTIFACT_HASH enabled
+
+
+class ArtifactChanges(TypedDict):
+    created: list[ArtifactMeta]
+    modified: list[ArtifactMeta]
+    deleted: list[str]  # relative paths
+
+
+def walk_files(root: Path, prefix: str = "") -> Iterator[tuple[str, os.stat_result]]:
+    """Yield ``(relative posix path, stat)`` for every file below *root*."""
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        rel = f"{prefix}{entry.name}"
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(Path(entry.path), f"{rel}/")
+            elif entry.is_file():
+                yield rel, entry.stat()
+        except FileNotFoundError:
+            continue  # removed while walking
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        while chunk := fh.read(_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactIndex:
+    """Track files in a workspace's ``output/`` directory between runs.
+
+    The index (size, mtime and MIME type per file, plus a SHA-256 when
+    ``PRIMCS_ARTIFACT_HASH`` is set) is kept in the metadata store.
+    :meth:`refresh` compares the directory against it and reports only what
+    changed, so MIME guessing and hashing happen once per new file version
+    and results stay small in long sessions.
+    """
+
+    def __init__(
+        self,
+        workspace: Path,
+        hash_files: bool = ARTIFACT_HASH,
+        store: MetadataStore | None = None,
+    ) -> None:
+        self.output_dir = workspace / "output"
+        self._name = workspace.name
+        self._hash = hash_files
+        self._store = store or default_store()
+        entries = self._store.artifacts(self._name)
+        # A new index has no baseline, so callers must scan the whole directory.
+        self.is_new = entries is None
+        self._entries: dict[str, ArtifactRow] = entries or {}
+
+    def _meta(self, rel: str) -> ArtifactMeta:
+        entry = self._entries[rel]
+        meta: ArtifactMeta = {
+            "name": rel.rsplit("/", 1)[-1],
+            "relative_path": rel,
+            "size": entry["size"],
+            "mime": entry["mime"],
+        }
+        if "sha256" in entry:
+            meta["sha256"] = entry["sha256"]
+        return meta
+
+    def _record(self, rel: str, st: os.stat_result) -> bool:
+        """Store the state of *rel*; return False if it is unchanged."""
+        old = self._entries.get(rel)
+        if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+            return False
+        mime, _ = mimetypes.guess_type(rel)
+        entry: ArtifactRow = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "mime": mime or "application/octet-stream",
+        }
+        if self._hash:
+            try:
+                entry["sha256"] = _sha256(self.output_dir / rel)
+            except FileNotFoundError:
+                pass
+        self._entries[rel] = entry
+        return True
+
+    def refresh(self, paths: Iterable[str] | None = None) -> ArtifactChanges:
+        """Bring the index up to date and return what changed since last time.
+
+        With *paths* (relative to ``output/``) only those files are checked;
+        otherwise the whole directory is scanned.
+        """
+        changes: ArtifactChanges = {"created": [], "modified": [], "deleted": []}
+        if paths is None:
+            seen = dict(walk_files(self.output_dir))
+            gone = [rel for rel in self._entries if rel not in seen]
+        else:
+            seen, gone = {}, []
+            for rel in dict.fromkeys(paths):
+                try:
+                    st = (self.output_dir / rel).stat()
+                except (FileNotFoundError, NotADirectoryError):
+                    if rel in self._entries:
+                        gone.append(rel)
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    seen[rel] = st
+
+        for rel in gone:
+            del self._entries[rel]
+            changes["deleted"].append(rel)
+        changed: dict[str, ArtifactRow] = {}
+        for rel, st in seen.items():
+            existed = rel in self._entries
+            if self._record(rel, st):
+                changed[rel] = self._entries[rel]
+                bucket = changes["modified"] if existed else changes["created"]
+                bucket.append(self._meta(rel))
+
+        if changed or gone or self.is_new:
+            self._store.update_artifacts(self._name, changed, gone)
+            self.is_new = False
+        return changes
+
+    def listing(self) -> list[ArtifactMeta]:
+        """Return every indexed artifact, sorted by path."""
+        return [self._meta(rel) for rel in sorted(self._entries)]
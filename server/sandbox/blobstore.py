@@ -0,0 +1,206 @@
+"""Content-addressed store for mounted files shared across sessions.
+
+Every downloaded body is stored once under ``objects/<sha256[:2]>/<sha256>``
+and a URL → digest index remembers where each URL's content lives. Session
+mounts are read-only hardlinks (or reflinks) to the blob, so a dataset that
+is mounted by hundreds of sessions occupies disk and page cache only once.
+
+A blob is *referenced* while at least one hardlink to it exists outside the
+store (``st_nlink > 1``). Unreferenced blobs are evicted least-recently-used
+first once the store grows beyond its byte budget.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Required, TypedDict
+
+from server.config import BLOB_BUDGET_BYTES, BLOB_DIR
+from server.sandbox.materialize import link_file
+from server.sandbox.tabular import TabularInfo
+
+__all__ = ["BlobStore", "UrlEntry", "default_store"]
+
+
+class UrlEntry(TypedDict, total=False):
+    sha256: Required[str]
+    size: Required[int]
+    # HTTP cache metadata recorded by the downloader.
+    fetched_at: float
+    etag: str
+    last_modified: str
+    max_age: float  # seconds the response stays fresh after fetched_at
+    no_cache: bool  # must revalidate before every reuse
+    table: TabularInfo  # sidecar entries: shape of the converted table
+
+
+class _BlobEntry(TypedDict):
+    size: int
+    last_used: float
+
+
+class BlobStore:
+    """Content-addressed blob store with a persistent URL index."""
+
+    def __init__(self, root: Path, budget_bytes: int = BLOB_BUDGET_BYTES) -> None:
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self._objects = root / "objects"
+        self._incoming = root / "incoming"
+        self._index_path = root / "index.json"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._incoming.mkdir(parents=True, exist_ok=True)
+        self._urls: dict[str, UrlEntry] = {}
+        self._blobs: dict[str, _BlobEntry] = {}
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Index persistence
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return
+        self._urls = data.get("urls", {})
+        self._blobs = data.get("blobs", {})
+
+    def _save(self) -> None:
+        payload = json.dumps({"urls": self._urls, "blobs": self._blobs})
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(payload)
+        tmp.replace(self._index_path)
+
+    # ------------------------------------------------------------------
+    # Lookup / ingest
+    # ------------------------------------------------------------------
+    def blob_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / digest
+
+    def lookup(self, url: str) -> UrlEntry | None:
+        """Return the index entry for *url* if its blob is still present."""
+        entry = self._urls.get(url)
+        if entry is None:
+            return None
+        if not self.blob_path(entry["sha256"]).is_file():
+            del self._urls[url]
+            self._blobs.pop(entry["sha256"], None)
+            self._save()
+            return None
+        return entry
+
+    def temp_path(self) -> Path:
+        """Return a fresh path inside the store for an in-progress download."""
+        fd, name = tempfile.mkstemp(dir=self._incoming, prefix="dl_")
+        os.close(fd)
+        return Path(name)
+
+    def add(
+        self,
+        tmp: Path,
+        digest: str,
+        url: str | None = None,
+        meta: dict[str, Any] | None = None,
+    ) -> Path:
+        """Move the completed download *tmp* into the store under *digest*.
+
+        *meta* holds extra per-URL fields (cache validators) kept in the index.
+        """
+        target = self.blob_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            tmp.unlink(missing_ok=True)  # identical content already stored
+        else:
+            tmp.replace(target)
+            try:
+                target.chmod(0o444)
+            except PermissionError:  # fallback on platforms that forbid chmod
+                pass
+        size = target.stat().st_size
+        self._blobs[digest] = {"size": size, "last_used": time.time()}
+        if url is not None:
+            entry: UrlEntry = {"sha256": digest, "size": size}
+            entry.update(meta or {})  # type: ignore[typeddict-item]
+            self._urls[url] = entry
+        self._save()
+        self.evict(keep={digest})
+        return target
+
+    def refresh(self, url: str, meta: dict[str, Any]) -> UrlEntry:
+        """Merge fresh cache metadata for *url* after a ``304 Not Modified``.
+
+        Fields absent from *meta* keep their stored values, as a 304 only
+        carries the headers that changed.
+        """
+        entry = self._urls[url]
+        entry.update(meta)  # type: ignore[typeddict-item]
+        self._save()
+        return entry
+
+    def materialize(self, digest: str, dest: Path) -> str:
+        """Expose blob *digest* read-only at *dest*; return the link mode used."""
+        src = self.blob_path(digest)
+        mode = link_file(src, dest, ("hardlink", "reflink", "copy"))
+        if mode != "hardlink":
+            try:
+                dest.chmod(0o444)
+            except PermissionError:
+                pass
+        if digest in self._blobs:
+            self._blobs[digest]["last_used"] = time.time()
+            self._save()
+        return mode
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+    def usage(self) -> int:
+        return sum(b["size"] for b in self._blobs.values())
+
+    def evict(self, keep: set[str] | None = None) -> list[str]:
+        """Drop unreferenced blobs, oldest first, until within budget.
+
+        Digests in *keep* are never evicted (e.g. a blob about to be linked).
+        """
+        total = self.usage()
+        if total <= self.budget_bytes:
+            return []
+
+        evicted: list[str] = []
+        for digest, meta in sorted(
+            self._blobs.items(), key=lambda item: item[1]["last_used"]
+        ):
+            if total <= self.budget_bytes:
+                break
+            if keep and digest in keep:
+                continue
+            path = self.blob_path(digest)
+            try:
+                if path.stat().st_nlink > 1:
+                    continue  # still mounted by at least one session
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= meta["size"]
+            evicted.append(digest)
+
+        for digest in evicted:
+            del self._blobs[digest]
+        self._urls = {
+            url: e for url, e in self._urls.items() if e["sha256"] not in evicted
+        }
+        self._save()
+        return evicted
+
+
+_default: BlobStore | None = None
+
+
+def default_store() -> BlobStore:
+    """Return the process-wide blob store rooted at ``PRIMCS_BLOB_DIR``."""
+    global _default
+    if _default is None:
+        _default = BlobStore(BLOB_DIR)
+    return _default
@@ -0,0 +1,113 @@
+"""Shared, content-addressed bytecode cache for sandbox environments.
+
+pip would byte-compile every module of every package on every environment
+build, and sandboxes whose environment is read-only would recompile on each
+import. Instead, packages are installed with ``--no-compile`` and
+:func:`precompile` gives each source file its ``.pyc`` from a store under
+``PRIMCS_PYCACHE_DIR`` keyed by the SHA-256 of the source. The ``.pyc`` is
+compiled once, the first time any sandbox installs that exact file. Later
+builds hardlink it into ``__pycache__/`` (or copy it across filesystems).
+
+The cached files are *checked-hash* pycs: they stay valid however often a
+package is reinstalled (with new mtimes) and wherever the environment lives,
+because the interpreter validates them against the source content and
+rewrites their recorded file name on load.
+"""
+
+import hashlib
+import os
+import py_compile
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import TypedDict
+
+from server.config import PYCACHE_DIR
+from server.sandbox.materialize import link_file
+
+__all__ = ["PrecompileInfo", "precompile", "prune"]
+
+_LINK_MODES = ("hardlink", "reflink", "copy")
+
+
+class PrecompileInfo(TypedDict):
+    modules: int
+    cached: int  # served from the store
+    compiled: int  # compiled now and added to the store
+    seconds: float
+
+
+def _site_packages(venv_dir: Path) -> list[Path]:
+    return [
+        *venv_dir.glob("lib/python*/site-packages"),
+        *venv_dir.glob("Lib/site-packages"),
+    ]
+
+
+def _compile(src: Path, target: Path) -> bool:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        py_compile.compile(
+            str(src),
+            cfile=str(tmp),
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH,
+        )
+    except py_compile.PyCompileError:
+        return False  # e.g. Python 2 files shipped as package data
+    tmp.chmod(0o444)
+    tmp.replace(target)
+    return True
+
+
+def precompile(venv_dir: Path, store: Path | None = None) -> PrecompileInfo:
+    """Give every module in *venv_dir*'s site-packages a cached ``.pyc``.
+
+    Blocking; run it in a worker thread.
+    """
+    start = time.perf_counter()
+    store = PYCACHE_DIR if store is None else store
+    tag = sys.implementation.cache_tag
+    info: PrecompileInfo = {"modules": 0, "cached": 0, "compiled": 0, "seconds": 0.0}
+    for root in _site_packages(venv_dir):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+            for name in filenames:
+                if not name.endswith(".py"):
+                    continue
+                src = Path(dirpath) / name
+                digest = hashlib.sha256(src.read_bytes()).hexdigest()
+                cached = store / digest[:2] / f"{digest}.{tag}.pyc"
+                if cached.is_file():
+                    info["cached"] += 1
+                elif _compile(src, cached):
+                    info["compiled"] += 1
+                else:
+                    continue
+                pyc = Path(dirpath) / "__pycache__" / f"{name[:-3]}.{tag}.pyc"
+                link_file(cached, pyc, _LINK_MODES)
+                info["modules"] += 1
+    info["seconds"] = round(time.perf_counter() - start, 4)
+    return info
+
+
+def prune(max_age: float, store: Path | None = None) -> int:
+    """Delete cached pycs no environment links to that were unused for *max_age*.
+
+    A store entry's link count drops to one when the last environment using
+    it is deleted, which also updates its ctime. Returns the number removed.
+    """
+    store = PYCACHE_DIR if store is None else store
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in store.glob("??/*.pyc"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if st.st_nlink == 1 and st.st_ctime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
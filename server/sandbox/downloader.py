@@ -1,49 +1,430 @@
 """Download remote files to the sandbox run directory."""
 
 import asyncio
+import hashlib
+import time
+from collections.abc import Callable, Mapping
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from typing import Any, Literal, NotRequired, TypedDict
+from urllib.parse import urlsplit
 
 import aiohttp
 
-__all__ = ["download_files"]
+from server.sandbox import tabular
+from server.sandbox.archive import FORMATS, detect_format, extract_archive
+from server.sandbox.blobstore import BlobStore, UrlEntry, default_store
+from server.sandbox.localmount import is_local_url, link_local, resolve_local
+from server.sandbox.tabular import TabularInfo
 
+__all__ = ["MountInfo", "ProgressFn", "download_files"]
 
-async def _fetch(session: aiohttp.ClientSession, url: str, path: Path) -> None:
-    async with session.get(url) as resp:
+_CHUNK_BYTES = 1024 * 1024
+
+CacheStatus = Literal["hit", "revalidated", "miss", "local"]
+
+# progress(mount_path, bytes_done, total_bytes or None when unknown)
+ProgressFn = Callable[[str, int, int | None], None]
+
+
+class MountInfo(TypedDict):
+    """Outcome of mounting a single file."""
+
+    mount_path: str
+    url: str
+    bytes: int
+    sha256: NotRequired[str]  # absent for local mounts, which are never hashed
+    # hit: no network, revalidated: 304, miss: full body, local: file:// source
+    cache: CacheStatus
+    link: NotRequired[str]  # how a local mount was linked (reflink/hardlink/...)
+    # Present when the mount was an archive extracted into mounts/<mount_path>/.
+    archive_format: NotRequired[str]
+    extracted_files: NotRequired[int]
+    extracted_bytes: NotRequired[int]
+    # Present when a columnar sidecar was written next to the mount.
+    sidecar: NotRequired[str]
+    table: NotRequired[TabularInfo]
+    # Present instead when the conversion failed; the mount itself is intact.
+    sidecar_error: NotRequired[str]
+
+
+def _cache_meta(headers: Mapping[str, str]) -> dict[str, Any]:
+    """Extract HTTP cache metadata worth remembering from response *headers*.
+
+    *headers* must be case-insensitive, as aiohttp response headers are.
+    """
+    meta: dict[str, Any] = {"fetched_at": time.time()}
+    directives = {
+        d.strip().split("=", 1)[0].lower(): d.strip().partition("=")[2].strip('"')
+        for d in headers.get("Cache-Control", "").split(",")
+        if d.strip()
+    }
+    if "no-store" in directives:
+        # Body may still be mounted but must never be reused without a refetch.
+        meta.update(max_age=0.0, no_cache=True)
+        return meta
+
+    if headers.get("ETag"):
+        meta["etag"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        meta["last_modified"] = headers["Last-Modified"]
+    if "no-cache" in directives:
+        meta["no_cache"] = True
+
+    # Age is whole seconds; anything else is ignored rather than failing.
+    age_header = headers.get("Age", "").strip()
+    age = float(age_header) if age_header.isdigit() else 0.0
+    if directives.get("max-age", "").isdigit():
+        meta["max_age"] = max(float(directives["max-age"]) - age, 0.0)
+    elif headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+            date = (
+                parsedate_to_datetime(headers["Date"]).timestamp()
+                if headers.get("Date")
+                else meta["fetched_at"]
+            )
+            meta["max_age"] = max(expires - date - age, 0.0)
+        except (TypeError, ValueError):
+            meta["max_age"] = 0.0  # invalid Expires means already expired
+    return meta
+
+
+def _is_fresh(entry: UrlEntry) -> bool:
+    if entry.get("no_cache") or "max_age" not in entry:
+        return False
+    return time.time() - entry.get("fetched_at", 0.0) < entry["max_age"]
+
+
+async def _store_body(
+    resp: aiohttp.ClientResponse,
+    url: str,
+    store: BlobStore,
+    report: Callable[[int, int | None], None],
+) -> UrlEntry:
+    """Stream the body of *resp* into *store* and return the new index entry."""
+    tmp = store.temp_path()
+    digest = hashlib.sha256()
+    done = 0
+    report(done, resp.content_length)
+    try:
+        with tmp.open("wb") as fh:
+            async for chunk in resp.content.iter_chunked(_CHUNK_BYTES):
+                digest.update(chunk)
+                fh.write(chunk)
+                done += len(chunk)
+                report(done, resp.content_length)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    store.add(tmp, digest.hexdigest(), url, _cache_meta(resp.headers))
+    entry = store.lookup(url)
+    assert entry is not None
+    return entry
+
+
+async def _fetch(
+    url: str, store: BlobStore, report: Callable[[int, int | None], None]
+) -> tuple[UrlEntry, CacheStatus]:
+    """Resolve *url* to a stored blob, using the network only when needed."""
+    cached = store.lookup(url)
+    if cached is not None and _is_fresh(cached):
+        return cached, "hit"
+
+    headers: dict[str, str] = {}
+    if cached is not None:
+        if "etag" in cached:
+            headers["If-None-Match"] = cached["etag"]
+        if "last_modified" in cached:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    # Each flight owns its HTTP session: followers must not depend on the
+    # lifetime of whichever caller happened to start the download.
+    async with (
+        aiohttp.ClientSession() as session,
+        session.get(url, headers=headers) as resp,
+    ):
+        if resp.status == 304 and cached is not None:
+            return store.refresh(url, _cache_meta(resp.headers)), "revalidated"
         resp.raise_for_status()
-        path.write_bytes(await resp.read())
-    # Make the file read-only
+        return await _store_body(resp, url, store, report), "miss"
+
+
+class _Flight:
+    """A download in progress, shared by every caller that wants the same URL."""
+
+    def __init__(self) -> None:
+        self.task: asyncio.Task[tuple[UrlEntry, CacheStatus]] | None = None
+        self.waiters = 0
+        self.done = 0
+        self.total: int | None = None
+        self.listeners: list[Callable[[int, int | None], None]] = []
+
+    def report(self, done: int, total: int | None) -> None:
+        self.done, self.total = done, total
+        for listener in list(self.listeners):
+            listener(done, total)
+
+
+_inflight: dict[tuple[str, str], _Flight] = {}
+
+
+async def _fetch_once(
+    url: str,
+    store: BlobStore,
+    listener: Callable[[int, int | None], None] | None = None,
+) -> tuple[UrlEntry, CacheStatus]:
+    """Coalesce concurrent fetches of *url* into a single network request.
+
+    Errors propagate to every waiter. A waiter that is cancelled leaves the
+    flight running for the others; the download itself is cancelled only
+    when its last waiter goes away. *listener* receives byte progress of the
+    shared download, including for waiters that join late.
+    """
+    key = (str(store.root), url)
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _Flight()
+        flight.task = asyncio.create_task(_fetch(url, store, flight.report))
+        _inflight[key] = flight
+
+        def _forget(_: object, flight: _Flight = flight) -> None:
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+
+        flight.task.add_done_callback(_forget)
+    task = flight.task
+    assert task is not None
+
+    flight.waiters += 1
+    if listener is not None:
+        flight.listeners.append(listener)
+        listener(flight.done, flight.total)
     try:
-        path.chmod(0o444)
-    except PermissionError:  # fallback on platforms that forbid chmod inside container
-        pass
+        return await asyncio.shield(task)
+    finally:
+        flight.waiters -= 1
+        if listener is not None:
+            flight.listeners.remove(listener)
+        if flight.waiters == 0 and not task.done():
+            task.cancel()
+
+
+def _archive_format(meta: dict[str, Any]) -> str | None:
+    """Return the archive format requested by a file entry's ``extract`` key."""
+    extract = meta.get("extract")
+    if not extract:
+        return None
+    if isinstance(extract, str) and extract in FORMATS:
+        return extract
+    fmt = detect_format(urlsplit(meta["url"]).path) or detect_format(meta["mountPath"])
+    if fmt is None:
+        raise ValueError(
+            f"Cannot tell archive format of {meta['url']!r}; "
+            f"pass extract as one of {sorted(FORMATS)}."
+        )
+    return fmt
+
+
+def _table_format(meta: dict[str, Any]) -> tuple[str, str] | None:
+    """Return ``(kind, format)`` requested by a file entry's ``convert`` key."""
+    convert = meta.get("convert")
+    if not convert:
+        return None
+    fmt = convert if isinstance(convert, str) else "parquet"
+    if fmt not in tabular.FORMATS:
+        raise ValueError(
+            f"Unsupported convert format {fmt!r}; use one of {sorted(tabular.FORMATS)}."
+        )
+    if meta.get("extract"):
+        raise ValueError("convert cannot be combined with extract.")
+    kind = tabular.detect_kind(meta["mountPath"]) or tabular.detect_kind(
+        urlsplit(meta["url"]).path
+    )
+    if kind is None:
+        raise ValueError(
+            f"Cannot convert {meta['mountPath']!r}; only .csv, .tsv and .jsonl "
+            "files can be converted."
+        )
+    return kind, fmt
+
 
+def _convert_blob(
+    source: Path, target: Path, kind: str, fmt: str
+) -> tuple[TabularInfo, str]:
+    """Convert *source* into *target* and hash the result (blocking)."""
+    table = tabular.convert_table(source, target, kind, fmt)
+    digest = hashlib.sha256()
+    with target.open("rb") as fh:
+        while chunk := fh.read(_CHUNK_BYTES):
+            digest.update(chunk)
+    return table, digest.hexdigest()
 
-async def download_files(files: list[dict[str, str]], dest: Path) -> list[Path]:
+
+async def _sidecar(
+    source: Path, source_key: str, kind: str, fmt: str, dest: Path, store: BlobStore
+) -> TabularInfo:
+    """Materialize the *fmt* conversion of the mounted *source* at *dest*.
+
+    The sidecar is itself a blob keyed by *source_key* (the source digest,
+    or path and mtime for local mounts), so remounting the same content, in
+    any session, links the earlier conversion instead of parsing the table
+    again.
+    """
+    key = f"table+{kind}+{fmt}:{source_key}"
+    cached = store.lookup(key)
+    if cached is None or "table" not in cached:
+        tmp = store.temp_path()
+        try:
+            table, sidecar_digest = await asyncio.to_thread(
+                _convert_blob, source, tmp, kind, fmt
+            )
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        store.add(tmp, sidecar_digest, key, {"table": table})
+        cached = store.lookup(key)
+        assert cached is not None
+    store.materialize(cached["sha256"], dest)
+    return cached["table"]
+
+
+async def _mount(
+    url: str,
+    mount_path: str,
+    dest: Path,
+    store: BlobStore,
+    progress: ProgressFn | None = None,
+    archive_format: str | None = None,
+    table_format: tuple[str, str] | None = None,
+    local: Path | None = None,
+) -> MountInfo:
+    target = dest / mount_path
+    info: MountInfo
+    if local is not None:
+        st = local.stat()
+        size = 0 if local.is_dir() else st.st_size
+        info = {
+            "mount_path": Path(mount_path).as_posix(),
+            "url": url,
+            "bytes": size,
+            "cache": "local",
+        }
+        source, source_key = local, f"local:{local}:{st.st_mtime_ns}:{st.st_size}"
+        if archive_format is None:
+            info["link"] = link_local(local, target)
+        if progress is not None:
+            progress(mount_path, size, size)
+    else:
+        listener = None
+        if progress is not None:
+
+            def listener(done: int, total: int | None) -> None:
+                progress(mount_path, done, total)
+
+        entry, status = await _fetch_once(url, store, listener)
+        info = {
+            "mount_path": Path(mount_path).as_posix(),
+            "url": url,
+            "bytes": entry["size"],
+            "sha256": entry["sha256"],
+            "cache": status,
+        }
+        source, source_key = store.blob_path(entry["sha256"]), entry["sha256"]
+        if archive_format is None:
+            # Read-only hardlink (or reflink/copy) to the shared blob.
+            store.materialize(entry["sha256"], target)
+
+    if archive_format is not None:
+        # The open handle keeps the source readable even if it is evicted
+        # or replaced meanwhile.
+        with source.open("rb") as fh:
+            extracted = await asyncio.to_thread(
+                extract_archive, fh, target, archive_format
+            )
+        info["archive_format"] = archive_format
+        info["extracted_files"] = extracted["files"]
+        info["extracted_bytes"] = extracted["bytes"]
+    elif table_format is not None:
+        kind, fmt = table_format
+        sidecar = tabular.sidecar_name(info["mount_path"], fmt)
+        try:
+            info["table"] = await _sidecar(
+                target, source_key, kind, fmt, dest / sidecar, store
+            )
+        except Exception as exc:  # noqa: BLE001 - reported, the mount stands
+            # e.g. a column whose type changes after the block the schema
+            # was inferred from.
+            info["sidecar_error"] = f"No {fmt} sidecar was written: {exc}"
+        else:
+            info["sidecar"] = sidecar
+    return info
+
+
+async def download_files(
+    files: list[dict[str, Any]],
+    dest: Path,
+    store: BlobStore | None = None,
+    progress: ProgressFn | None = None,
+) -> list[MountInfo]:
     """Download *files* concurrently into *dest*.
 
     Each element in *files* must be a dict with keys ``url`` and **``mountPath``** (required).
+    With a truthy ``extract`` key (or an explicit format such as ``"tar.gz"``)
+    the archive is unpacked into the directory ``mountPath`` instead. With a
+    ``convert`` key (``"parquet"``, ``"feather"`` or ``True`` for Parquet) a
+    CSV/TSV/JSONL mount also gets a columnar sidecar ``<mountPath>.<format>``,
+    converted in a worker thread.
+    Bodies are stored once in the shared blob *store* (keyed by content hash)
+    and linked into *dest*. Cached URLs are served without network traffic
+    while fresh and revalidated with a conditional GET once stale. Concurrent
+    requests for the same URL, from this call or any other, share a single
+    fetch. *progress*, if given, is called with byte counts as bodies stream in.
+
+    ``file://`` URLs under an allow-listed root (``PRIMCS_LOCAL_ROOTS``) are
+    linked into *dest* instead (reflink, hardlink or symlink) without
+    copying or hashing any bytes.
 
-    Returns list of local paths (relative to *dest*).
+    Returns one :class:`MountInfo` per entry, in input order.
     """
     if not files:
         return []
 
     dest.mkdir(parents=True, exist_ok=True)
+    store = store or default_store()
+
+    formats = []
+    table_formats = []
+    locals_: list[Path | None] = []
+    for meta in files:
+        if "mountPath" not in meta or not meta["mountPath"]:
+            raise ValueError(
+                "Each file entry must include a non-empty 'mountPath' key."
+            )
+        relative = Path(meta["mountPath"])
+        if relative.is_absolute() or ".." in relative.parts:
+            raise ValueError("mountPath must be a relative path without '..'")
+        formats.append(_archive_format(meta))
+        table_formats.append(_table_format(meta))
+        locals_.append(
+            resolve_local(meta["url"]) if is_local_url(meta["url"]) else None
+        )
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for meta in files:
-            url = meta["url"]
-            if "mountPath" not in meta or not meta["mountPath"]:
-                raise ValueError(
-                    "Each file entry must include a non-empty 'mountPath' key."
-                )
-
-            relative = Path(meta["mountPath"])
-            local = dest / relative
-            local.parent.mkdir(parents=True, exist_ok=True)
-            tasks.append(_fetch(session, url, local))
-        await asyncio.gather(*tasks)
-
-    return [dest / Path(f["mountPath"]) for f in files]
+    tasks = []
+    for meta, fmt, table_fmt, local in zip(
+        files, formats, table_formats, locals_, strict=True
+    ):
+        (dest / Path(meta["mountPath"])).parent.mkdir(parents=True, exist_ok=True)
+        tasks.append(
+            _mount(
+                meta["url"],
+                meta["mountPath"],
+                dest,
+                store,
+                progress,
+                fmt,
+                table_fmt,
+                local,
+            )
+        )
+    return list(await asyncio.gather(*tasks))
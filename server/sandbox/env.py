@@ -1,39 +1,64 @@
 """Utility helpers for creating isolated virtual environments."""
 
 import asyncio
+import hashlib
+import json
 import sys
+import sysconfig
 import venv
 from pathlib import Path
 
-# Default libraries always installed in every sandbox environment.
+from server.sandbox import layers
+
+# Default libraries; the shared base layer of environments that include them.
 _DEFAULT_PACKAGES: list[str] = ["pandas", "openpyxl", "requests"]
+_LAYERS_PTH = "_primcs_layers.pth"
+
+
+def env_hash(requirements: list[str], defaults: list[str] | None = None) -> str:
+    """Identify the environment built for *requirements* (order-insensitive)."""
+    defaults = _DEFAULT_PACKAGES if defaults is None else defaults
+    specs = sorted(dict.fromkeys(requirements + defaults))
+    return hashlib.sha256(json.dumps(specs).encode()).hexdigest()[:16]
 
 
-async def create_virtualenv(requirements: list[str], run_dir: Path) -> Path:
-    """Create a venv in run_dir/venv and install *requirements*."""
+async def create_virtualenv(
+    requirements: list[str], run_dir: Path, defaults: list[str] | None = None
+) -> Path:
+    """Create a venv in run_dir/venv that provides *requirements*.
+
+    *defaults* (``_DEFAULT_PACKAGES`` unless given) are provided as well.
+    Packages come from shared layers (see :mod:`server.sandbox.layers`) that
+    a ``.pth`` file puts on the venv's sys.path; nothing is installed into
+    the venv itself.
+    """
+    defaults = _DEFAULT_PACKAGES if defaults is None else defaults
     venv_dir = run_dir / "venv"
-    venv.EnvBuilder(with_pip=True, clear=True).create(venv_dir)
+    # Building the venv is blocking; keep the event loop free so downloads
+    # staged alongside it keep flowing.
+    await asyncio.to_thread(
+        venv.EnvBuilder(with_pip=False, clear=True).create, venv_dir
+    )
 
     python = (
         venv_dir / ("Scripts" if sys.platform.startswith("win") else "bin") / "python"
     )
 
-    # Combine caller-specified requirements with default packages.
-    all_requirements = list(dict.fromkeys(requirements + _DEFAULT_PACKAGES))
-
-    if all_requirements:
-        proc = await asyncio.create_subprocess_exec(
-            str(python),
-            "-m",
-            "pip",
-            "install",
-            "--no-cache-dir",
-            *all_requirements,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+    requirements = list(dict.fromkeys(requirements))
+    if requirements or defaults:
+        sites = await layers.compose(requirements, defaults)
+        site_packages = Path(
+            sysconfig.get_path(
+                "purelib",
+                "venv",
+                vars={"base": str(venv_dir), "platbase": str(venv_dir)},
+            )
+        )
+        site_packages.mkdir(parents=True, exist_ok=True)
+        # addsitedir (not a bare path) so the layers' own .pth files apply;
+        # the topmost layer is added first and wins.
+        (site_packages / _LAYERS_PTH).write_text(
+            "".join(f"import site; site.addsitedir({str(p)!r})\n" for p in sites)
         )
-        _, err = await proc.communicate()
-        if proc.returncode != 0:
-            raise RuntimeError(f"pip install failed: {err.decode()}")
 
     return python
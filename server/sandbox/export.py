@@ -0,0 +1,295 @@
+"""Stream a subtree of a session workspace as a zip or tar archive."""
+
+import asyncio
+import contextlib
+import io
+import os
+import stat
+import tarfile
+import threading
+import zipfile
+from collections.abc import AsyncIterator, Iterator
+from datetime import UTC, datetime
+from pathlib import Path, PurePosixPath
+from typing import IO, Literal, TypedDict
+
+__all__ = [
+    "FORMATS",
+    "MEDIA_TYPES",
+    "ExportFile",
+    "ExportSummary",
+    "parse_since",
+    "resolve_subtree",
+    "select_files",
+    "stream_archive",
+    "summarize",
+]
+
+FORMATS = {"zip", "tar", "tar.gz", "tar.zst"}
+MEDIA_TYPES = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+    "tar.gz": "application/gzip",
+    "tar.zst": "application/zstd",
+}
+
+_CHUNK_BYTES = 256 * 1024
+_ZIP_EPOCH = datetime(1980, 1, 2).timestamp()
+# Chunks buffered between the archive writer thread and the HTTP response:
+# memory use is bounded by _QUEUE_CHUNKS * _CHUNK_BYTES whatever the size.
+_QUEUE_CHUNKS = 8
+# Deflating these again only burns CPU.
+_STORED_SUFFIXES = {
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".zip",
+    ".gz",
+    ".tgz",
+    ".bz2",
+    ".xz",
+    ".zst",
+    ".parquet",
+    ".mp4",
+}
+
+
+class ExportFile(TypedDict):
+    arcname: str  # path inside the archive, relative to the exported subtree
+    path: Path
+    size: int
+    mtime: float
+
+
+class ExportSummary(TypedDict):
+    files: int
+    bytes: int  # uncompressed
+
+
+def parse_since(value: str | float | None) -> float | None:
+    """Accept a Unix timestamp or an ISO 8601 datetime (naive means UTC)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int | float):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise ValueError(f"Invalid modified-since value: {value!r}") from exc
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return when.timestamp()
+
+
+def resolve_subtree(root: Path, relative: str) -> Path:
+    """Resolve *relative* (e.g. ``output/plots``) inside the workspace *root*."""
+    rel = PurePosixPath(relative or ".")
+    if rel.is_absolute() or ".." in rel.parts:
+        raise ValueError("path must be relative to the session root without '..'")
+    base = (root / rel).resolve()
+    if not base.is_relative_to(root.resolve()):
+        raise ValueError("path escapes the session workspace")
+    if not base.is_dir():
+        raise FileNotFoundError(f"No such directory in the workspace: {relative}")
+    return base
+
+
+def _matches(rel: str, pattern: str) -> bool:
+    # Patterns without a slash match the file name anywhere in the tree.
+    path = PurePosixPath(rel)
+    if "/" not in pattern:
+        return PurePosixPath(path.name).full_match(pattern)
+    return path.full_match(pattern)
+
+
+def select_files(
+    base: Path, glob: str | None = None, since: float | None = None
+) -> Iterator[ExportFile]:
+    """Yield regular files below *base*, optionally filtered.
+
+    Symlinks are skipped so an export never reaches outside the workspace.
+    """
+    stack = [(base, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = f"{prefix}{entry.name}"
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                subdirs.append((Path(entry.path), f"{rel}/"))
+            elif stat.S_ISREG(st.st_mode):
+                if glob and not _matches(rel, glob):
+                    continue
+                if since is not None and st.st_mtime <= since:
+                    continue
+                yield {
+                    "arcname": rel,
+                    "path": Path(entry.path),
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                }
+        stack.extend(reversed(subdirs))
+
+
+def summarize(files: Iterator[ExportFile]) -> ExportSummary:
+    count = total = 0
+    for f in files:
+        count += 1
+        total += f["size"]
+    return {"files": count, "bytes": total}
+
+
+class _Closed(Exception):
+    """The consumer went away; stop producing."""
+
+
+class _QueueWriter(io.RawIOBase):
+    """Write-only, non-seekable file that feeds an asyncio queue from a thread."""
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue[bytes | None]
+    ) -> None:
+        self._loop = loop
+        self._queue = queue
+        self._buffer = bytearray()
+        self.cancelled = threading.Event()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self._buffer += data
+        if len(self._buffer) >= _CHUNK_BYTES:
+            self._send(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def _send(self, chunk: bytes | None) -> None:
+        if self.cancelled.is_set():
+            raise _Closed
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop)
+        # Block (bounded queue) until the response has room for more.
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return
+            except TimeoutError:
+                if self.cancelled.is_set():
+                    future.cancel()
+                    raise _Closed from None
+
+    def finish(self) -> None:
+        """Send any buffered bytes and mark the end of the archive."""
+        if self._buffer:
+            self._send(bytes(self._buffer))
+            self._buffer.clear()
+        self.end()
+
+    def end(self) -> None:
+        self._send(None)
+
+
+def _copy(src: Path, dst: IO[bytes]) -> None:
+    with src.open("rb") as fh:
+        while chunk := fh.read(_CHUNK_BYTES):
+            dst.write(chunk)
+
+
+def _write_zip(files: Iterator[ExportFile], out: IO[bytes]) -> None:
+    # On a non-seekable stream zipfile writes sizes in data descriptors.
+    with zipfile.ZipFile(out, "w") as zf:
+        for f in files:
+            # The zip format cannot represent dates before 1980.
+            mtime = max(f["mtime"], _ZIP_EPOCH)
+            info = zipfile.ZipInfo(
+                f["arcname"], datetime.fromtimestamp(mtime).timetuple()[:6]
+            )
+            info.file_size = f["size"]
+            info.compress_type = (
+                zipfile.ZIP_STORED
+                if f["path"].suffix.lower() in _STORED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            info.external_attr = 0o644 << 16
+            with zf.open(info, "w", force_zip64=f["size"] > zipfile.ZIP64_LIMIT) as dst:
+                _copy(f["path"], dst)
+
+
+def _write_tar(files: Iterator[ExportFile], out: IO[bytes], fmt: str) -> None:
+    if fmt == "tar.zst":
+        try:
+            import zstandard
+        except ImportError as exc:  # pragma: no cover - depends on environment
+            raise RuntimeError(
+                "tar.zst export requires the 'zstandard' package"
+            ) from exc
+        with zstandard.ZstdCompressor(level=3).stream_writer(
+            out, closefd=False
+        ) as zout:
+            _write_tar(files, zout, "tar")
+        return
+    mode: Literal["w|gz", "w|"] = "w|gz" if fmt == "tar.gz" else "w|"
+    with tarfile.open(fileobj=out, mode=mode) as tf:
+        for f in files:
+            info = tarfile.TarInfo(f["arcname"])
+            info.size = f["size"]
+            info.mtime = int(f["mtime"])
+            info.mode = 0o644
+            with f["path"].open("rb") as fh:
+                tf.addfile(info, fh)
+
+
+def _produce(files: Iterator[ExportFile], fmt: str, writer: _QueueWriter) -> None:
+    try:
+        if fmt == "zip":
+            _write_zip(files, writer)  # type: ignore[arg-type]
+        else:
+            _write_tar(files, writer, fmt)  # type: ignore[arg-type]
+        writer.finish()
+    except _Closed:
+        pass
+    except BaseException:
+        # End the stream so the consumer stops waiting, then report the error.
+        with contextlib.suppress(_Closed):
+            writer.end()
+        raise
+
+
+async def stream_archive(files: Iterator[ExportFile], fmt: str) -> AsyncIterator[bytes]:
+    """Yield a *fmt* archive of *files* chunk by chunk.
+
+    The archive is built in a worker thread as the response is consumed; no
+    temporary archive is staged and at most a few chunks are buffered. If
+    the consumer stops early, the worker is told to abort.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=_QUEUE_CHUNKS)
+    writer = _QueueWriter(loop, queue)
+    worker = loop.run_in_executor(None, _produce, files, fmt, writer)
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        await worker  # surface errors raised after the last chunk
+    finally:
+        writer.cancelled.set()
+        while not queue.empty():
+            queue.get_nowait()
+        if not worker.done():
+            with contextlib.suppress(Exception):
+                await worker
@@ -0,0 +1,122 @@
+"""Fork a session workspace into another without copying its bytes.
+
+Every file of the source is placed in the fork with the cheapest strategy
+that keeps the two workspaces independent:
+
+* read-only files (mounts, blob-store links) and ``venv/`` – which runs
+  replace rather than modify – are hardlinked and cost one inode each;
+* all other files are reflinked (a copy-on-write clone on btrfs, XFS and
+  similar filesystems) and copied only where reflinks are unsupported.
+
+File modes and modification times are preserved, so the fork's artifact
+index recognises unchanged outputs.
+"""
+
+import asyncio
+import os
+import shutil
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import TypedDict
+
+from server.sandbox import metadata, sessions
+from server.sandbox.materialize import link_file
+
+__all__ = ["ForkInfo", "fork_session", "fork_workspace"]
+
+_SHARED = ("hardlink", "reflink", "copy")
+_PRIVATE = ("reflink", "copy")
+
+
+class ForkInfo(TypedDict):
+    files: int
+    hardlinked: int
+    reflinked: int
+    copied: int
+    copied_bytes: int
+    seconds: float
+
+
+def _shareable(rel_dir: Path, st: os.stat_result) -> bool:
+    in_venv = bool(rel_dir.parts) and rel_dir.parts[0] == "venv"
+    return in_venv or not st.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+def fork_workspace(source: Path, target: Path) -> ForkInfo:
+    """Recreate *source* at *target* (which must not exist).
+
+    Blocking; run it in a worker thread.
+    """
+    start = time.perf_counter()
+    info: ForkInfo = {
+        "files": 0,
+        "hardlinked": 0,
+        "reflinked": 0,
+        "copied": 0,
+        "copied_bytes": 0,
+        "seconds": 0.0,
+    }
+    target.mkdir(parents=True)
+    for dirpath, dirnames, filenames in os.walk(source):
+        rel_dir = Path(dirpath).relative_to(source)
+        for name in dirnames:
+            src = Path(dirpath) / name
+            dst = target / rel_dir / name
+            if src.is_symlink():  # os.walk does not descend into these
+                dst.symlink_to(src.readlink())
+            else:
+                dst.mkdir()
+                shutil.copymode(src, dst)
+        for name in filenames:
+            src = Path(dirpath) / name
+            dst = target / rel_dir / name
+            st = src.lstat()
+            if stat.S_ISLNK(st.st_mode):
+                dst.symlink_to(src.readlink())
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue  # sockets, FIFOs
+            mode = link_file(src, dst, _SHARED if _shareable(rel_dir, st) else _PRIVATE)
+            if mode != "hardlink":
+                dst.chmod(stat.S_IMODE(st.st_mode))
+                os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+            info["files"] += 1
+            if mode == "hardlink":
+                info["hardlinked"] += 1
+            elif mode == "reflink":
+                info["reflinked"] += 1
+            else:
+                info["copied"] += 1
+                info["copied_bytes"] += st.st_size
+    info["seconds"] = round(time.perf_counter() - start, 4)
+    return info
+
+
+async def fork_session(source: Path, target: Path) -> ForkInfo:
+    """Replace workspace *target* with a fork of workspace *source*.
+
+    A hibernated source is restored first and both workspaces are held in
+    use meanwhile. The fork is built under a temporary name and renamed
+    into place, so *target* never appears half-populated.
+    """
+    async with sessions.in_use(source), sessions.in_use(target):
+        await sessions.ensure_ready(source)
+        if not source.is_dir():
+            raise FileNotFoundError(f"No workspace for session {source.name}")
+        staging = (
+            target.parent / sessions.FORK_STAGING / f"{target.name}.{uuid.uuid4().hex}"
+        )
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            info = await asyncio.to_thread(fork_workspace, source, staging)
+            task = sessions.discard(target)
+            staging.rename(target)
+        except BaseException:
+            await asyncio.to_thread(shutil.rmtree, staging, True)
+            raise
+        metadata.default_store().copy(source.name, target.name)
+    if task is not None:
+        await task
+    return info
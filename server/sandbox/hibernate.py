@@ -0,0 +1,218 @@
+"""Archive idle session workspaces and restore them on demand.
+
+A hibernated workspace is a single ``tar.zst`` (``tar.gz`` without the
+``zstandard`` package) under ``TMP_DIR/hibernated/``. The archive leaves
+out what can be recreated:
+
+* ``venv/`` – every run builds its environment afresh anyway;
+* mounted files that are hardlinks into the shared blob store – only
+  their digest goes into the archive's manifest, and restoring links the
+  blob back (or downloads the URL again if the blob was evicted meanwhile).
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import os
+import tarfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Literal, Protocol, TypedDict
+
+from server.sandbox.blobstore import BlobStore, default_store
+from server.sandbox.downloader import download_files
+from server.sandbox.metadata import MountRecord
+
+__all__ = ["RestoreInfo", "SnapshotInfo", "hibernate", "restore", "snapshot_for"]
+
+_MANIFEST = ".hibernate.json"
+_SKIP_TOP = {"venv"}
+
+
+class SnapshotInfo(TypedDict):
+    path: str
+    bytes: int  # archive size
+    files: int  # archived members
+    linked_blobs: int  # mounts recorded by digest instead of content
+    seconds: float
+
+
+class RestoreInfo(TypedDict):
+    files: int
+    relinked: int  # mounts linked back from the blob store
+    downloaded: int  # mounts fetched again because their blob was evicted
+    seconds: float
+
+
+class _BinaryWriter(Protocol):
+    """The file API ``tarfile`` expects of a stream it writes to."""
+
+    def write(self, data: bytes, /) -> object: ...
+    def read(self, size: int, /) -> bytes: ...
+    def tell(self) -> int: ...
+    def seek(self, pos: int, /) -> object: ...
+    def close(self) -> object: ...
+
+
+def _zstd() -> ModuleType | None:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def snapshot_for(workspace: Path, snapshot_dir: Path) -> Path:
+    """Return the archive path *workspace* hibernates to."""
+    suffix = ".tar.zst" if _zstd() is not None else ".tar.gz"
+    return snapshot_dir / f"{workspace.name}{suffix}"
+
+
+def _blob_backed(
+    workspace: Path, mounts: list[MountRecord], store: BlobStore
+) -> dict[str, str]:
+    """Map workspace-relative paths of mounts that are store hardlinks to digests."""
+    linked: dict[str, str] = {}
+    for mount in mounts:
+        if not mount["sha256"]:
+            continue
+        path = workspace / "mounts" / mount["mount_path"]
+        try:
+            st = path.lstat()
+            blob = store.blob_path(mount["sha256"]).stat()
+        except FileNotFoundError:
+            continue
+        if (st.st_dev, st.st_ino) == (blob.st_dev, blob.st_ino):
+            linked[f"mounts/{mount['mount_path']}"] = mount["sha256"]
+    return linked
+
+
+def _write_tar(
+    out: _BinaryWriter, workspace: Path, skip: set[str], manifest: bytes
+) -> int:
+    files = 0
+    with tarfile.open(fileobj=out, mode="w|") as tf:
+        for dirpath, dirnames, filenames in os.walk(workspace):
+            rel_dir = Path(dirpath).relative_to(workspace)
+            if not rel_dir.parts:
+                dirnames[:] = [d for d in dirnames if d not in _SKIP_TOP]
+            dirnames.sort()
+            for name in dirnames + sorted(filenames):
+                rel = (rel_dir / name).as_posix()
+                if rel in skip:
+                    continue
+                # Directories are added without recursion; os.walk visits them.
+                tf.add(Path(dirpath) / name, arcname=rel, recursive=False)
+                files += 1
+        info = tarfile.TarInfo(_MANIFEST)
+        info.size = len(manifest)
+        info.mtime = int(time.time())
+        tf.addfile(info, io.BytesIO(manifest))
+    return files
+
+
+def hibernate(
+    workspace: Path,
+    snapshot_dir: Path,
+    mounts: list[MountRecord],
+    store: BlobStore | None = None,
+) -> SnapshotInfo:
+    """Write *workspace* to a compressed archive in *snapshot_dir*.
+
+    Blocking; run it in a worker thread. The workspace itself is left in
+    place for the caller to delete once the archive is safely written.
+    """
+    start = time.perf_counter()
+    store = store or default_store()
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    target = snapshot_for(workspace, snapshot_dir)
+    linked = _blob_backed(workspace, mounts, store)
+    manifest = json.dumps({"version": 1, "blobs": linked}).encode()
+
+    tmp = target.with_name(target.name + ".part")
+    with tmp.open("wb") as raw:
+        zstandard = _zstd()
+        if zstandard is not None:
+            with zstandard.ZstdCompressor(level=3).stream_writer(
+                raw, closefd=False
+            ) as out:
+                files = _write_tar(out, workspace, set(linked), manifest)
+        else:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+                files = _write_tar(gz, workspace, set(linked), manifest)
+        raw.flush()
+        os.fsync(raw.fileno())
+    tmp.replace(target)
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "files": files,
+        "linked_blobs": len(linked),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def _extract(snapshot: Path, workspace: Path) -> tuple[int, dict[str, str]]:
+    mode: Literal["r|", "r|gz"]
+    with snapshot.open("rb") as raw:
+        if snapshot.name.endswith(".zst"):
+            zstandard = _zstd()
+            if zstandard is None:
+                raise RuntimeError(
+                    f"Restoring {snapshot.name} requires the 'zstandard' package"
+                )
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+            mode = "r|"
+        else:
+            stream, mode = raw, "r|gz"
+        files = 0
+        manifest: dict[str, str] = {}
+        with tarfile.open(fileobj=stream, mode=mode) as tf:
+            for member in tf:
+                if member.name == _MANIFEST:
+                    data = tf.extractfile(member)
+                    assert data is not None
+                    manifest = json.loads(data.read())["blobs"]
+                    continue
+                # The "tar" filter keeps symlinks (local mounts) but refuses
+                # members that would land outside the workspace.
+                tf.extract(member, workspace, filter="tar")
+                files += 1
+    return files, manifest
+
+
+async def restore(
+    snapshot: Path,
+    workspace: Path,
+    mounts: list[MountRecord],
+    store: BlobStore | None = None,
+) -> RestoreInfo:
+    """Recreate *workspace* from *snapshot* and delete the snapshot."""
+    start = time.perf_counter()
+    store = store or default_store()
+    workspace.mkdir(parents=True, exist_ok=True)
+    files, linked = await asyncio.to_thread(_extract, snapshot, workspace)
+
+    urls = {f"mounts/{m['mount_path']}": m["url"] for m in mounts}
+    relinked = 0
+    missing = []
+    for rel, digest in linked.items():
+        dest = workspace / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if store.blob_path(digest).is_file():
+            store.materialize(digest, dest)
+            relinked += 1
+        elif rel in urls:
+            missing.append({"url": urls[rel], "mountPath": rel.removeprefix("mounts/")})
+    if missing:
+        await download_files(missing, workspace / "mounts", store=store)
+
+    snapshot.unlink(missing_ok=True)
+    return {
+        "files": files,
+        "relinked": relinked,
+        "downloaded": len(missing),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
@@ -0,0 +1,217 @@
+"""Infer a run's requirements from the imports in its code.
+
+The submitted code is parsed (never executed) and every absolute top-level
+import is classified:
+
+* standard-library modules and modules found in the workspace need nothing
+  themselves, but the workspace modules' own imports are classified too
+  (``import helper`` where ``helper.py`` imports pandas needs pandas);
+* modules with a known distribution (``import sklearn`` → ``scikit-learn``)
+  are added to the requirements unless the caller already asked for them;
+* anything else is reported as unknown and left to the caller.
+
+Default packages are installed only when the code imports them (plus their
+companions, e.g. ``openpyxl`` for ``pandas.read_excel``). The mapping table
+can be extended or overridden with a JSON object in the file named by
+``PRIMCS_IMPORT_MAP`` (``{"import_name": "distribution"}``; ``null`` marks a
+module that must never be installed automatically).
+"""
+
+import ast
+import json
+import re
+import sys
+from collections.abc import Iterable
+from functools import cache
+from pathlib import Path
+from typing import TypedDict
+
+from server.config import IMPORT_MAP_FILE
+from server.sandbox.env import _DEFAULT_PACKAGES
+
+__all__ = ["Inference", "infer", "scan_imports", "stdlib_only"]
+
+# Import names whose distribution has the same name.
+_SAME_NAME = [
+    "altair",
+    "bokeh",
+    "duckdb",
+    "geopandas",
+    "h5py",
+    "joblib",
+    "lxml",
+    "matplotlib",
+    "networkx",
+    "numpy",
+    "openpyxl",
+    "pandas",
+    "plotly",
+    "polars",
+    "pyarrow",
+    "requests",
+    "scipy",
+    "seaborn",
+    "shapely",
+    "statsmodels",
+    "sympy",
+    "tabulate",
+    "tqdm",
+    "xlrd",
+    "xlsxwriter",
+]
+_DEFAULT_MAP: dict[str, str | None] = {
+    **{name: name for name in _SAME_NAME},
+    "PIL": "pillow",
+    "Bio": "biopython",
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python-headless",
+    "dateutil": "python-dateutil",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "fitz": "pymupdf",
+    "jwt": "pyjwt",
+    "pptx": "python-pptx",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "yaml": "pyyaml",
+}
+# Packages some imports need at run time without importing them by name.
+_COMPANIONS = {"pandas": ["openpyxl"]}
+_DIST_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+class Inference(TypedDict):
+    imports: list[str]  # third-party top-level modules the code imports
+    requirements: list[str]  # what will be installed
+    added: list[str]  # inferred from imports, not passed by the caller
+    skipped_defaults: list[str]  # default packages the code does not import
+    unknown: list[str]  # imports with no known distribution
+
+
+@cache
+def _mapping() -> dict[str, str | None]:
+    mapping = dict(_DEFAULT_MAP)
+    if IMPORT_MAP_FILE:
+        with Path(IMPORT_MAP_FILE).open(encoding="utf-8") as fh:
+            mapping.update(json.load(fh))
+    return mapping
+
+
+def _normalise(dist: str) -> str:
+    return re.sub(r"[-_.]+", "-", dist).lower()
+
+
+def scan_imports(code: str) -> set[str]:
+    """Return the top-level modules *code* imports (absolute imports only).
+
+    Code that does not parse yields nothing; running it reports the error.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return set()
+    found: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name.partition(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            found.add(node.module.partition(".")[0])
+    return found
+
+
+def stdlib_only(code: str) -> bool:
+    """Whether *code* parses and imports nothing outside the standard library."""
+    try:
+        ast.parse(code)
+    except (SyntaxError, ValueError):
+        return False
+    return scan_imports(code) <= set(sys.stdlib_module_names) | {"__future__"}
+
+
+def _local_sources(workspace: Path, name: str) -> list[Path] | None:
+    """Source files of the workspace module *name*; None if it has none."""
+    package = workspace / name
+    if package.is_dir():
+        return sorted(package.rglob("*.py")) or None
+    module = workspace / f"{name}.py"
+    return [module] if module.is_file() else None
+
+
+def _with_local_imports(
+    found: set[str], local: set[str], workspace: Path
+) -> tuple[set[str], bool]:
+    """Add what the workspace modules in *found* import, transitively.
+
+    Also returns whether one of them has no readable source (e.g. a
+    compiled extension), so its imports are unknown.
+    """
+    found = set(found)
+    pending = found & local
+    seen: set[str] = set()
+    opaque = False
+    while pending:
+        name = pending.pop()
+        seen.add(name)
+        sources = _local_sources(workspace, name)
+        if sources is None:
+            opaque = True
+            continue
+        for source in sources:
+            try:
+                found |= scan_imports(source.read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                opaque = True
+        pending |= (found & local) - seen
+    return found, opaque
+
+
+def infer(
+    code: str,
+    requirements: list[str],
+    local: Iterable[str] = (),
+    defaults: list[str] | None = None,
+    workspace: Path | None = None,
+) -> Inference:
+    """Work out what to install for *code*.
+
+    *requirements* are always kept. *defaults* (the sandbox default packages
+    unless given) are kept only when imported. *local* names modules present
+    in the workspace (scripts, directories); with *workspace*, their sources
+    are scanned as well. A local module whose imports cannot be read keeps
+    every default package.
+    """
+    defaults = _DEFAULT_PACKAGES if defaults is None else defaults
+    mapping = _mapping()
+    local = set(local)
+    found, opaque = scan_imports(code), False
+    if workspace is not None:
+        found, opaque = _with_local_imports(found, local, workspace)
+    imported = sorted(found - set(sys.stdlib_module_names) - local - {"__future__"})
+    requested = {
+        _normalise(m.group(1)) for spec in requirements if (m := _DIST_NAME.match(spec))
+    }
+
+    needed: list[str] = []
+    unknown: list[str] = []
+    for name in imported:
+        if name not in mapping:
+            unknown.append(name)
+        elif dist := mapping[name]:
+            needed.extend([dist, *_COMPANIONS.get(name, [])])
+    if opaque:
+        needed.extend(defaults)
+
+    added = [
+        dist for dist in dict.fromkeys(needed) if _normalise(dist) not in requested
+    ]
+    needed_names = {_normalise(d) for d in needed}
+    skipped = [d for d in defaults if _normalise(d) not in needed_names | requested]
+    # Whatever the caller asked for might provide an unmapped module.
+    unknown = [n for n in unknown if _normalise(n) not in requested]
+    return {
+        "imports": imported,
+        "requirements": list(dict.fromkeys(requirements + added)),
+        "added": added,
+        "skipped_defaults": skipped,
+        "unknown": unknown,
+    }
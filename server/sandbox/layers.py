@@ -0,0 +1,238 @@
+"""Layered sandbox environments.
+
+Instead of installing every package into every venv, an environment is a
+stack of shared, read-only layers under ``PRIMCS_LAYER_DIR``:
+
+* the base layer – the default data stack, unless the caller leaves it out;
+* profile layers – named package sets from ``PRIMCS_ENV_PROFILES`` (ML,
+  plotting, ...), each built on the base and stacked when a request names
+  one of its packages;
+* a requirements layer – only the requested packages the layers below do not
+  already provide, built on the whole stack.
+
+A layer is a pip ``--prefix`` tree identified by a hash of its specs and of
+the layers it was built on. It is built once, byte-compiled through
+:mod:`server.sandbox.bytecode`, made read-only and reused by every later
+environment that needs it. :func:`compose` returns the stack's
+site-packages directories, topmost first; the run's venv lists them in a
+``.pth`` file, so a package in an upper layer shadows the same package
+below it.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+import venv
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from server.config import ENV_PROFILES, LAYER_DIR, LAYER_MAX_BYTES
+from server.sandbox import bytecode, quota
+
+__all__ = ["compose", "prune", "site_dirs"]
+
+logger = logging.getLogger(__name__)
+
+_BARE_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*")
+_DIST_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_BUILDING = ".building"
+_PIP = ".pip"  # the venv whose pip builds every layer
+_locks: dict[str, asyncio.Lock] = {}
+
+
+def _normalise(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _dist_name(spec: str) -> str | None:
+    match = _DIST_NAME.match(spec)
+    return _normalise(match.group(1)) if match else None
+
+
+def _key(specs: list[str], below: list[Path]) -> str:
+    payload = json.dumps([[b.name for b in below], sorted(dict.fromkeys(specs))])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def site_dirs(prefix: Path) -> list[Path]:
+    """Return the site-packages directories of the install tree at *prefix*."""
+    return sorted(
+        [*prefix.glob("lib*/python*/site-packages"), *prefix.glob("Lib/site-packages")]
+    )
+
+
+def _provided(layers: list[Path]) -> set[str]:
+    """Normalised names of the distributions installed in *layers*."""
+    return {
+        _normalise(info.name.split("-", 1)[0])
+        for layer in layers
+        for site in site_dirs(layer)
+        for info in site.glob("*.dist-info")
+    }
+
+
+def _python(venv_dir: Path) -> Path:
+    scripts = "Scripts" if sys.platform.startswith("win") else "bin"
+    return venv_dir / scripts / "python"
+
+
+def _freeze(root: Path) -> None:
+    """Make every file under *root* read-only (directories stay removable)."""
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            if not path.is_symlink():
+                path.chmod(path.stat().st_mode & ~0o222)
+
+
+@contextlib.asynccontextmanager
+async def _locked(key: str) -> AsyncIterator[None]:
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        yield
+
+
+async def _builder(root: Path) -> Path:
+    """Return the python of the venv used to run pip, creating it once."""
+    python = _python(root / _PIP)
+    async with _locked(_PIP):
+        if not python.exists():
+            await asyncio.to_thread(
+                venv.EnvBuilder(with_pip=True, clear=True).create, root / _PIP
+            )
+    return python
+
+
+async def _install(
+    python: Path, specs: list[str], prefix: Path, below: list[Path]
+) -> None:
+    # Lower layers go on pip's sys.path, so what they provide counts as
+    # installed and is not downloaded again.
+    path = [str(site) for layer in reversed(below) for site in site_dirs(layer)]
+    proc = await asyncio.create_subprocess_exec(
+        str(python),
+        "-m",
+        "pip",
+        "install",
+        "--prefix",
+        str(prefix),
+        "--no-cache-dir",
+        # Modules get their bytecode from the shared cache instead.
+        "--no-compile",
+        "--no-warn-script-location",
+        "--disable-pip-version-check",
+        *specs,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(path),
+            "PYTHONNOUSERSITE": "1",
+        },
+        preexec_fn=quota.limit_file_size(prefix, LAYER_MAX_BYTES),
+    )
+    try:
+        # Layers are shared, so the per-session quotas do not apply.
+        async with quota.enforce(prefix, proc, max_bytes=LAYER_MAX_BYTES, max_inodes=0):
+            _, err = await proc.communicate()
+    except asyncio.CancelledError:
+        # A sibling stage failed; don't leave pip running.
+        proc.kill()
+        await proc.wait()
+        raise
+    except quota.QuotaExceededError:
+        raise quota.QuotaExceededError(
+            f"pip install stopped: the environment layer for {' '.join(specs)} "
+            f"exceeds PRIMCS_LAYER_MAX_BYTES ({LAYER_MAX_BYTES} bytes). "
+            "Install fewer or smaller packages."
+        ) from None
+    if proc.returncode != 0:
+        raise RuntimeError(f"pip install failed: {err.decode()}")
+
+
+async def _layer(specs: list[str], below: list[Path], root: Path) -> Path:
+    """Return the layer holding *specs* on top of *below*, building it once."""
+    key = _key(specs, below)
+    layer = root / key
+    async with _locked(key):
+        if layer.is_dir():
+            os.utime(layer)  # last used, for prune()
+            return layer
+        python = await _builder(root)
+        staging = root / _BUILDING / f"{key}-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        try:
+            start = time.perf_counter()
+            await _install(python, specs, staging, below)
+            await asyncio.to_thread(bytecode.precompile, staging)
+            await asyncio.to_thread(_freeze, staging)
+            with contextlib.suppress(OSError):  # another server built it first
+                staging.rename(layer)
+            logger.info(
+                "Built environment layer %s (%s) in %.1fs",
+                key,
+                " ".join(specs),
+                time.perf_counter() - start,
+            )
+        finally:
+            if staging.exists():
+                await asyncio.to_thread(shutil.rmtree, staging, True)
+    return layer
+
+
+async def compose(
+    requirements: list[str], base: list[str], root: Path | None = None
+) -> list[Path]:
+    """Return the site-packages of a layer stack providing *requirements* on
+    top of the *base* packages, topmost first; missing layers are built."""
+    root = LAYER_DIR if root is None else root
+    if not requirements and not base:
+        return []
+    stack = [await _layer(base, [], root)] if base else []
+    below = list(stack)
+    wanted = {_dist_name(spec) for spec in requirements} - {None}
+    for specs in ENV_PROFILES.values():
+        if wanted & {_dist_name(spec) for spec in specs}:
+            stack.append(await _layer(specs, below, root))
+
+    # Bare names the stack already provides need no layer of their own;
+    # pinned specs go through pip, which skips them if satisfied.
+    provided = _provided(stack)
+    extras = [
+        spec
+        for spec in dict.fromkeys(requirements)
+        if not (m := _BARE_NAME.fullmatch(spec))
+        or _normalise(m.group(1)) not in provided
+    ]
+    if extras:
+        stack.append(await _layer(extras, stack, root))
+    return [site for layer in reversed(stack) for site in site_dirs(layer)]
+
+
+def prune(max_age: float, root: Path | None = None) -> int:
+    """Delete layers (and abandoned builds) unused for *max_age* seconds.
+
+    Returns the number of layers removed.
+    """
+    root = LAYER_DIR if root is None else root
+    cutoff = time.time() - max_age
+    removed = 0
+    candidates = [*root.glob("[!.]*"), *root.glob(f"{_BUILDING}/*")]
+    for path in candidates:
+        try:
+            if path.stat().st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        if path.parent == root:
+            removed += 1
+    return removed
@@ -0,0 +1,53 @@
+"""Zero-copy mounts of datasets that already live on the server host."""
+
+import os
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from server.config import LOCAL_MOUNT_ROOTS
+from server.sandbox.materialize import link_file
+
+__all__ = ["is_local_url", "link_local", "resolve_local"]
+
+# Reflinks are independent inodes that can be made read-only; hardlinks and
+# symlinks share the source's inode and therefore its permissions.
+_FILE_MODES = ("reflink", "hardlink", "symlink")
+
+
+def is_local_url(url: str) -> bool:
+    return urlsplit(url).scheme == "file"
+
+
+def resolve_local(url: str, roots: list[Path] | None = None) -> Path:
+    """Map a ``file://`` URL to a real path inside one of the allowed *roots*.
+
+    Symlinks are resolved before the check, so a link inside a root cannot
+    expose files outside it. Raises ``ValueError`` for anything else.
+    """
+    roots = LOCAL_MOUNT_ROOTS if roots is None else roots
+    parts = urlsplit(url)
+    if parts.scheme != "file" or parts.netloc not in ("", "localhost"):
+        raise ValueError(f"Not a local file URL: {url!r}")
+    if not roots:
+        raise ValueError("Local mounts are disabled; set PRIMCS_LOCAL_ROOTS.")
+    path = Path(os.path.realpath(unquote(parts.path)))
+    if not any(path.is_relative_to(os.path.realpath(root)) for root in roots):
+        raise ValueError(f"{url!r} is not under an allowed local root.")
+    if not path.exists():
+        raise FileNotFoundError(f"Local mount source does not exist: {path}")
+    return path
+
+
+def link_local(src: Path, dest: Path) -> str:
+    """Expose *src* at *dest* without copying bytes; return the link mode used.
+
+    Files are reflinked, hardlinked or symlinked, whichever the filesystem
+    allows first. Directories are symlinked. Bytes are never copied, so the
+    cost is independent of the dataset size.
+    """
+    if src.is_dir():
+        return link_file(src, dest, ("symlink",))
+    mode = link_file(src, dest, _FILE_MODES)
+    if mode == "reflink":
+        dest.chmod(0o444)
+    return mode
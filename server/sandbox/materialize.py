@@ -0,0 +1,66 @@
+"""Place a file at a new path without copying its bytes where possible."""
+
+import errno
+import os
+import shutil
+import sys
+import uuid
+from collections.abc import Sequence
+from pathlib import Path
+
+__all__ = ["link_file"]
+
+# ioctl request number for FICLONE (Linux, btrfs/xfs/overlay with reflink support).
+_FICLONE = 0x40049409
+
+_DEFAULT_MODES: tuple[str, ...] = ("hardlink", "reflink", "copy")
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is only supported on Linux")
+    import fcntl
+
+    with src.open("rb") as s, dst.open("wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            dst.unlink(missing_ok=True)
+            raise
+
+
+def link_file(src: Path, dst: Path, modes: Sequence[str] = _DEFAULT_MODES) -> str:
+    """Materialise *src* at *dst* using the first strategy in *modes* that works.
+
+    Supported strategies are ``hardlink`` (shares the inode), ``reflink``
+    (copy-on-write clone), ``symlink`` and ``copy``. The link is created
+    under a temporary name and renamed over *dst*, so concurrent callers
+    never observe (or write into) a half-created file. Returns the name of
+    the strategy that succeeded.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+
+    last_err: OSError | None = None
+    for mode in modes:
+        try:
+            if mode == "hardlink":
+                os.link(src, tmp)
+            elif mode == "reflink":
+                _reflink(src, tmp)
+            elif mode == "symlink":
+                tmp.symlink_to(src)
+            elif mode == "copy":
+                shutil.copyfile(src, tmp)
+            else:
+                raise ValueError(f"Unknown link mode: {mode}")
+        except OSError as exc:  # EXDEV, EPERM, EOPNOTSUPP, ...
+            tmp.unlink(missing_ok=True)
+            last_err = exc
+            continue
+        tmp.replace(dst)
+        # rename(2) is a no-op when both names already share an inode.
+        tmp.unlink(missing_ok=True)
+        return mode
+    raise last_err or OSError(f"Could not materialise {src} at {dst}")
@@ -0,0 +1,301 @@
+"""Embedded SQLite store of per-workspace metadata.
+
+Facts about a workspace (when it was created and last used, which
+environment it has, what is mounted, its artifact index and disk usage)
+are recorded here as they change, so the session sweep, the tools and
+later quota checks look them up by key instead of walking directory trees.
+
+The database runs in WAL mode: readers never block the writer and a
+commit is one sequential append, which keeps per-call bookkeeping cheap.
+"""
+
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, NotRequired, TypedDict
+
+from server.config import METADATA_DB
+
+__all__ = [
+    "ArtifactRow",
+    "MetadataStore",
+    "MountRecord",
+    "SessionRecord",
+    "default_store",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,          -- workspace directory name
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    env_hash TEXT,
+    disk_bytes INTEGER NOT NULL DEFAULT 0,
+    inodes INTEGER NOT NULL DEFAULT 0,
+    artifacts_indexed INTEGER NOT NULL DEFAULT 0,
+    snapshot TEXT                   -- archive path while hibernated
+);
+CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used);
+CREATE TABLE IF NOT EXISTS mounts (
+    session TEXT NOT NULL,
+    mount_path TEXT NOT NULL,
+    url TEXT NOT NULL,
+    sha256 TEXT,
+    bytes INTEGER NOT NULL,
+    mounted_at REAL NOT NULL,
+    PRIMARY KEY (session, mount_path)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    session TEXT NOT NULL,
+    relative_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (session, relative_path)
+);
+"""
+_SESSION_COLUMNS = "name, created, last_used, env_hash, disk_bytes, inodes, snapshot"
+
+
+class SessionRecord(TypedDict):
+    name: str
+    created: float
+    last_used: float
+    env_hash: str | None
+    disk_bytes: int
+    inodes: int
+    snapshot: str | None  # set while the workspace is hibernated
+
+
+class MountRecord(TypedDict):
+    mount_path: str
+    url: str
+    sha256: str | None
+    bytes: int
+    mounted_at: float
+
+
+class ArtifactRow(TypedDict):
+    size: int
+    mtime_ns: int
+    mime: str
+    sha256: NotRequired[str]
+
+
+class MetadataStore:
+    """Thread-safe access to the metadata database at *path*."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the event loop and worker threads; the
+        # lock serialises statements, each of which takes microseconds.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, sql: str, params: Iterable[Any] = ()) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(sql, tuple(params))
+
+    def _read(self, sql: str, params: Iterable[Any] = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+    def touch(self, name: str, when: float | None = None) -> None:
+        """Record use of workspace *name*, creating its record if needed."""
+        when = time.time() if when is None else when
+        self._write(
+            "INSERT INTO sessions (name, created, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET last_used = excluded.last_used",
+            (name, when, when),
+        )
+
+    def get(self, name: str) -> SessionRecord | None:
+        rows = self._read(
+            f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE name = ?",
+            (name,),
+        )
+        return SessionRecord(**dict(rows[0])) if rows else None  # type: ignore[typeddict-item]
+
+    def least_recently_used(self) -> list[SessionRecord]:
+        """Return every workspace record, least recently used first."""
+        rows = self._read(f"SELECT {_SESSION_COLUMNS} FROM sessions ORDER BY last_used")
+        return [SessionRecord(**dict(r)) for r in rows]  # type: ignore[typeddict-item]
+
+    def forget(self, name: str) -> None:
+        """Drop everything recorded about workspace *name*."""
+        with self._lock, self._conn:
+            for table, column in (
+                ("sessions", "name"),
+                ("mounts", "session"),
+                ("artifacts", "session"),
+            ):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (name,))
+
+    def copy(self, source: str, target: str) -> None:
+        """Make *target*'s records a copy of *source*'s (for a forked workspace).
+
+        Anything previously recorded about *target* is replaced; the copy
+        counts as created and used now.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            for table, column in (
+                ("sessions", "name"),
+                ("mounts", "session"),
+                ("artifacts", "session"),
+            ):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (target,))
+            self._conn.execute(
+                "INSERT INTO sessions (name, created, last_used, env_hash, "
+                "disk_bytes, inodes, artifacts_indexed) "
+                "SELECT ?, ?, ?, env_hash, disk_bytes, inodes, artifacts_indexed "
+                "FROM sessions WHERE name = ?",
+                (target, now, now, source),
+            )
+            self._conn.execute(
+                "INSERT INTO mounts "
+                "(session, mount_path, url, sha256, bytes, mounted_at) "
+                "SELECT ?, mount_path, url, sha256, bytes, mounted_at "
+                "FROM mounts WHERE session = ?",
+                (target, source),
+            )
+            self._conn.execute(
+                "INSERT INTO artifacts "
+                "(session, relative_path, size, mtime_ns, mime, sha256) "
+                "SELECT ?, relative_path, size, mtime_ns, mime, sha256 "
+                "FROM artifacts WHERE session = ?",
+                (target, source),
+            )
+
+    def set_env_hash(self, name: str, env_hash: str) -> None:
+        self.touch(name)
+        self._write("UPDATE sessions SET env_hash = ? WHERE name = ?", (env_hash, name))
+
+    def set_usage(self, name: str, disk_bytes: int, inodes: int) -> None:
+        self._write(
+            "UPDATE sessions SET disk_bytes = ?, inodes = ? WHERE name = ?",
+            (disk_bytes, inodes, name),
+        )
+
+    def set_snapshot(self, name: str, snapshot: str | None) -> None:
+        """Mark *name* as hibernated into *snapshot* (``None``: restored)."""
+        self._write("UPDATE sessions SET snapshot = ? WHERE name = ?", (snapshot, name))
+
+    def total_usage(self) -> int:
+        """Bytes recorded across all workspaces."""
+        return int(
+            self._read("SELECT COALESCE(SUM(disk_bytes), 0) FROM sessions")[0][0]
+        )
+
+    # ------------------------------------------------------------------
+    # Mounts
+    # ------------------------------------------------------------------
+    def record_mount(
+        self,
+        name: str,
+        mount_path: str,
+        url: str,
+        size: int,
+        sha256: str | None = None,
+    ) -> None:
+        self.touch(name)
+        self._write(
+            "INSERT OR REPLACE INTO mounts "
+            "(session, mount_path, url, sha256, bytes, mounted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (name, mount_path, url, sha256, size, time.time()),
+        )
+
+    def mounts(self, name: str) -> list[MountRecord]:
+        rows = self._read(
+            "SELECT mount_path, url, sha256, bytes, mounted_at FROM mounts "
+            "WHERE session = ? ORDER BY mount_path",
+            (name,),
+        )
+        return [MountRecord(**dict(r)) for r in rows]  # type: ignore[typeddict-item]
+
+    # ------------------------------------------------------------------
+    # Artifact index
+    # ------------------------------------------------------------------
+    def artifacts(self, name: str) -> dict[str, ArtifactRow] | None:
+        """Return the artifact index of *name*, or ``None`` if never built."""
+        indexed = self._read(
+            "SELECT artifacts_indexed FROM sessions WHERE name = ?", (name,)
+        )
+        if not indexed or not indexed[0][0]:
+            return None
+        entries: dict[str, ArtifactRow] = {}
+        for row in self._read(
+            "SELECT relative_path, size, mtime_ns, mime, sha256 FROM artifacts "
+            "WHERE session = ?",
+            (name,),
+        ):
+            entry: ArtifactRow = {
+                "size": row["size"],
+                "mtime_ns": row["mtime_ns"],
+                "mime": row["mime"],
+            }
+            if row["sha256"] is not None:
+                entry["sha256"] = row["sha256"]
+            entries[row["relative_path"]] = entry
+        return entries
+
+    def update_artifacts(
+        self, name: str, changed: dict[str, ArtifactRow], deleted: Iterable[str]
+    ) -> None:
+        """Apply an incremental change to the artifact index of *name*."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (name, created, last_used, artifacts_indexed) "
+                "VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET artifacts_indexed = 1",
+                (name, now, now),
+            )
+            self._conn.executemany(
+                "DELETE FROM artifacts WHERE session = ? AND relative_path = ?",
+                [(name, rel) for rel in deleted],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO artifacts "
+                "(session, relative_path, size, mtime_ns, mime, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        name,
+                        rel,
+                        e["size"],
+                        e["mtime_ns"],
+                        e["mime"],
+                        e.get("sha256"),
+                    )
+                    for rel, e in changed.items()
+                ],
+            )
+
+
+_default: MetadataStore | None = None
+
+
+def default_store() -> MetadataStore:
+    """Return the process-wide store at ``PRIMCS_METADATA_DB``."""
+    global _default
+    if _default is None:
+        _default = MetadataStore(METADATA_DB)
+    return _default
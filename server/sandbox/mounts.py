@@ -0,0 +1,208 @@
+"""Background mounts: download in the background, poll status, wait lazily."""
+
+import asyncio
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Literal, TypedDict
+
+from server.config import MOUNT_STATUS_TTL
+from server.sandbox import sessions
+from server.sandbox.downloader import MountInfo, download_files
+from server.sandbox.tabular import TabularInfo
+
+__all__ = [
+    "MountJob",
+    "MountStatus",
+    "forget_session",
+    "get_job",
+    "session_jobs",
+    "start_mount",
+    "wait_for_mounts",
+]
+
+MountState = Literal["downloading", "done", "failed"]
+
+
+class MountStatus(TypedDict, total=False):
+    mount_id: str
+    url: str
+    mounted_as: str
+    state: MountState
+    bytes_done: int
+    total_bytes: int | None
+    rate_bytes_per_s: float
+    eta_seconds: float | None
+    cache: str
+    sidecar: str
+    table: TabularInfo
+    sidecar_error: str
+    error: str
+
+
+class MountJob:
+    """A single ``mount_file`` download running in the background."""
+
+    def __init__(
+        self,
+        session_id: str,
+        url: str,
+        mount_path: str,
+        extract: bool | str = False,
+        convert: bool | str = False,
+    ) -> None:
+        self.mount_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.url = url
+        self.mount_path = Path(mount_path).as_posix()
+        self.extract = extract
+        self.convert = convert
+        self.state: MountState = "downloading"
+        self.bytes_done = 0
+        self.total_bytes: int | None = None
+        self.started_at = time.monotonic()
+        self.finished_at: float | None = None
+        self.info: MountInfo | None = None
+        self.error: str | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def _progress(self, _mount_path: str, done: int, total: int | None) -> None:
+        self.bytes_done, self.total_bytes = done, total
+
+    async def _run(self, mounts_dir: Path) -> None:
+        spec = {
+            "url": self.url,
+            "mountPath": self.mount_path,
+            "extract": self.extract,
+            "convert": self.convert,
+        }
+        try:
+            # The session must not be evicted under a running download.
+            async with sessions.in_use(mounts_dir.parent):
+                [self.info] = await download_files(
+                    [spec], mounts_dir, progress=self._progress
+                )
+        except asyncio.CancelledError:
+            self.state, self.error = "failed", "cancelled"
+            raise
+        except Exception as exc:  # noqa: BLE001 - reported through status()
+            self.state, self.error = "failed", str(exc) or type(exc).__name__
+        else:
+            sessions.record_mounts(mounts_dir.parent, [self.info])
+            sessions.measure(mounts_dir.parent)
+            self.state = "done"
+            self.bytes_done = self.total_bytes = self.info["bytes"]
+        finally:
+            self.finished_at = time.monotonic()
+
+    def status(self) -> MountStatus:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        rate = self.bytes_done / elapsed if elapsed > 0 else 0.0
+        eta: float | None = None
+        if self.state == "done":
+            eta = 0.0
+        elif self.total_bytes is not None and rate > 0:
+            eta = max(self.total_bytes - self.bytes_done, 0) / rate
+
+        status: MountStatus = {
+            "mount_id": self.mount_id,
+            "url": self.url,
+            "mounted_as": f"mounts/{self.mount_path}",
+            "state": self.state,
+            "bytes_done": self.bytes_done,
+            "total_bytes": self.total_bytes,
+            "rate_bytes_per_s": round(rate, 1),
+            "eta_seconds": None if eta is None else round(eta, 2),
+        }
+        if self.info is not None:
+            status["cache"] = self.info["cache"]
+            if "table" in self.info:
+                status["sidecar"] = f"mounts/{self.info['sidecar']}"
+                status["table"] = self.info["table"]
+            if "sidecar_error" in self.info:
+                status["sidecar_error"] = self.info["sidecar_error"]
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+_jobs: dict[str, MountJob] = {}
+
+
+def _prune(now: float | None = None) -> None:
+    """Drop jobs that finished more than ``MOUNT_STATUS_TTL`` seconds ago."""
+    now = time.monotonic() if now is None else now
+    for mount_id, job in list(_jobs.items()):
+        if job.finished_at is not None and now - job.finished_at > MOUNT_STATUS_TTL:
+            del _jobs[mount_id]
+
+
+def start_mount(
+    session_id: str,
+    url: str,
+    mount_path: str,
+    mounts_dir: Path,
+    extract: bool | str = False,
+    convert: bool | str = False,
+) -> MountJob:
+    """Start downloading *url* to ``mounts_dir/mount_path`` in the background."""
+    _prune()
+    job = MountJob(session_id, url, mount_path, extract, convert)
+    job.task = asyncio.create_task(job._run(mounts_dir))
+    _jobs[job.mount_id] = job
+    return job
+
+
+def get_job(mount_id: str) -> MountJob | None:
+    _prune()
+    return _jobs.get(mount_id)
+
+
+def session_jobs(session_id: str) -> list[MountJob]:
+    _prune()
+    return [j for j in _jobs.values() if j.session_id == session_id]
+
+
+def forget_session(session_id: str) -> None:
+    """Cancel and drop every mount job of a session whose workspace is gone."""
+    for job in session_jobs(session_id):
+        if job.task is not None:
+            job.task.cancel()
+        del _jobs[job.mount_id]
+
+
+def _needed_by(code: str, pending: list[MountJob]) -> list[MountJob]:
+    """Pick the pending mounts *code* depends on.
+
+    Mounts whose path appears literally in the code are needed. If none
+    does but the code still touches ``mounts`` (e.g. by listing the
+    directory), every pending mount is assumed to be needed.
+    """
+    referenced = [j for j in pending if j.mount_path in code]
+    if referenced:
+        return referenced
+    if re.search(r"\bmounts\b", code):
+        return pending
+    return []
+
+
+async def wait_for_mounts(session_id: str, code: str) -> list[MountJob]:
+    """Block until the session's background mounts needed by *code* finish.
+
+    Raises ``RuntimeError`` if any awaited mount failed. Returns the jobs
+    that were waited for.
+    """
+    pending = [j for j in session_jobs(session_id) if j.state == "downloading"]
+    needed = _needed_by(code, pending)
+    tasks = [j.task for j in needed if j.task is not None]
+    if tasks:
+        # asyncio.wait (unlike gather) never cancels the shared jobs if the
+        # waiting run is itself cancelled.
+        await asyncio.wait(tasks)
+
+    failed = [j for j in needed if j.state == "failed"]
+    if failed:
+        details = "; ".join(f"mounts/{j.mount_path}: {j.error}" for j in failed)
+        raise RuntimeError(f"Background mount failed: {details}")
+    return needed
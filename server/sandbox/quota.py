@@ -0,0 +1,157 @@
+"""Per-session disk and inode quotas.
+
+Usage recorded in the metadata store is checked before anything is
+downloaded or uploaded into a workspace. While pip or user code runs,
+quotas are enforced in two ways:
+
+* ``RLIMIT_FSIZE`` caps every file the process writes at the byte quota;
+  the kernel fails a runaway write at once (``EFBIG``, "File too large",
+  in Python, which ignores the ``SIGXFSZ`` other programs are killed by);
+* the tree it writes to is sampled every ``PRIMCS_QUOTA_SAMPLE_INTERVAL``
+  seconds and the process is killed once it is over either quota.
+
+Installed packages are not part of any session's quota: pip builds shared
+environment layers outside the workspaces (see :mod:`server.sandbox.layers`),
+each held to ``PRIMCS_LAYER_MAX_BYTES`` instead. Nor is mounted data, which
+is read-only (see :func:`server.sandbox.sessions.tree_usage`). A session
+that is already over quota can therefore still run code that deletes files.
+
+Stateless workspaces in RAM (see :mod:`server.sandbox.tmpfs`) are held to
+the tighter of the byte quota and ``PRIMCS_EPHEMERAL_MAX_BYTES``.
+
+A process killed by the sampler or by ``SIGXFSZ`` surfaces as a
+:class:`QuotaExceededError`; other sessions on the host are unaffected.
+"""
+
+import asyncio
+import contextlib
+import signal
+import sys
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+from server.config import (
+    EPHEMERAL_MAX_BYTES,
+    QUOTA_BYTES,
+    QUOTA_INODES,
+    QUOTA_SAMPLE_INTERVAL,
+)
+from server.sandbox import metadata, sessions, tmpfs
+
+__all__ = ["QuotaExceededError", "check", "enforce", "limit_file_size"]
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a session workspace outgrows its disk or inode quota."""
+
+
+def byte_limit(path: Path) -> int:
+    """Return the byte quota of the workspace holding *path* (0: unlimited)."""
+    limits = [QUOTA_BYTES]
+    if tmpfs.is_ephemeral(path):
+        limits.append(EPHEMERAL_MAX_BYTES)
+    return min((n for n in limits if n), default=0)
+
+
+def _violation(
+    disk_bytes: int, inodes: int, max_bytes: int, max_inodes: int | None = None
+) -> str | None:
+    max_inodes = QUOTA_INODES if max_inodes is None else max_inodes
+    if max_bytes and disk_bytes > max_bytes:
+        return (
+            f"Session disk quota exceeded: {disk_bytes} bytes used, "
+            f"limit {max_bytes} bytes"
+        )
+    if max_inodes and inodes > max_inodes:
+        return (
+            f"Session inode quota exceeded: {inodes} files and directories, "
+            f"limit {max_inodes}"
+        )
+    return None
+
+
+def check(workspace: Path, incoming_bytes: int = 0) -> None:
+    """Raise unless *workspace* has room for *incoming_bytes* more.
+
+    Uses the usage last recorded in the metadata store, so it costs one
+    lookup rather than a walk of the workspace.
+    """
+    record = metadata.default_store().get(workspace.name)
+    disk_bytes = (record["disk_bytes"] if record else 0) + incoming_bytes
+    inodes = record["inodes"] if record else 0
+    if message := _violation(disk_bytes, inodes, byte_limit(workspace)):
+        raise QuotaExceededError(message)
+
+
+def limit_file_size(
+    path: Path, max_bytes: int | None = None
+) -> Callable[[], None] | None:
+    """Return a ``preexec_fn`` capping file sizes at *path*'s byte quota
+    (or at *max_bytes*, if given)."""
+    max_bytes = byte_limit(path) if max_bytes is None else max_bytes
+    if not max_bytes or sys.platform.startswith("win"):
+        return None
+
+    def set_limit() -> None:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_bytes, max_bytes))
+
+    return set_limit
+
+
+async def _sample(
+    root: Path,
+    proc: asyncio.subprocess.Process,
+    interval: float,
+    breach: list[str],
+    max_bytes: int,
+    max_inodes: int,
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        disk_bytes, inodes = await asyncio.to_thread(sessions.tree_usage, root)
+        if message := _violation(disk_bytes, inodes, max_bytes, max_inodes):
+            breach.append(message)
+            proc.kill()
+            return
+
+
+@contextlib.asynccontextmanager
+async def enforce(
+    root: Path,
+    proc: asyncio.subprocess.Process,
+    interval: float = QUOTA_SAMPLE_INTERVAL,
+    max_bytes: int | None = None,
+    max_inodes: int | None = None,
+) -> AsyncIterator[None]:
+    """Kill *proc* if the tree at *root* goes over quota while the block runs.
+
+    The session quotas apply unless *max_bytes* / *max_inodes* are given
+    (0 disables a limit). Start *proc* with ``preexec_fn=limit_file_size``
+    for the same byte limit. Once the block has waited for the process,
+    :class:`QuotaExceededError` is raised if it was killed by the sampler or
+    by ``SIGXFSZ``.
+    """
+    max_bytes = byte_limit(root) if max_bytes is None else max_bytes
+    max_inodes = QUOTA_INODES if max_inodes is None else max_inodes
+    if not (max_bytes or max_inodes):
+        yield
+        return
+    breach: list[str] = []
+    sampler = asyncio.create_task(
+        _sample(root, proc, interval, breach, max_bytes, max_inodes)
+    )
+    try:
+        yield
+    finally:
+        sampler.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await sampler
+    if breach:
+        raise QuotaExceededError(breach[0])
+    sigxfsz = getattr(signal, "SIGXFSZ", None)
+    if sigxfsz is not None and proc.returncode == -sigxfsz:
+        raise QuotaExceededError(
+            f"Session disk quota exceeded: a file grew past {max_bytes} bytes"
+        )
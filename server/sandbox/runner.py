@@ -1,26 +1,25 @@
 """Orchestrate sandbox execution of untrusted Python code."""
 
 import asyncio
-import mimetypes
-import shutil
+import sys
 import textwrap
-from typing import TypedDict
-
-from server.config import TIMEOUT_SECONDS, TMP_DIR
-from server.sandbox.downloader import download_files
-from server.sandbox.env import create_virtualenv
+import time
+from collections.abc import Awaitable
+from pathlib import Path
+from typing import Any, TypedDict
+
+from server.config import FAST_LANE, INFER_REQUIREMENTS, TIMEOUT_SECONDS, TMP_DIR
+from server.sandbox import imports, quota, sessions, tmpfs
+from server.sandbox.artifacts import ArtifactIndex, ArtifactMeta
+from server.sandbox.downloader import MountInfo, download_files
+from server.sandbox.env import create_virtualenv, env_hash
+from server.sandbox.metadata import default_store as metadata_store
+from server.sandbox.mounts import wait_for_mounts
+from server.sandbox.watcher import ArtifactEventFn, OutputWatcher
 
 __all__ = ["run_code"]
 
 
-# Precise schema for each artifact entry.
-class ArtifactMeta(TypedDict):
-    name: str
-    relative_path: str
-    size: int
-    mime: str
-
-
 # Typed return for run_code results.
 class RunCodeResult(TypedDict, total=False):
     """Result of running code in the sandbox.
@@ -29,78 +28,206 @@ class RunCodeResult(TypedDict, total=False):
 
     stdout: str
     stderr: str
-    artifacts: list[ArtifactMeta]
+    artifacts: list[ArtifactMeta]  # created or modified by this run
+    deleted_artifacts: list[str]  # removed since the previous run
+    mounts: list[MountInfo]
+    timings: dict[str, float]  # seconds per pipeline stage
+    inferred: imports.Inference  # requirements derived from the code's imports
+    lane: str  # "stdlib" (base interpreter, no venv) or "venv"
     feedback: str
 
 
+async def _run_stages(
+    stages: dict[str, Awaitable[Any]], timings: dict[str, float]
+) -> dict[str, Any]:
+    """Run independent *stages* concurrently and return their results by name.
+
+    Each stage's duration is recorded in *timings*. If any stage fails, the
+    remaining ones are cancelled before the error is re-raised.
+    """
+
+    async def timed(name: str, stage: Awaitable[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await stage
+        finally:
+            timings[name] = round(time.perf_counter() - start, 4)
+
+    tasks = {
+        name: asyncio.create_task(timed(name, stage)) for name, stage in stages.items()
+    }
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}
+
+
 async def run_code(
     *,
     code: str,
     requirements: list[str],
-    files: list[dict[str, str]],
+    files: list[dict[str, Any]],
     run_id: str,
     session_id: str | None = None,
+    on_artifact: ArtifactEventFn | None = None,
 ) -> RunCodeResult:
-    """Execute *code* inside an isolated virtual-env and return captured output. Artifacts are returned as paths relative to the output directory. Only files inside output/ are included."""
+    """Execute *code* inside an isolated virtual-env and return captured output. Artifacts are returned as paths relative to the output directory. Only files inside output/ are included, and only those created or modified since the previous run of the session (see ``list_artifacts`` for everything).
+
+    Mount downloads, environment build and script staging are independent and
+    run concurrently; the duration of every stage is reported in ``timings``.
+    While the code runs, ``output/`` is watched and *on_artifact*, if given,
+    is awaited for every artifact created, completed or deleted.
+
+    The workspace is protected from session eviction while the code runs;
+    a stateless workspace is deleted in the background once the result has
+    been collected.
+    """
+    started = time.perf_counter()
 
     if session_id:
         # Persist workspace for the lifetime of the client session.
         work = TMP_DIR / f"session_{session_id}"
         work.mkdir(parents=True, exist_ok=True)
     else:
-        # Legacy per-run workspace (stateless behaviour).
-        work = TMP_DIR / f"run_{run_id}"
-        if work.exists():
-            shutil.rmtree(work)
+        # Legacy per-run workspace (stateless behaviour), in RAM if possible.
+        work = tmpfs.ephemeral_root(TMP_DIR) / f"run_{run_id}"
+        sessions.discard(work)  # leftover from an earlier run with this id
         work.mkdir(parents=True, exist_ok=True)
 
+    async with sessions.in_use(work):
+        try:
+            return await _execute(
+                work,
+                code,
+                requirements,
+                files,
+                run_id,
+                session_id,
+                on_artifact,
+                started,
+            )
+        finally:
+            if not session_id:
+                sessions.discard(work)
+
+
+async def _execute(
+    work: Path,
+    code: str,
+    requirements: list[str],
+    files: list[dict[str, Any]],
+    run_id: str,
+    session_id: str | None,
+    on_artifact: ArtifactEventFn | None,
+    started: float,
+) -> RunCodeResult:
+    timings: dict[str, float] = {}
+
+    if files:
+        quota.check(work)  # before downloading anything more into it
+
     # Ensure mounts directory exists for all modes.
     (work / "mounts").mkdir(parents=True, exist_ok=True)
     # Directory where user code should place output/artifacts.
     (work / "output").mkdir(parents=True, exist_ok=True)
 
-    await download_files(files, work / "mounts")
-
-    py = await create_virtualenv(requirements, work)
-
-    script_name = f"script_{run_id}.py" if session_id else "script.py"
-    script = work / script_name
-    script.write_text(textwrap.dedent(code))
-
-    proc = await asyncio.create_subprocess_exec(
-        str(py),
-        str(script),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        cwd=work,
+    async def stage_mounts() -> list[MountInfo]:
+        mounted = await download_files(files, work / "mounts")
+        if session_id:
+            # Background mounts (mount_file background=true) this code needs.
+            await wait_for_mounts(session_id, code)
+        return mounted
+
+    async def stage_script() -> Path:
+        script_name = f"script_{run_id}.py" if session_id else "script.py"
+        script = work / script_name
+        script.write_text(textwrap.dedent(code))
+        return script
+
+    # Fast lane: pure-stdlib code needs no environment at all.
+    lane = (
+        "stdlib"
+        if FAST_LANE and not requirements and imports.stdlib_only(code)
+        else "venv"
     )
-
-    try:
-        out, err = await asyncio.wait_for(proc.communicate(), timeout=TIMEOUT_SECONDS)
-    except TimeoutError as err:
-        proc.kill()
-        await proc.wait()
-        msg = f"Execution timed out after {TIMEOUT_SECONDS}s"
-        raise RuntimeError(msg) from err
-
-    # Collect artifacts inside the output directory.
-    artifacts: list[ArtifactMeta] = []
-    output_dir = work / "output"
-    for p in output_dir.rglob("*"):
-        if p.is_file():
-            try:
-                rel_path = p.relative_to(output_dir)
-            except ValueError:
-                continue  # skip files not in output_dir
-            size = p.stat().st_size
-            mime, _ = mimetypes.guess_type(str(p))
-            artifacts.append(
-                {
-                    "name": rel_path.name,
-                    "relative_path": rel_path.as_posix(),
-                    "size": size,
-                    "mime": mime or "application/octet-stream",
-                }
-            )
-
-    return {"stdout": out.decode(), "stderr": err.decode(), "artifacts": artifacts}
+    stages: dict[str, Awaitable[Any]] = {
+        "mounts": stage_mounts(),
+        "script": stage_script(),
+    }
+    inferred: imports.Inference | None = None
+    defaults: list[str] | None = None  # the sandbox default packages
+    if lane == "venv":
+        if INFER_REQUIREMENTS:
+            # "helper" for helper.py, a helper/ package or helper.cpython-*.so
+            local = {p.name.partition(".")[0] for p in work.iterdir()}
+            inferred = imports.infer(code, requirements, local, workspace=work)
+            requirements, defaults = inferred["requirements"], []
+        stages["environment"] = create_virtualenv(requirements, work, defaults)
+
+    stage_start = time.perf_counter()
+    staged = await _run_stages(stages, timings)
+    timings["setup"] = round(time.perf_counter() - stage_start, 4)
+    mounts, script = staged["mounts"], staged["script"]
+    if lane == "venv":
+        command = [str(staged["environment"]), str(script)]
+    else:
+        # -I: ignore PYTHON* variables and user site; -S: no site-packages.
+        command = [sys.executable, "-I", "-S", str(script)]
+    if session_id:
+        if lane == "venv":
+            metadata_store().set_env_hash(work.name, env_hash(requirements, defaults))
+        sessions.record_mounts(work, mounts)
+
+    exec_start = time.perf_counter()
+    async with OutputWatcher(work / "output", on_artifact) as watcher:
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=work,
+            preexec_fn=quota.limit_file_size(work),
+        )
+
+        try:
+            async with quota.enforce(work, proc):
+                out, err = await asyncio.wait_for(
+                    proc.communicate(), timeout=TIMEOUT_SECONDS
+                )
+        except TimeoutError as err:
+            proc.kill()
+            await proc.wait()
+            msg = f"Execution timed out after {TIMEOUT_SECONDS}s"
+            raise RuntimeError(msg) from err
+    timings["execute"] = round(time.perf_counter() - exec_start, 4)
+
+    # Only report what changed in output/ since the previous run. The
+    # watcher's event log names the files to check; a full scan is needed
+    # only for a brand-new index or when events were lost.
+    collect_start = time.perf_counter()
+    index = ArtifactIndex(work)
+    changes = index.refresh(None if index.is_new else watcher.paths())
+    artifacts = changes["created"] + changes["modified"]
+
+    timings["artifacts"] = round(time.perf_counter() - collect_start, 4)
+    timings["total"] = round(time.perf_counter() - started, 4)
+
+    result: RunCodeResult = {
+        "stdout": out.decode(),
+        "stderr": err.decode(),
+        "artifacts": artifacts,
+        "timings": timings,
+        "lane": lane,
+    }
+    if changes["deleted"]:
+        result["deleted_artifacts"] = changes["deleted"]
+    if session_id:
+        sessions.measure(work)  # off the response path
+    if mounts:
+        result["mounts"] = mounts
+    if inferred is not None:
+        result["inferred"] = inferred
+    return result
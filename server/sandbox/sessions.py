@@ -0,0 +1,458 @@
+"""Session lifecycle: track workspace use and reclaim disk.
+
+Every workspace under ``TMP_DIR`` (``session_<id>`` and stateless
+``run_<id>``) is tracked by last access in the metadata store, which also
+holds each workspace's disk usage and mounts. A background sweep deletes
+workspaces idle for longer than ``PRIMCS_SESSION_TTL`` and, whenever the
+filesystem is fuller than ``PRIMCS_DISK_HIGH_WATER``, evicts idle
+workspaces least recently used first. Workspaces in use by a running call
+are never evicted.
+
+Before that, sessions idle for ``PRIMCS_HIBERNATE_AFTER`` are hibernated:
+archived into ``hibernated/`` and removed from disk. The next tool call or
+HTTP request for the session restores it transparently (see
+:class:`RestoreMiddleware` and :func:`ensure_ready`).
+
+Deletion is moved off the request path: a workspace is first renamed into
+``.trash/`` (instant, and the name is free again) and then removed in a
+worker thread.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator, Iterable
+from pathlib import Path
+from typing import Any, TypedDict
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+from server import metrics
+from server.config import (
+    DISK_HIGH_WATER,
+    GC_INTERVAL,
+    HIBERNATE_AFTER,
+    SESSION_TTL,
+    TMP_DIR,
+)
+from server.sandbox import (
+    blobstore,
+    bytecode,
+    hibernate,
+    layers,
+    metadata,
+    mounts,
+    tmpfs,
+)
+from server.sandbox.downloader import MountInfo
+
+__all__ = [
+    "FORK_STAGING",
+    "RestoreMiddleware",
+    "SweepResult",
+    "discard",
+    "ensure_ready",
+    "in_use",
+    "last_used",
+    "lifespan",
+    "measure",
+    "reconcile",
+    "record_mounts",
+    "sweep",
+    "touch",
+    "tree_usage",
+    "valid_id",
+]
+
+logger = logging.getLogger(__name__)
+
+_PREFIXES = ("session_", "run_")
+_TRASH = ".trash"
+FORK_STAGING = ".forking"  # where fork.py builds forks before renaming them
+_SNAPSHOTS = "hibernated"
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+_active: Counter[str] = Counter()  # workspace name -> calls in progress
+_deletions: set[asyncio.Task[None]] = set()
+_measurements: set[asyncio.Task[None]] = set()
+# Serialises hibernation and restore of the same workspace.
+_locks: dict[str, asyncio.Lock] = {}
+
+
+class SweepResult(TypedDict):
+    expired: list[str]  # idle for longer than the TTL
+    hibernated: list[str]  # archived to hibernated/
+    evicted: list[str]  # removed to get below the disk high-water mark
+    disk_used: float  # fraction of the filesystem in use afterwards
+
+
+def valid_id(session_id: str) -> bool:
+    """Whether *session_id* is safe to name a ``session_<id>`` workspace with."""
+    return bool(_SESSION_ID.fullmatch(session_id))
+
+
+def _is_workspace(name: str) -> bool:
+    # Everything else under TMP_DIR (blobs/, layers/, ...) is a shared store.
+    return name.startswith(_PREFIXES)
+
+
+def touch(workspace: Path) -> None:
+    """Record that *workspace* was just used (if it exists)."""
+    if _is_workspace(workspace.name) and workspace.is_dir():
+        metadata.default_store().touch(workspace.name)
+
+
+def last_used(workspace: Path) -> float:
+    """Return when *workspace* was last used (Unix time)."""
+    record = metadata.default_store().get(workspace.name)
+    if record is not None:
+        return record["last_used"]
+    try:
+        return workspace.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def record_mounts(workspace: Path, mounts: Iterable[MountInfo]) -> None:
+    """Remember what was mounted into *workspace* and from where."""
+    store = metadata.default_store()
+    for info in mounts:
+        store.record_mount(
+            workspace.name,
+            info["mount_path"],
+            info["url"],
+            info["bytes"],
+            info.get("sha256"),
+        )
+
+
+def tree_usage(root: Path) -> tuple[int, int]:
+    """Return ``(bytes, inodes)`` used by the files and directories below *root*.
+
+    Read-only files under ``mounts/`` are left out: they are mounted data
+    (shared blobs, extracted archives, uploads) the session cannot shrink,
+    and most of them take no space of their own.
+    """
+    total = inodes = 0
+    stack = [(root, False)]
+    while stack:
+        path, in_mounts = stack.pop()
+        try:
+            entries = list(os.scandir(path))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    mounts = in_mounts or (path == root and entry.name == "mounts")
+                    stack.append((Path(entry.path), mounts))
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    if in_mounts and not st.st_mode & 0o222:
+                        continue
+                    total += st.st_size
+            except FileNotFoundError:
+                continue
+            inodes += 1
+    return total, inodes
+
+
+async def _measure(workspace: Path) -> None:
+    disk_bytes, inodes = await asyncio.to_thread(tree_usage, workspace)
+    metadata.default_store().set_usage(workspace.name, disk_bytes, inodes)
+
+
+def measure(workspace: Path) -> asyncio.Task[None]:
+    """Record the disk usage of *workspace* in the background."""
+    task = asyncio.get_running_loop().create_task(_measure(workspace))
+    _measurements.add(task)
+    task.add_done_callback(_measurements.discard)
+    return task
+
+
+@contextlib.asynccontextmanager
+async def in_use(workspace: Path) -> AsyncIterator[None]:
+    """Protect *workspace* from eviction for the duration of the block."""
+    touch(workspace)
+    _active[workspace.name] += 1
+    try:
+        yield
+    finally:
+        _active[workspace.name] -= 1
+        if not _active[workspace.name]:
+            del _active[workspace.name]
+        touch(workspace)
+
+
+def _remove(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _forget(task: asyncio.Task[None]) -> None:
+    _deletions.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Deleting workspace failed", exc_info=task.exception())
+
+
+def discard(workspace: Path) -> asyncio.Task[None] | None:
+    """Delete *workspace* without blocking the caller.
+
+    The directory is renamed into ``.trash/`` right away and removed in a
+    worker thread. Returns the deletion task (``None`` if there was nothing
+    to delete). A hibernated workspace's snapshot is deleted as well.
+    """
+    store = metadata.default_store()
+    record = store.get(workspace.name)
+    if record and record["snapshot"]:
+        Path(record["snapshot"]).unlink(missing_ok=True)
+    store.forget(workspace.name)
+    _locks.pop(workspace.name, None)
+    mounts.forget_session(workspace.name.removeprefix("session_"))
+    return _trash(workspace)
+
+
+def _trash(workspace: Path) -> asyncio.Task[None] | None:
+    trash = workspace.parent / _TRASH
+    trash.mkdir(exist_ok=True)
+    doomed = trash / f"{workspace.name}.{uuid.uuid4().hex}"
+    try:
+        workspace.rename(doomed)
+    except FileNotFoundError:
+        return None
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(_remove, doomed))
+    _deletions.add(task)
+    task.add_done_callback(_forget)
+    return task
+
+
+def reconcile(root: Path | None = None) -> None:
+    """Align the store with the workspaces actually on disk.
+
+    Run at startup: workspaces created before the store existed (or while
+    it was unavailable) are registered with their directory mtime as last
+    use, and records of workspaces deleted behind the server's back are
+    dropped. Afterwards the sweep works from the store alone.
+    """
+    root = TMP_DIR if root is None else root
+    store = metadata.default_store()
+    known = {r["name"] for r in store.least_recently_used()}
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        entries = []
+    present = set()
+    for entry in entries:
+        if entry.name.startswith(_PREFIXES) and entry.is_dir(follow_symlinks=False):
+            present.add(entry.name)
+            if entry.name not in known:
+                store.touch(entry.name, entry.stat().st_mtime)
+    for name in known - present:
+        record = store.get(name)
+        if record and record["snapshot"] and Path(record["snapshot"]).is_file():
+            continue  # hibernated
+        store.forget(name)
+
+
+def _lock(name: str) -> asyncio.Lock:
+    return _locks.setdefault(name, asyncio.Lock())
+
+
+async def ensure_ready(workspace: Path) -> hibernate.RestoreInfo | None:
+    """Restore *workspace* if it is hibernated; return what was restored."""
+    store = metadata.default_store()
+    record = store.get(workspace.name)
+    if record is None or record["snapshot"] is None:
+        return None
+    async with _lock(workspace.name):
+        record = store.get(workspace.name)  # restored while we waited?
+        if record is None or record["snapshot"] is None:
+            return None
+        info = await hibernate.restore(
+            Path(record["snapshot"]), workspace, store.mounts(workspace.name)
+        )
+        store.set_snapshot(workspace.name, None)
+        store.touch(workspace.name)
+    metrics.RESTORE_SECONDS.observe(info["seconds"])
+    logger.info("Restored %s in %.3fs", workspace.name, info["seconds"])
+    return info
+
+
+async def _hibernate(workspace: Path) -> bool:
+    name = workspace.name
+    store = metadata.default_store()
+    async with _lock(name):
+        if name in _active or not workspace.is_dir():
+            return False
+        info = await asyncio.to_thread(
+            hibernate.hibernate,
+            workspace,
+            workspace.parent / _SNAPSHOTS,
+            store.mounts(name),
+        )
+        if name in _active:
+            # A call started using the workspace while it was archived.
+            Path(info["path"]).unlink(missing_ok=True)
+            return False
+        store.set_snapshot(name, info["path"])
+        task = _trash(workspace)
+    if task is not None:
+        await task
+    metrics.HIBERNATIONS.inc()
+    return True
+
+
+def _disk_used(root: Path) -> float:
+    usage = shutil.disk_usage(root)
+    return usage.used / usage.total if usage.total else 0.0
+
+
+def _trash_leftovers(root: Path) -> list[Path]:
+    """Return workspaces a restart left half-deleted in ``.trash/``."""
+    if _deletions:
+        return []  # deletions are still running; leave the trash alone
+    try:
+        return [Path(e.path) for e in os.scandir(root / _TRASH)]
+    except FileNotFoundError:
+        return []
+
+
+def _fork_leftovers(root: Path) -> list[Path]:
+    """Return fork staging directories whose fork is no longer running."""
+    try:
+        entries = list(os.scandir(root / FORK_STAGING))
+    except FileNotFoundError:
+        return []
+    # Staging names are "<target>.<hex>"; a running fork holds its target.
+    return [Path(e.path) for e in entries if e.name.rsplit(".", 1)[0] not in _active]
+
+
+async def _evict(workspace: Path) -> None:
+    task = discard(workspace)
+    if task is not None:
+        await task
+
+
+async def sweep(
+    now: float | None = None,
+    ttl: float = SESSION_TTL,
+    high_water: float = DISK_HIGH_WATER,
+    hibernate_after: float = HIBERNATE_AFTER,
+) -> SweepResult:
+    """Delete expired workspaces, hibernate idle sessions, then evict LRU
+    workspaces while the disk is full."""
+    now = time.time() if now is None else now
+    root = TMP_DIR
+    result: SweepResult = {
+        "expired": [],
+        "hibernated": [],
+        "evicted": [],
+        "disk_used": 0.0,
+    }
+
+    # Leftovers of deletions and forks interrupted by a restart.
+    for leftover in _trash_leftovers(root) + _fork_leftovers(root):
+        await asyncio.to_thread(_remove, leftover)
+
+    # Least recently used first, straight from the store's index.
+    idle = []
+    for r in metadata.default_store().least_recently_used():
+        if not _is_workspace(r["name"]):
+            # Never a workspace, so never something to delete.
+            logger.warning("Dropping session record for %r", r["name"])
+            metadata.default_store().forget(r["name"])
+        elif r["name"] not in _active:
+            idle.append((root / r["name"], r))
+    if ttl > 0:
+        while idle and now - idle[0][1]["last_used"] > ttl:
+            workspace, record = idle.pop(0)
+            await _evict(workspace)
+            result["expired"].append(workspace.name)
+
+    if hibernate_after > 0:
+        for workspace, record in idle:
+            if (
+                workspace.name.startswith("session_")
+                and not record["snapshot"]
+                and now - record["last_used"] > hibernate_after
+                and await _hibernate(workspace)
+            ):
+                result["hibernated"].append(workspace.name)
+        idle = [(w, metadata.default_store().get(w.name) or r) for w, r in idle]
+
+    used = await asyncio.to_thread(_disk_used, root)
+    while used > high_water and idle:
+        workspace, record = idle.pop(0)
+        await _evict(workspace)
+        result["evicted"].append(workspace.name)
+        used = await asyncio.to_thread(_disk_used, root)
+    result["disk_used"] = round(used, 4)
+
+    if result["expired"] or result["evicted"]:
+        # Mounts of the removed workspaces no longer pin their blobs.
+        blobstore.default_store().evict()
+        logger.info(
+            "Session sweep removed %d expired and %d evicted workspaces",
+            len(result["expired"]),
+            len(result["evicted"]),
+        )
+    if ttl > 0:
+        # Environment layers no run has used for a while, then compiled
+        # modules no remaining environment or layer links to.
+        await asyncio.to_thread(layers.prune, ttl)
+        await asyncio.to_thread(bytecode.prune, ttl)
+    if result["hibernated"]:
+        logger.info("Session sweep hibernated %d workspaces", len(result["hibernated"]))
+    return result
+
+
+async def _sweep_forever(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep()
+        except Exception:  # noqa: BLE001 - keep sweeping
+            logger.exception("Session sweep failed")
+
+
+class RestoreMiddleware(Middleware):
+    """Restore a hibernated session before any tool call touches it.
+
+    The workspace is also marked in use for the duration of the call, so
+    it cannot be hibernated or evicted underneath the tool.
+    """
+
+    async def on_call_tool(
+        self, context: MiddlewareContext[Any], call_next: CallNext[Any, Any]
+    ) -> Any:
+        ctx = context.fastmcp_context
+        sid = ctx.session_id if ctx else None
+        if not sid and ctx and ctx.request_context and ctx.request_context.request:
+            sid = ctx.request_context.request.headers.get("mcp-session-id")
+        if not sid or not valid_id(sid):
+            return await call_next(context)  # the tool rejects a bad id
+        workspace = TMP_DIR / f"session_{sid}"
+        async with in_use(workspace):
+            await ensure_ready(workspace)
+            return await call_next(context)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_server: Any) -> AsyncIterator[None]:
+    """FastMCP lifespan that runs the session sweeper in the background."""
+    await asyncio.to_thread(reconcile)
+    await asyncio.to_thread(tmpfs.clear)
+    sweeper = asyncio.create_task(_sweep_forever(GC_INTERVAL))
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await sweeper
+        if _deletions:
+            await asyncio.gather(*_deletions, return_exceptions=True)
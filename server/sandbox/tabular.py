@@ -0,0 +1,97 @@
+"""Convert tabular mounts (CSV/TSV/JSON lines) to Parquet or Feather sidecars."""
+
+from pathlib import Path
+from typing import Any, TypedDict
+
+__all__ = ["FORMATS", "TabularInfo", "convert_table", "detect_kind", "sidecar_name"]
+
+FORMATS = {"parquet", "feather"}
+
+_KINDS: dict[str, str] = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+class TabularInfo(TypedDict):
+    format: str  # parquet or feather
+    rows: int
+    columns: dict[str, str]  # column name -> inferred Arrow type
+
+
+def detect_kind(name: str) -> str | None:
+    """Guess the text table flavour (csv, tsv, jsonl) from a file name."""
+    return _KINDS.get(Path(name.split("?", 1)[0]).suffix.lower())
+
+
+def sidecar_name(mount_path: str, fmt: str) -> str:
+    """Return where the *fmt* sidecar of *mount_path* lives (``a.csv.parquet``)."""
+    return f"{mount_path}.{fmt}"
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.ipc
+        import pyarrow.json
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise RuntimeError(
+            "Converting tables requires the 'pyarrow' package on the server"
+        ) from exc
+    return pyarrow
+
+
+def _open_batches(pa: Any, source: Path, kind: str) -> tuple[Any, Any]:
+    """Open *source* as record batches; return ``(schema, batch iterator)``."""
+    if kind == "jsonl":
+        table = pa.json.read_json(source)
+        return table.schema, iter(table.to_batches())
+    delimiter = "\t" if kind == "tsv" else ","
+    # The streaming reader infers the schema from the first block and then
+    # converts block by block, so memory stays bounded for large files.
+    reader = pa.csv.open_csv(
+        source, parse_options=pa.csv.ParseOptions(delimiter=delimiter)
+    )
+    return reader.schema, reader
+
+
+def convert_table(source: Path, target: Path, kind: str, fmt: str) -> TabularInfo:
+    """Write the *kind* table at *source* to *target* in columnar format *fmt*.
+
+    Feather output is an uncompressed Arrow IPC file that scripts can
+    memory-map (``pa.ipc.open_file(pa.memory_map(path))``); Parquet is
+    compressed and smaller on disk. This is blocking; run it in a worker
+    thread.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported table format {fmt!r}; use one of {FORMATS}")
+    if kind not in _KINDS.values():
+        raise ValueError(f"Unsupported table kind {kind!r}")
+    pa = _pyarrow()
+
+    schema, batches = _open_batches(pa, source, kind)
+    rows = 0
+    tmp = target.with_name(f".{target.name}.convert")
+    try:
+        if fmt == "parquet":
+            writer = pa.parquet.ParquetWriter(tmp, schema)
+        else:
+            writer = pa.ipc.new_file(str(tmp), schema)
+        with writer:
+            for batch in batches:
+                rows += batch.num_rows
+                writer.write_batch(batch)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    tmp.replace(target)
+    return {
+        "format": fmt,
+        "rows": rows,
+        "columns": {field.name: str(field.type) for field in schema},
+    }
@@ -0,0 +1,53 @@
+"""RAM-backed workspaces for stateless runs.
+
+A stateless run writes a venv, a script and its outputs only to delete them
+moments later. Placing its ``run_<id>`` workspace under
+``PRIMCS_EPHEMERAL_DIR`` (default ``/dev/shm/primcs``, a tmpfs on Linux)
+keeps that I/O in memory and makes teardown a cheap in-RAM delete. Each run
+may use at most ``PRIMCS_EPHEMERAL_MAX_BYTES`` there (enforced as its disk
+quota), and a run only goes to RAM while that much is free; otherwise, or
+where the directory cannot be created, it uses ``TMP_DIR`` as before.
+"""
+
+import logging
+import shutil
+from pathlib import Path
+
+from server.config import EPHEMERAL_DIR, EPHEMERAL_MAX_BYTES
+
+__all__ = ["clear", "ephemeral_root", "is_ephemeral"]
+
+logger = logging.getLogger(__name__)
+
+
+def ephemeral_root(fallback: Path) -> Path:
+    """Return the directory a new stateless workspace should be created in."""
+    if EPHEMERAL_DIR is None:
+        return fallback
+    try:
+        EPHEMERAL_DIR.mkdir(parents=True, exist_ok=True)
+        free = shutil.disk_usage(EPHEMERAL_DIR).free
+    except OSError:
+        return fallback
+    if free < EPHEMERAL_MAX_BYTES:
+        logger.info("%s is short of memory; running on disk", EPHEMERAL_DIR)
+        return fallback
+    return EPHEMERAL_DIR
+
+
+def is_ephemeral(path: Path) -> bool:
+    """Whether *path* lies in the RAM-backed workspace directory."""
+    return EPHEMERAL_DIR is not None and path.is_relative_to(EPHEMERAL_DIR)
+
+
+def clear() -> None:
+    """Delete whatever a previous server process left in RAM.
+
+    Stateless runs never outlive the process that started them, so anything
+    found at startup is garbage.
+    """
+    if EPHEMERAL_DIR is None or not EPHEMERAL_DIR.is_dir():
+        return
+    for entry in EPHEMERAL_DIR.iterdir():
+        if entry.name.startswith("run_") or entry.name == ".trash":
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,271 @@
+"""S3-style multipart upload of large artifacts to presigned part URLs."""
+
+import asyncio
+import math
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from typing import NotRequired, TypedDict
+from xml.sax.saxutils import escape
+
+import aiohttp
+
+from server.config import UPLOAD_CONCURRENCY, UPLOAD_RETRIES
+
+__all__ = [
+    "MIN_PART_BYTES",
+    "BatchItem",
+    "BatchResult",
+    "MultipartResult",
+    "UploadProgressFn",
+    "multipart_upload",
+    "plan_parts",
+    "put_file",
+    "upload_batch",
+]
+
+# S3 rejects parts (other than the last) smaller than 5 MiB.
+MIN_PART_BYTES = 5 * 1024 * 1024
+_CHUNK_BYTES = 1024 * 1024
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_BACKOFF_SECONDS = 0.5
+
+# progress(bytes_uploaded, total_bytes)
+UploadProgressFn = Callable[[int, int], Awaitable[None]]
+
+
+class MultipartResult(TypedDict):
+    uploaded_bytes: int
+    parts: int
+    etags: list[str]  # in part order; needed to complete the upload
+    retries: int
+    status: int | None  # status of the completion request, if one was made
+
+
+class BatchItem(TypedDict):
+    relative_path: str
+    url: str
+
+
+class BatchResult(TypedDict):
+    relative_path: str
+    ok: bool
+    status: int | None  # HTTP status, None if the request never completed
+    uploaded_bytes: int
+    seconds: float
+    error: NotRequired[str]
+
+
+class _RetryableError(Exception):
+    pass
+
+
+def plan_parts(size: int, max_parts: int, part_size: int | None = None) -> int:
+    """Return the part size to use for *size* bytes over at most *max_parts*."""
+    if part_size is None:
+        part_size = max(math.ceil(size / max_parts), MIN_PART_BYTES)
+    elif part_size < MIN_PART_BYTES and size > part_size:
+        raise ValueError(f"part_size must be at least {MIN_PART_BYTES} bytes")
+    if math.ceil(size / part_size) > max_parts:
+        raise ValueError(
+            f"{size} bytes need {math.ceil(size / part_size)} parts of {part_size} "
+            f"bytes but only {max_parts} part URLs were given"
+        )
+    return part_size
+
+
+def _complete_body(etags: list[str]) -> str:
+    parts = "".join(
+        f"<Part><PartNumber>{n}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+        for n, etag in enumerate(etags, start=1)
+    )
+    return f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>"
+
+
+class _Upload:
+    def __init__(
+        self,
+        path: Path,
+        size: int,
+        session: aiohttp.ClientSession,
+        progress: UploadProgressFn | None,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.session = session
+        self.progress = progress
+        self.done = 0
+        self.retries = 0
+
+    async def _advance(self, n: int) -> None:
+        self.done += n
+        if self.progress is not None:
+            await self.progress(self.done, self.size)
+
+    async def _chunks(
+        self, offset: int, length: int, sent: list[int]
+    ) -> AsyncIterator[bytes]:
+        with self.path.open("rb") as fh:
+            fh.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(fh.read, min(_CHUNK_BYTES, remaining))
+                if not chunk:
+                    raise RuntimeError(f"{self.path} shrank during upload")
+                remaining -= len(chunk)
+                yield chunk
+                sent[0] += len(chunk)
+                await self._advance(len(chunk))
+
+    async def _put_once(self, url: str, offset: int, length: int) -> str:
+        sent = [0]  # bytes of this attempt, to roll back progress on failure
+        try:
+            # An explicit Content-Length avoids chunked encoding, which
+            # presigned S3 PUTs do not accept.
+            async with self.session.put(
+                url,
+                data=self._chunks(offset, length, sent),
+                headers={"Content-Length": str(length)},
+            ) as resp:
+                if resp.status in _RETRY_STATUSES:
+                    raise _RetryableError(f"HTTP {resp.status}")
+                if resp.status >= 400:
+                    raise RuntimeError(f"Part upload failed with HTTP {resp.status}")
+                return resp.headers.get("ETag", "")
+        except (_RetryableError, aiohttp.ClientError, TimeoutError):
+            await self._advance(-sent[0])
+            raise
+
+    async def put_part(self, url: str, offset: int, length: int, retries: int) -> str:
+        for attempt in range(retries + 1):
+            try:
+                return await self._put_once(url, offset, length)
+            except (_RetryableError, aiohttp.ClientError, TimeoutError) as exc:
+                if attempt == retries:
+                    raise RuntimeError(
+                        f"Part upload failed after {retries + 1} attempts: {exc}"
+                    ) from exc
+                self.retries += 1
+                delay = _BACKOFF_SECONDS * 2**attempt
+                await asyncio.sleep(delay * (0.5 + random.random()))
+        raise AssertionError("unreachable")
+
+
+async def multipart_upload(
+    path: Path,
+    part_urls: list[str],
+    complete_url: str | None = None,
+    *,
+    part_size: int | None = None,
+    concurrency: int = UPLOAD_CONCURRENCY,
+    retries: int = UPLOAD_RETRIES,
+    progress: UploadProgressFn | None = None,
+) -> MultipartResult:
+    """Upload *path* in parts to presigned *part_urls* (part 1 first).
+
+    The file is split evenly over the given URLs (parts of at least 5 MiB,
+    so trailing URLs may go unused). Up to *concurrency* parts are sent at
+    once, each streamed from disk; a part that fails with a network error
+    or a 408/429/5xx response is retried up to *retries* times with
+    exponential backoff. With *complete_url* (a presigned
+    CompleteMultipartUpload URL) the upload is completed with the collected
+    ETags; otherwise the caller completes it using ``etags``.
+    """
+    if not part_urls:
+        raise ValueError("part_urls must not be empty")
+    size = path.stat().st_size
+    part_size = plan_parts(size, len(part_urls), part_size)
+    count = max(math.ceil(size / part_size), 1)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async with aiohttp.ClientSession() as session:
+        upload = _Upload(path, size, session, progress)
+
+        async def send(n: int) -> str:
+            offset = n * part_size
+            async with semaphore:
+                return await upload.put_part(
+                    part_urls[n], offset, min(part_size, size - offset), retries
+                )
+
+        tasks = [asyncio.create_task(send(n)) for n in range(count)]
+        try:
+            etags = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        status = None
+        if complete_url is not None:
+            async with session.post(
+                complete_url,
+                data=_complete_body(etags),
+                headers={"Content-Type": "application/xml"},
+            ) as resp:
+                status = resp.status
+                body = await resp.text()
+                # S3 may report a failed completion inside a 200 response.
+                if status >= 400 or "<Error>" in body:
+                    raise RuntimeError(
+                        f"Completing the upload failed with HTTP {status}: {body[:200]}"
+                    )
+
+    return {
+        "uploaded_bytes": size,
+        "parts": count,
+        "etags": etags,
+        "retries": upload.retries,
+        "status": status,
+    }
+
+
+async def put_file(session: aiohttp.ClientSession, path: Path, url: str) -> int:
+    """PUT *path* to a presigned *url* in one request; return the HTTP status."""
+    with path.open("rb") as fh:
+        async with session.put(url, data=fh) as resp:
+            return resp.status
+
+
+async def upload_batch(
+    root: Path,
+    items: list[BatchItem],
+    concurrency: int = UPLOAD_CONCURRENCY,
+) -> list[BatchResult]:
+    """PUT each file below *root* to its URL, up to *concurrency* at a time.
+
+    All uploads share one HTTP session (and its connection pool). A failed
+    upload does not stop the others; results are returned in input order
+    with the error recorded per file.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def send(session: aiohttp.ClientSession, item: BatchItem) -> BatchResult:
+        path = root / item["relative_path"]
+        async with semaphore:
+            start = time.perf_counter()
+            result: BatchResult = {
+                "relative_path": item["relative_path"],
+                "ok": False,
+                "status": None,
+                "uploaded_bytes": 0,
+                "seconds": 0.0,
+            }
+            try:
+                size = path.stat().st_size
+                status = await put_file(session, path, item["url"])
+                result["status"] = status
+                if status >= 400:
+                    result["error"] = f"Upload failed with HTTP {status}"
+                else:
+                    result["ok"] = True
+                    result["uploaded_bytes"] = size
+            except (OSError, RuntimeError, aiohttp.ClientError, TimeoutError) as exc:
+                result["error"] = str(exc) or type(exc).__name__
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            return result
+
+    async with aiohttp.ClientSession() as session:
+        return list(await asyncio.gather(*(send(session, i) for i in items)))
@@ -0,0 +1,268 @@
+"""Watch a workspace's ``output/`` directory while user code runs.
+
+On Linux the watcher uses inotify, so every artifact event is seen as it
+happens. Elsewhere, or when inotify cannot be initialised (e.g. the watch
+limit is exhausted), it falls back to polling the directory.
+"""
+
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from types import TracebackType
+from typing import Literal
+
+from server.config import ARTIFACT_POLL_INTERVAL
+from server.sandbox.artifacts import walk_files
+
+__all__ = ["ArtifactEvent", "ArtifactEventFn", "OutputWatcher"]
+
+logger = logging.getLogger(__name__)
+
+# created: a file appeared, completed: it was closed after writing (or moved
+# into place), deleted: it was removed or moved away.
+ArtifactEvent = Literal["created", "completed", "deleted"]
+ArtifactEventFn = Callable[[ArtifactEvent, str], Awaitable[None]]
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # noqa: B018 - probe for the symbol
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class OutputWatcher:
+    """Record (and optionally report) changes below *output_dir*.
+
+    Use as an async context manager around the code execution. Each event
+    is passed to *on_event*, if given, in the order it was observed; a
+    failing callback is logged and does not affect the run. Afterwards,
+    :meth:`paths` tells which files changed, so the artifact index can be
+    updated without walking the whole directory.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        on_event: ArtifactEventFn | None = None,
+        poll_interval: float = ARTIFACT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ) -> None:
+        self.output_dir = output_dir
+        self.backend: Literal["inotify", "poll"] = "poll"
+        self._on_event = on_event
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+        self._changed: set[str] = set()
+        self._rescan = False
+        self._queue: asyncio.Queue[tuple[ArtifactEvent, str] | None] = asyncio.Queue()
+        self._dispatcher: asyncio.Task[None] | None = None
+        # inotify state
+        self._libc: ctypes.CDLL | None = None
+        self._fd = -1
+        self._dirs: dict[int, str] = {}  # watch descriptor -> relative dir
+        # polling state
+        self._poller: asyncio.Task[None] | None = None
+        self._snapshot: dict[str, tuple[int, int]] = {}
+        self._unsettled: set[str] = set()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def __aenter__(self) -> "OutputWatcher":
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self._on_event is not None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        if not (self._use_inotify and self._start_inotify()):
+            self._snapshot = self._scan()
+            self._poller = asyncio.create_task(self._poll_loop())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.backend == "inotify":
+            self._read_events()  # events queued before the process exited
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+        elif self._poller is not None:
+            self._poller.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._poller
+            self._poll_once(final=True)
+        if self._dispatcher is not None:
+            self._queue.put_nowait(None)
+            if exc_type is None:
+                await self._dispatcher
+            else:
+                self._dispatcher.cancel()
+
+    def paths(self) -> set[str] | None:
+        """Files (relative to ``output/``) that changed, or ``None`` if unknown.
+
+        ``None`` means events were lost (queue overflow, whole directories
+        moved) and the caller has to rescan the directory.
+        """
+        return None if self._rescan else set(self._changed)
+
+    # ------------------------------------------------------------------
+    # Event delivery
+    # ------------------------------------------------------------------
+    def _emit(self, event: ArtifactEvent, rel: str) -> None:
+        self._changed.add(rel)
+        if self._dispatcher is not None:
+            self._queue.put_nowait((event, rel))
+
+    async def _dispatch(self) -> None:
+        assert self._on_event is not None
+        while (item := await self._queue.get()) is not None:
+            try:
+                await self._on_event(*item)
+            except Exception:  # noqa: BLE001 - notifications are best effort
+                logger.exception("Artifact event callback failed")
+
+    # ------------------------------------------------------------------
+    # inotify backend
+    # ------------------------------------------------------------------
+    def _start_inotify(self) -> bool:
+        libc = _libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return False
+        self._libc, self._fd = libc, fd
+        if not self._add_tree(self.output_dir, ""):
+            os.close(fd)
+            self._libc, self._fd, self._dirs = None, -1, {}
+            return False
+        asyncio.get_running_loop().add_reader(fd, self._read_events)
+        self.backend = "inotify"
+        return True
+
+    def _add_watch(self, path: Path, rel: str) -> bool:
+        assert self._libc is not None
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            return False
+        self._dirs[wd] = rel
+        return True
+
+    def _add_tree(self, path: Path, rel: str) -> bool:
+        """Watch *path* and every directory below it."""
+        if not self._add_watch(path, rel):
+            return False
+        for sub, _, _ in os.walk(path):
+            if sub != str(path):
+                sub_rel = Path(sub).relative_to(self.output_dir).as_posix()
+                if not self._add_watch(Path(sub), sub_rel):
+                    return False
+        return True
+
+    def _read_events(self) -> None:
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                raw = buf[offset + _EVENT.size : offset + _EVENT.size + length]
+                offset += _EVENT.size + length
+                self._handle(wd, mask, os.fsdecode(raw.rstrip(b"\0")))
+
+    def _handle(self, wd: int, mask: int, name: str) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            self._rescan = True
+            return
+        if mask & _IN_IGNORED:
+            self._dirs.pop(wd, None)
+            return
+        parent = self._dirs.get(wd)
+        if parent is None or not name:
+            return
+        rel = f"{parent}/{name}" if parent else name
+
+        if mask & _IN_ISDIR:
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                path = self.output_dir / rel
+                if not self._add_tree(path, rel):
+                    self._rescan = True
+                # Files written before the watch existed produce no events.
+                for child, _ in walk_files(path, f"{rel}/"):
+                    self._emit("completed", child)
+            if mask & (_IN_MOVED_FROM | _IN_MOVED_TO):
+                self._rescan = True  # children moved without per-file events
+            return
+
+        if mask & _IN_CREATE:
+            self._emit("created", rel)
+        elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+            self._emit("completed", rel)
+        elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+            self._emit("deleted", rel)
+
+    # ------------------------------------------------------------------
+    # Polling backend
+    # ------------------------------------------------------------------
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        return {
+            rel: (st.st_size, st.st_mtime_ns) for rel, st in walk_files(self.output_dir)
+        }
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            self._poll_once()
+
+    def _poll_once(self, final: bool = False) -> None:
+        """Diff the directory against the last snapshot.
+
+        A file is reported as created when first seen and as completed once
+        it is unchanged for a full interval (or when the run ends).
+        """
+        current = self._scan()
+        for rel in self._snapshot.keys() - current.keys():
+            self._unsettled.discard(rel)
+            self._emit("deleted", rel)
+        for rel, state in current.items():
+            previous = self._snapshot.get(rel)
+            if previous is None:
+                self._emit("created", rel)
+                self._unsettled.add(rel)
+            elif previous != state:
+                self._unsettled.add(rel)
+            elif rel in self._unsettled:
+                self._unsettled.discard(rel)
+                self._emit("completed", rel)
+        if final:
+            for rel in sorted(self._unsettled):
+                self._emit("completed", rel)
+            self._unsettled.clear()
+        self._snapshot = current
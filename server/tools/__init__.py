@@ -1,4 +1,5 @@
 # register is called from server.main, so import here is enough
+from . import fork_session  # noqa: F401
 from . import mount_file  # noqa: F401
 from . import persist_artifact  # noqa: F401
 from . import workspace_inspect  # noqa: F401
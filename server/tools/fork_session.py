@@ -0,0 +1,53 @@
+"""MCP tool: make the current session a copy-on-write fork of another."""
+
+from fastmcp import Context, FastMCP
+
+from server.config import TMP_DIR
+from server.sandbox import sessions
+from server.sandbox.fork import ForkInfo, fork_session
+
+
+class ForkResult(ForkInfo):
+    session_id: str
+    forked_from: str
+
+
+def _session_id(ctx: Context | None) -> str:
+    sid = ctx.session_id if ctx else None
+    if not sid and ctx and ctx.request_context and ctx.request_context.request:
+        sid = ctx.request_context.request.headers.get("mcp-session-id")
+    if not sid:
+        raise ValueError("Missing session_id; ensure mcp-session-id header is set.")
+    return sid
+
+
+def register(mcp: FastMCP) -> None:
+    """Register the `fork_session` tool on a FastMCP server instance."""
+
+    @mcp.tool(
+        name="fork_session",
+        description=(
+            "Replace this session's workspace with a fork of another session "
+            "(mounts/, output/, scripts and environment), to branch from that "
+            "session's state and try alternatives in parallel. Open one new "
+            "session per branch and call fork_session(source_session_id=<parent "
+            "mcp-session-id>) in each. Files are shared through hardlinks "
+            "(read-only mounts) and copy-on-write reflinks where the filesystem "
+            "supports them, so forking is fast regardless of workspace size and "
+            "later writes in either session do not affect the other."
+        ),
+    )
+    async def _fork_session(
+        source_session_id: str, ctx: Context | None = None
+    ) -> ForkResult:
+        if not sessions.valid_id(source_session_id):
+            raise ValueError("Invalid source_session_id")
+        sid = _session_id(ctx)
+        if not sessions.valid_id(sid):
+            raise ValueError("Invalid session_id")
+        if sid == source_session_id:
+            raise ValueError("A session cannot be forked into itself")
+        info = await fork_session(
+            TMP_DIR / f"session_{source_session_id}", TMP_DIR / f"session_{sid}"
+        )
+        return {**info, "session_id": sid, "forked_from": source_session_id}
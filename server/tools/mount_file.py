@@ -5,10 +5,11 @@ from pathlib import Path
 from fastmcp import Context, FastMCP
 
 from server.config import TMP_DIR
-from server.sandbox.downloader import download_files
+from server.sandbox import mounts, quota, sessions
+from server.sandbox.downloader import MountInfo, download_files
 
 
-def _session_root(ctx: Context | None) -> Path:
+def _session_id(ctx: Context | None) -> str:
     sid: str | None = None
     if ctx:
         sid = ctx.session_id
@@ -18,27 +19,53 @@ def _session_root(ctx: Context | None) -> Path:
         raise ValueError(
             "Missing session_id; include mcp-session-id header or create session-aware client."
         )
-    root = TMP_DIR / f"session_{sid}"
+    if not sessions.valid_id(sid):
+        raise ValueError("Invalid session_id")
+    return sid
+
+
+def _session_root(ctx: Context | None) -> Path:
+    root = TMP_DIR / f"session_{_session_id(ctx)}"
     root.mkdir(parents=True, exist_ok=True)
     (root / "mounts").mkdir(parents=True, exist_ok=True)
+    sessions.touch(root)
     return root
 
 
 def register(mcp: FastMCP) -> None:
-    """Register the mount_file tool."""
+    """Register the mount_file and mount_status tools."""
 
     @mcp.tool(
         name="mount_file",
         description=(
             "Download a remote file once per session and store it under mounts/<mountPath>. "
-            "Subsequent run_code calls can access it via that path without re-downloading."
+            "Subsequent run_code calls can access it via that path without re-downloading. "
+            "Re-mounting a URL reuses the cached copy while fresh and revalidates it "
+            "(ETag/Last-Modified) when stale; the result reports cache as "
+            "'hit', 'revalidated' or 'miss'. "
+            "Set background=true to return a mount_id immediately and download "
+            "in the background; poll progress with mount_status. run_code waits "
+            "for pending mounts its code references before it starts. "
+            "Set extract=true (or a format: zip, tar, tar.gz, tar.bz2, tar.xz, "
+            "tar.zst) to unpack an archive into the directory mounts/<mountPath>/ "
+            "as it is mounted, instead of unpacking it in a run_code call. "
+            "Set convert=true (or 'parquet' / 'feather') on a .csv, .tsv or .jsonl "
+            "mount to also write a columnar sidecar mounts/<mountPath>.<format>; "
+            "the result reports its inferred schema and row count. Reading the "
+            "sidecar (pd.read_parquet / pd.read_feather, or memory-mapping the "
+            "Feather file with pyarrow) is much faster than re-parsing the text. "
+            "file:// URLs of datasets under the server's allow-listed local roots "
+            "are linked into mounts/ without copying (cache='local')."
         ),
     )
     async def _mount_file(
         url: str,
         mount_path: str,
+        background: bool = False,
+        extract: bool | str = False,
+        convert: bool | str = False,
         ctx: Context | None = None,
-    ) -> dict:  # {"mounted_as": "mounts/data/my.csv", "bytes": N}
+    ) -> dict:  # {"mounted_as": "mounts/data/my.csv", "bytes": N, "cache": "miss"}
         if (
             Path(mount_path).is_absolute()
             or ".." in Path(mount_path).parts
@@ -46,11 +73,58 @@ def register(mcp: FastMCP) -> None:
         ):
             raise ValueError("mount_path must be a relative path without '..'")
         root = _session_root(ctx)
+        quota.check(root)
         mounts_dir = root / "mounts"
-        spec: dict[str, str] = {"url": url, "mountPath": mount_path}
-        downloaded: list[Path] = await download_files([spec], mounts_dir)
-        local = downloaded[0]
-        return {
+        if background:
+            job = mounts.start_mount(
+                _session_id(ctx), url, mount_path, mounts_dir, extract, convert
+            )
+            return dict(job.status())
+        spec = {
+            "url": url,
+            "mountPath": mount_path,
+            "extract": extract,
+            "convert": convert,
+        }
+        downloaded: list[MountInfo] = await download_files([spec], mounts_dir)
+        sessions.record_mounts(root, downloaded)
+        sessions.measure(root)  # later quota checks see the new bytes
+        info = downloaded[0]
+        local = mounts_dir / mount_path
+        result = {
             "mounted_as": str(local.relative_to(root)),
-            "bytes": local.stat().st_size,
+            "bytes": info["bytes"],
+            "cache": info["cache"],
         }
+        if "link" in info:
+            result["link"] = info["link"]
+        if "extracted_files" in info:
+            result["extracted_files"] = info["extracted_files"]
+            result["extracted_bytes"] = info["extracted_bytes"]
+        if "table" in info:
+            result["sidecar"] = f"mounts/{info['sidecar']}"
+            result["table"] = info["table"]
+        if "sidecar_error" in info:
+            result["sidecar_error"] = info["sidecar_error"]
+        return result
+
+    @mcp.tool(
+        name="mount_status",
+        description=(
+            "Report progress of background mounts started with "
+            "mount_file(background=true): state (downloading/done/failed), bytes "
+            "done, total bytes, transfer rate and ETA. Pass mount_id for a single "
+            "mount or omit it to list every mount of the current session."
+        ),
+    )
+    async def _mount_status(
+        mount_id: str | None = None,
+        ctx: Context | None = None,
+    ) -> list[mounts.MountStatus]:
+        sid = _session_id(ctx)
+        if mount_id is None:
+            return [job.status() for job in mounts.session_jobs(sid)]
+        job = mounts.get_job(mount_id)
+        if job is None or job.session_id != sid:
+            raise ValueError(f"Unknown mount_id: {mount_id}")
+        return [job.status()]
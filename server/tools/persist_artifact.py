@@ -1,13 +1,58 @@
-"""MCP tool: persist an artifact to a client-provided presigned URL."""
+"""MCP tools: persist artifacts to client-provided presigned URLs."""
 
 from pathlib import Path
+from urllib.parse import quote
 
 import aiohttp
 from fastmcp import Context, FastMCP
 
-from server.config import TMP_DIR
+from server.config import TMP_DIR, UPLOAD_CONCURRENCY
+from server.sandbox import sessions
+from server.sandbox.export import select_files
+from server.sandbox.uploader import (
+    BatchItem,
+    BatchResult,
+    multipart_upload,
+    put_file,
+    upload_batch,
+)
 
-MAX_UPLOAD_BYTES = 1024 * 1024 * 20  # 20 MB cap for safety
+MAX_UPLOAD_BYTES = 1024 * 1024 * 20  # 20 MB cap for single PUT uploads
+
+
+def _output_dir(ctx: Context | None) -> Path:
+    """Return the output/ directory of the calling session."""
+    sid = ctx.session_id if ctx else None
+    if not sid and ctx and ctx.request_context and ctx.request_context.request:
+        sid = ctx.request_context.request.headers.get("mcp-session-id")
+    if not sid:
+        raise ValueError("Missing session_id; ensure mcp-session-id header is set.")
+    if not sessions.valid_id(sid):
+        raise ValueError("Invalid session_id")
+    root = TMP_DIR / f"session_{sid}"
+    sessions.touch(root)
+    return root / "output"
+
+
+def _check_path(relative_path: str) -> None:
+    if Path(relative_path).is_absolute() or ".." in Path(relative_path).parts:
+        raise ValueError("relative_path must be inside output/ and cannot contain '..'")
+
+
+def _expand_template(output_dir: Path, glob: str, url_template: str) -> list[BatchItem]:
+    """Build one upload per file matching *glob*.
+
+    ``{relative_path}`` (URL-quoted) and ``{name}`` in *url_template* are
+    replaced for each file.
+    """
+    items: list[BatchItem] = []
+    for f in select_files(output_dir, glob):
+        rel = f["arcname"]
+        url = url_template.replace("{relative_path}", quote(rel)).replace(
+            "{name}", quote(f["path"].name)
+        )
+        items.append({"relative_path": rel, "url": url})
+    return items
 
 
 def register(mcp: FastMCP) -> None:
@@ -19,44 +64,128 @@ def register(mcp: FastMCP) -> None:
             "Upload a file previously created by run_code to a presigned URL. "
             "The file path must be relative to the output/ directory of the current session, "
             "for example 'reports/report.pdf'. The client must include the same mcp-session-id "
-            "header used for run_code so the tool can locate the correct session workspace."
+            "header used for run_code so the tool can locate the correct session workspace. "
+            "Files up to 20 MB can go in a single PUT to presigned_url. For larger files "
+            "create an S3 multipart upload and pass presigned UploadPart URLs as "
+            "part_urls (part 1 first) instead; parts are sent in parallel and retried on "
+            "failure. With complete_url (a presigned CompleteMultipartUpload URL) the "
+            "upload is also completed; otherwise complete it with the returned etags."
         ),
     )
     async def _persist_artifact(
         relative_path: str,
-        presigned_url: str,
+        presigned_url: str | None = None,
+        part_urls: list[str] | None = None,
+        complete_url: str | None = None,
         ctx: Context | None = None,
-    ) -> dict:  # {uploaded_bytes: int, status: int}
+    ) -> dict:  # {uploaded_bytes: int, status: int} (+ parts, etags, retries)
         """Upload *relative_path* to *presigned_url* and return upload stats."""
+        if (presigned_url is None) == (not part_urls):
+            raise ValueError("Pass either presigned_url or part_urls.")
+        _check_path(relative_path)
 
-        # Basic sanitisation
-        if Path(relative_path).is_absolute() or ".." in Path(relative_path).parts:
-            raise ValueError(
-                "relative_path must be inside output/ and cannot contain '..'"
-            )
-
-        # Determine session ID
-        sid = ctx.session_id
-        if not sid and ctx.request_context.request:
-            sid = ctx.request_context.request.headers.get("mcp-session-id")
-        if not sid:
-            raise ValueError("Missing session_id; ensure mcp-session-id header is set.")
-
-        output_dir = TMP_DIR / f"session_{sid}" / "output"
-        file_path = output_dir / relative_path
+        file_path = _output_dir(ctx) / relative_path
         if not file_path.is_file():
             raise FileNotFoundError("Artifact not found: " + relative_path)
 
+        if part_urls:
+
+            async def progress(done: int, total: int) -> None:
+                if ctx is not None:
+                    await ctx.report_progress(done, total)
+
+            return dict(
+                await multipart_upload(
+                    file_path, part_urls, complete_url, progress=progress
+                )
+            )
+
+        assert presigned_url is not None  # part_urls was empty
         size = file_path.stat().st_size
         if size > MAX_UPLOAD_BYTES:
-            raise ValueError(f"Artifact exceeds size limit ({MAX_UPLOAD_BYTES} bytes)")
+            raise ValueError(
+                f"Artifact exceeds size limit ({MAX_UPLOAD_BYTES} bytes); "
+                "use part_urls for a multipart upload."
+            )
 
         async with aiohttp.ClientSession() as session:
-            with file_path.open("rb") as fh:
-                resp = await session.put(presigned_url, data=fh)
-                status = resp.status
-                await resp.release()
-                if status >= 400:
-                    raise RuntimeError(f"Upload failed with HTTP {status}")
+            status = await put_file(session, file_path, presigned_url)
+        if status >= 400:
+            raise RuntimeError(f"Upload failed with HTTP {status}")
 
         return {"uploaded_bytes": size, "status": status}
+
+    @mcp.tool(
+        name="persist_artifacts",
+        description=(
+            "Upload several output/ files in one call. Pass files as a list of "
+            "{relative_path, presigned_url} objects, or a glob (e.g. 'plots/*.png') "
+            "plus a url_template in which {relative_path} and {name} are replaced per "
+            "file. Uploads run concurrently (up to 'concurrency' at a time) over one "
+            "connection pool. All paths are checked before anything is uploaded; each "
+            "file must be at most 20 MB. Returns per-file ok, status, uploaded_bytes, "
+            "seconds and error, so one failed upload does not hide the others."
+        ),
+    )
+    async def _persist_artifacts(
+        files: list[dict[str, str]] | None = None,
+        glob: str | None = None,
+        url_template: str | None = None,
+        concurrency: int = UPLOAD_CONCURRENCY,
+        ctx: Context | None = None,
+    ) -> dict:  # {uploaded: int, failed: int, uploaded_bytes: int, results: [...]}
+        """Upload many artifacts concurrently and report per-file results."""
+        if (files is None) == (glob is None):
+            raise ValueError("Pass either files or glob with url_template.")
+        output_dir = _output_dir(ctx)
+
+        items: list[BatchItem]
+        if glob is not None:
+            if not url_template:
+                raise ValueError("url_template is required with glob.")
+            if glob.startswith("/") or ".." in Path(glob).parts:
+                raise ValueError("glob must be inside output/ and cannot contain '..'")
+            items = _expand_template(output_dir, glob, url_template)
+            if not items:
+                raise FileNotFoundError(f"No artifacts match {glob!r}")
+        else:
+            items = []
+            for entry in files or []:
+                if "relative_path" not in entry or "presigned_url" not in entry:
+                    raise ValueError(
+                        "Each entry in files needs relative_path and presigned_url."
+                    )
+                items.append(
+                    {
+                        "relative_path": entry["relative_path"],
+                        "url": entry["presigned_url"],
+                    }
+                )
+
+        # Validate everything up front so a bad entry uploads nothing.
+        problems = []
+        for item in items:
+            rel = item["relative_path"]
+            try:
+                _check_path(rel)
+            except ValueError as exc:
+                problems.append(f"{rel}: {exc}")
+                continue
+            path = output_dir / rel
+            if not path.is_file():
+                problems.append(f"{rel}: artifact not found")
+            elif path.stat().st_size > MAX_UPLOAD_BYTES:
+                problems.append(
+                    f"{rel}: exceeds size limit ({MAX_UPLOAD_BYTES} bytes); "
+                    "use persist_artifact with part_urls"
+                )
+        if problems:
+            raise ValueError("Cannot persist artifacts: " + "; ".join(problems))
+
+        results: list[BatchResult] = await upload_batch(output_dir, items, concurrency)
+        return {
+            "uploaded": sum(r["ok"] for r in results),
+            "failed": sum(not r["ok"] for r in results),
+            "uploaded_bytes": sum(r["uploaded_bytes"] for r in results),
+            "results": results,
+        }
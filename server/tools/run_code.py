@@ -2,6 +2,7 @@
 
 from fastmcp import Context, FastMCP
 
+from server.sandbox import sessions
 from server.sandbox.runner import RunCodeResult
 from server.sandbox.runner import run_code as sandbox_execute
 
@@ -37,7 +38,10 @@ def register(mcp: FastMCP) -> None:
             "like df.head() alone will not be returned. "
             "Store any artifacts you want back in the output/ directory; they "
             "are returned as relative paths and downloadable via "
-            "/artifacts/{relative_path}. "
+            "/artifacts/{relative_path}. Only artifacts created or modified by "
+            "the run are listed; while it runs, each one is also announced in a "
+            "log notification (logger 'primcs.artifacts') as it is created and "
+            "completed. "
             "Mounted files are available at mounts/<mountPath>. "
             "If stdout is empty or execution fails, a 'feedback' string is "
             "added to the response with suggestions. "
@@ -46,15 +50,24 @@ def register(mcp: FastMCP) -> None:
             "pd.set_option('display.width', 10000) first. Moreover try to get "
             "column names separately."
             "Optional parameters: requirements (list of pip specs) and files "
-            "[{url, mountPath}]. "
+            "[{url, mountPath, extract?, convert?}]. "
+            "Well-known packages the code imports (numpy, sklearn, cv2, ...) are "
+            "installed automatically; the 'inferred' field reports what was "
+            "added and which imports are unknown (pass those as requirements). "
+            "Stdlib-only code without requirements starts fastest (no "
+            "environment is built; 'lane' reports 'stdlib' or 'venv'). "
             "Each file is downloaded before execution and made available at "
-            "./mounts/<mountPath>. "
+            "./mounts/<mountPath>. With extract=true (or a format such as "
+            "'zip', 'tar.gz', 'tar.zst') an archive is unpacked into the "
+            "directory ./mounts/<mountPath>/ instead. With convert='parquet' "
+            "or 'feather' a CSV/TSV/JSONL file also gets a columnar sidecar at "
+            "./mounts/<mountPath>.<format>. "
         ),
     )
     async def _run_code(
         code: str,
         requirements: list[str] | None = None,
-        files: list[dict[str, str]] | None = None,
+        files: list[dict[str, str | bool]] | None = None,
         ctx: Context | None = None,
     ) -> RunCodeResult:
         """Tool implementation compatible with FastMCP.
@@ -82,6 +95,22 @@ def register(mcp: FastMCP) -> None:
             # see issue https://github.com/modelcontextprotocol/python-sdk/
             # issues/1063 for more details
             sid = ctx.request_context.request.headers.get("mcp-session-id")
+        if sid and not sessions.valid_id(sid):
+            raise ValueError("Invalid session_id")
+
+        async def notify_artifact(event: str, relative_path: str) -> None:
+            # Lets clients fetch plots or partial results before the run ends.
+            if ctx is None:
+                return
+            await ctx.info(
+                f"artifact {event}: {relative_path}",
+                logger_name="primcs.artifacts",
+                extra={
+                    "event": event,
+                    "relative_path": relative_path,
+                    "url": f"/artifacts/{relative_path}",
+                },
+            )
 
         try:
             result = await sandbox_execute(
@@ -90,6 +119,7 @@ def register(mcp: FastMCP) -> None:
                 files=files,
                 run_id=(ctx.request_id if ctx else "local"),
                 session_id=sid,
+                on_artifact=notify_artifact if sid else None,
             )
             # Always include session_id in the response if available
             if sid:
@@ -1,15 +1,19 @@
 # """Workspace inspection tools for session files."""
 
+import asyncio
 import mimetypes
 import os
 from datetime import datetime
 from pathlib import Path
 from typing import TypedDict
+from urllib.parse import urlencode
 
 import aiofiles
 from fastmcp import Context, FastMCP
 
 from server.config import TMP_DIR
+from server.sandbox import export, sessions
+from server.sandbox.artifacts import ArtifactIndex, ArtifactMeta
 
 _MAX_PREVIEW_BYTES = 8 * 1024  # 8 KB
 
@@ -22,6 +26,13 @@ class DirEntry(TypedDict):
     modified: str  # ISO timestamp
 
 
+class ExportLink(TypedDict):
+    url: str  # GET with the mcp-session-id header to stream the archive
+    format: str
+    files: int
+    bytes: int  # uncompressed total
+
+
 class FilePreview(TypedDict):
     name: str
     path: str
@@ -40,8 +51,11 @@ def _get_session_root(ctx: Context | None) -> Path:
         raise ValueError(
             "Missing session_id; ensure the client includes the mcp-session-id header or uses a session-aware context."
         )
+    if not sessions.valid_id(sid):
+        raise ValueError("Invalid session_id")
     root = TMP_DIR / f"session_{sid}"
     root.mkdir(parents=True, exist_ok=True)
+    sessions.touch(root)
     return root.resolve()
 
 
@@ -122,3 +136,53 @@ def register(mcp: FastMCP) -> None:
             "mime": mime or "application/octet-stream",
             "content": content,
         }
+
+    @mcp.tool(
+        name="list_artifacts",
+        description=(
+            "List every artifact in the session's output/ directory with size and "
+            "MIME type. run_code only reports artifacts created or modified by "
+            "that run; use this for the full listing."
+        ),
+    )
+    async def _list_artifacts(ctx: Context | None = None) -> list[ArtifactMeta]:
+        index = ArtifactIndex(_get_session_root(ctx))
+        index.refresh()
+        return index.listing()
+
+    @mcp.tool(
+        name="export_workspace",
+        description=(
+            "Bundle many workspace files into one download instead of fetching "
+            "them one by one. Returns a /export URL (GET it with the "
+            "mcp-session-id header) that streams a zip, tar, tar.gz or tar.zst "
+            "of `path` (default 'output'), optionally filtered by `glob` (e.g. "
+            "'*.png' or 'plots/**/*.csv') and `modified_since` (ISO 8601 or Unix "
+            "time), plus the number and total size of matching files."
+        ),
+    )
+    async def _export_workspace(
+        path: str = "output",
+        format: str = "zip",
+        glob: str | None = None,
+        modified_since: str | None = None,
+        ctx: Context | None = None,
+    ) -> ExportLink:
+        if format not in export.FORMATS:
+            raise ValueError(f"format must be one of {sorted(export.FORMATS)}")
+        base = export.resolve_subtree(_get_session_root(ctx), path)
+        since = export.parse_since(modified_since)
+        summary = await asyncio.to_thread(
+            export.summarize, export.select_files(base, glob, since)
+        )
+        query = {"path": path, "format": format}
+        if glob:
+            query["glob"] = glob
+        if modified_since:
+            query["since"] = modified_since
+        return {
+            "url": f"/export?{urlencode(query)}",
+            "format": format,
+            "files": summary["files"],
+            "bytes": summary["bytes"],
+        }
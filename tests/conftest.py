@@ -9,6 +9,8 @@ from unittest.mock import AsyncMock, Mock
 import pytest
 from httpx import AsyncClient
 
+from server.sandbox.metadata import MetadataStore
+
 
 @pytest.fixture
 def temp_dir() -> Generator[Path]:
@@ -20,12 +22,27 @@ def temp_dir() -> Generator[Path]:
         shutil.rmtree(temp_path, ignore_errors=True)
 
 
+@pytest.fixture(autouse=True)
+def metadata_store(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Generator[MetadataStore]:
+    """Give every test its own session metadata database."""
+    store = MetadataStore(tmp_path_factory.mktemp("metadata") / "metadata.db")
+    monkeypatch.setattr("server.sandbox.metadata._default", store)
+    try:
+        yield store
+    finally:
+        store.close()
+
+
 @pytest.fixture
 def mock_tmp_dir(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
     """Mock the global TMP_DIR with a temporary directory."""
     monkeypatch.setattr("server.config.TMP_DIR", temp_dir)
     monkeypatch.setattr("server.sandbox.runner.TMP_DIR", temp_dir)
+    monkeypatch.setattr("server.sandbox.sessions.TMP_DIR", temp_dir)
     monkeypatch.setattr("server.tools.workspace_inspect.TMP_DIR", temp_dir)
+    monkeypatch.setattr("server.sandbox.tmpfs.EPHEMERAL_DIR", None)
     return temp_dir
 
 
@@ -145,14 +162,22 @@ def mock_download_success(monkeypatch: pytest.MonkeyPatch) -> None:
 
     async def mock_download_files(
         files: list[dict[str, str]], mount_dir: Path
-    ) -> list[Path]:
-        paths = []
+    ) -> list[dict[str, object]]:
+        mounted = []
         for file_info in files:
             mount_path = mount_dir / file_info["mountPath"]
             mount_path.parent.mkdir(parents=True, exist_ok=True)
             mount_path.write_text(f"Mock content for {file_info['url']}")
-            paths.append(mount_path)
-        return paths
+            mounted.append(
+                {
+                    "mount_path": file_info["mountPath"],
+                    "url": file_info["url"],
+                    "bytes": mount_path.stat().st_size,
+                    "sha256": "0" * 64,
+                    "cache": "miss",
+                }
+            )
+        return mounted
 
     monkeypatch.setattr("server.sandbox.runner.download_files", mock_download_files)
 
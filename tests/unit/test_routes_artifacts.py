@@ -0,0 +1,116 @@
+"""Unit tests for server.routes.artifacts (the /artifacts route)."""
+
+import gzip
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from server.routes.artifacts import get_artifact
+from server.sandbox.metadata import MetadataStore
+
+SESSION = {"mcp-session-id": "s1"}
+
+
+@pytest.fixture
+def client(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr("server.routes.artifacts.TMP_DIR", temp_dir)
+    output = temp_dir / "session_s1" / "output"
+    output.mkdir(parents=True)
+    (output / "data.csv").write_text("a,b\n" + "1,2\n" * 2000)
+    (output / "blob.bin").write_bytes(bytes(range(256)) * 16)
+    app = Starlette(
+        routes=[
+            Route(
+                "/artifacts/{relative_path:path}", get_artifact, methods=["GET", "HEAD"]
+            )
+        ]
+    )
+    return TestClient(app)
+
+
+class TestArtifactRoute:
+    """Test caching, range and compression behaviour."""
+
+    def test_conditional_get(self, client: TestClient) -> None:
+        """A matching If-None-Match gets 304 without a body."""
+        first = client.get("/artifacts/blob.bin", headers=SESSION)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert not etag.startswith("W/")
+
+        again = client.get(
+            "/artifacts/blob.bin", headers={**SESSION, "If-None-Match": etag}
+        )
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["etag"] == etag
+
+    def test_etag_changes_with_content(
+        self, client: TestClient, temp_dir: Path
+    ) -> None:
+        """Rewriting the artifact invalidates the old ETag."""
+        etag = client.get("/artifacts/blob.bin", headers=SESSION).headers["etag"]
+        (temp_dir / "session_s1" / "output" / "blob.bin").write_bytes(b"new")
+
+        resp = client.get(
+            "/artifacts/blob.bin", headers={**SESSION, "If-None-Match": etag}
+        )
+        assert resp.status_code == 200
+        assert resp.content == b"new"
+
+    def test_range_request(self, client: TestClient) -> None:
+        """Byte ranges allow resuming and partial reads."""
+        resp = client.get(
+            "/artifacts/blob.bin",
+            headers={**SESSION, "Range": "bytes=10-19", "Accept-Encoding": "gzip"},
+        )
+        assert resp.status_code == 206
+        assert resp.content == bytes(range(10, 20))
+        assert resp.headers["content-range"] == "bytes 10-19/4096"
+
+    @pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+    def test_compresses_text(self, client: TestClient, encoding: str) -> None:
+        """Compressible types are encoded on the fly when accepted."""
+        headers = {**SESSION, "Accept-Encoding": f"{encoding}, identity;q=0.5"}
+        if encoding == "zstd":
+            zstandard = pytest.importorskip("zstandard")
+            decompress = zstandard.ZstdDecompressor().decompressobj().decompress
+        else:
+            decompress = gzip.decompress
+
+        with client.stream("GET", "/artifacts/data.csv", headers=headers) as resp:
+            raw = b"".join(resp.iter_raw())
+
+        assert resp.status_code == 200
+        assert resp.headers["content-encoding"] == encoding
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert resp.headers["etag"].endswith(f'-{encoding}"')
+        assert len(raw) < 1000
+        assert decompress(raw) == ("a,b\n" + "1,2\n" * 2000).encode()
+
+    def test_binary_not_compressed(self, client: TestClient) -> None:
+        """Non-text types are sent as-is."""
+        resp = client.get(
+            "/artifacts/blob.bin", headers={**SESSION, "Accept-Encoding": "gzip"}
+        )
+        assert "content-encoding" not in resp.headers
+        assert resp.headers["accept-ranges"] == "bytes"
+
+    def test_traversal_and_missing_session(self, client: TestClient) -> None:
+        """Paths outside output/ and requests without a session are rejected."""
+        assert client.get("/artifacts/../x", headers=SESSION).status_code in {400, 404}
+        assert client.get("/artifacts/%2e%2e/x", headers=SESSION).status_code == 400
+        assert client.get("/artifacts/data.csv").status_code == 400
+        assert client.get("/artifacts/nope.csv", headers=SESSION).status_code == 404
+
+    def test_session_id_cannot_name_a_shared_store(
+        self, client: TestClient, temp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """A header that walks out of session_<id> is refused before any use."""
+        (temp_dir / "blobs").mkdir()
+        headers = {"mcp-session-id": "s1/../blobs"}
+        assert client.get("/artifacts/x", headers=headers).status_code == 400
+        assert metadata_store.get("blobs") is None
@@ -0,0 +1,54 @@
+"""Unit tests for server.routes.export (the /export route)."""
+
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from server.routes.export import export_workspace
+
+SESSION = {"mcp-session-id": "s1"}
+
+
+@pytest.fixture
+def client(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr("server.routes.export.TMP_DIR", temp_dir)
+    out = temp_dir / "session_s1" / "output"
+    (out / "plots").mkdir(parents=True)
+    (out / "plots" / "a.png").write_bytes(b"png")
+    (out / "data.csv").write_text("x\n")
+    return TestClient(Starlette(routes=[Route("/export", export_workspace)]))
+
+
+class TestExportRoute:
+    """Test the streaming export endpoint."""
+
+    def test_streams_filtered_zip(self, client: TestClient) -> None:
+        """A glob-filtered zip of output/ is streamed back."""
+        resp = client.get("/export?glob=*.png", headers=SESSION)
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/zip"
+        assert "output.zip" in resp.headers["content-disposition"]
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            assert zf.namelist() == ["plots/a.png"]
+
+    def test_bad_requests(self, client: TestClient) -> None:
+        """Missing sessions, unknown formats and escaping paths are rejected."""
+        assert client.get("/export").status_code == 400
+        assert client.get("/export?format=rar", headers=SESSION).status_code == 400
+        assert client.get("/export?path=../..", headers=SESSION).status_code == 400
+        assert client.get("/export?since=yesterday", headers=SESSION).status_code == 400
+        assert client.get("/export?path=missing", headers=SESSION).status_code == 404
+
+    def test_session_id_cannot_escape_tmp_dir(self, client: TestClient) -> None:
+        """A crafted session id never turns into a path outside TMP_DIR."""
+        for session_id in ("x/../../../../../..", "..", "a b", "s1/.."):
+            resp = client.get(
+                "/export?path=etc&glob=hostname",
+                headers={"mcp-session-id": session_id},
+            )
+            assert resp.status_code == 400, session_id
@@ -0,0 +1,32 @@
+"""Unit tests for server.routes.metrics (the /metrics route)."""
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from server import metrics
+from server.routes.metrics import get_metrics
+
+
+class TestMetricsRoute:
+    """Test the Prometheus exposition."""
+
+    def test_renders_registered_metrics(self) -> None:
+        """Counters and histogram buckets are cumulative and well formed."""
+        histogram = metrics.Histogram("test_seconds", "Test.", (0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        client = TestClient(Starlette(routes=[Route("/metrics", get_metrics)]))
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE primcs_hibernations_total counter" in body
+        assert "# TYPE primcs_restore_seconds histogram" in body
+        assert 'test_seconds_bucket{le="0.1"} 1' in body
+        assert 'test_seconds_bucket{le="1"} 2' in body
+        assert 'test_seconds_bucket{le="+Inf"} 3' in body
+        assert "test_seconds_count 3" in body
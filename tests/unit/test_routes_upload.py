@@ -0,0 +1,117 @@
+"""Unit tests for server.routes.upload (the PUT /mounts/<path> route)."""
+
+import base64
+import hashlib
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from server.routes.upload import upload_mount
+
+SESSION = {"mcp-session-id": "s1"}
+
+
+@pytest.fixture
+def client(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr("server.routes.upload.TMP_DIR", temp_dir)
+    return TestClient(
+        Starlette(
+            routes=[
+                Route("/mounts/{relative_path:path}", upload_mount, methods=["PUT"])
+            ]
+        )
+    )
+
+
+def _chunks(data: bytes, size: int = 1000):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+class TestUploadRoute:
+    """Test streaming uploads into mounts/."""
+
+    def test_streams_body_into_mounts(self, client: TestClient, temp_dir: Path) -> None:
+        """A chunked body lands read-only at mounts/<path> with its hash."""
+        data = b"a,b\n1,2\n" * 5000
+        resp = client.put("/mounts/data/in.csv", content=_chunks(data), headers=SESSION)
+
+        assert resp.status_code == 201
+        body = resp.json()
+        assert body["mounted_as"] == "mounts/data/in.csv"
+        assert body["bytes"] == len(data)
+        assert body["sha256"] == hashlib.sha256(data).hexdigest()
+        target = temp_dir / "session_s1" / "mounts" / "data" / "in.csv"
+        assert target.read_bytes() == data
+        assert not target.stat().st_mode & 0o222
+        assert [p.name for p in target.parent.iterdir()] == ["in.csv"]
+
+    def test_checksum_verification(self, client: TestClient, temp_dir: Path) -> None:
+        """Matching digests are accepted; a mismatch is discarded."""
+        data = b"payload"
+        digest = base64.b64encode(hashlib.sha256(data).digest()).decode()
+        ok = client.put(
+            "/mounts/a.bin",
+            content=data,
+            headers={**SESSION, "Content-Digest": f"sha-256=:{digest}:"},
+        )
+        assert ok.status_code == 201
+
+        bad = client.put(
+            "/mounts/b.bin",
+            content=data,
+            headers={**SESSION, "X-Checksum-Sha256": "00" * 32},
+        )
+        assert bad.status_code == 422
+        assert sorted(
+            p.name for p in (temp_dir / "session_s1" / "mounts").iterdir()
+        ) == ["a.bin"]
+
+    def test_size_cap(
+        self, client: TestClient, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Bodies over the cap are refused, whether announced or streamed."""
+        monkeypatch.setattr("server.routes.upload.UPLOAD_MAX_BYTES", 100)
+        assert (
+            client.put("/mounts/x", content=b"x" * 101, headers=SESSION).status_code
+            == 413
+        )
+        streamed = client.put(
+            "/mounts/x", content=_chunks(b"x" * 500, 50), headers=SESSION
+        )
+        assert streamed.status_code == 413
+        assert list((temp_dir / "session_s1" / "mounts").iterdir()) == []
+
+    def test_session_quota(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """An upload that would take the session over its quota is refused."""
+        monkeypatch.setattr("server.sandbox.quota.QUOTA_BYTES", 100)
+        resp = client.put("/mounts/x", content=b"x" * 101, headers=SESSION)
+        assert resp.status_code == 507
+        assert "disk quota" in resp.text
+
+    def test_token_and_bad_requests(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """The bearer token is enforced when configured; bad paths are rejected."""
+        monkeypatch.setattr("server.routes.upload.UPLOAD_TOKEN", "secret")
+        assert client.put("/mounts/a", content=b"1", headers=SESSION).status_code == 401
+        auth = {**SESSION, "Authorization": "Bearer secret"}
+        assert client.put("/mounts/a", content=b"1", headers=auth).status_code == 201
+
+        no_sid = {"Authorization": "Bearer secret"}
+        assert client.put("/mounts/a", content=b"1", headers=no_sid).status_code == 400
+        bad_sid = {**no_sid, "mcp-session-id": "../x"}
+        assert client.put("/mounts/a", content=b"1", headers=bad_sid).status_code == 400
+        escape = client.put("/mounts/%2E%2E/a", content=b"1", headers=auth)
+        assert escape.status_code == 400
+
+    def test_replaces_existing_mount(self, client: TestClient, temp_dir: Path) -> None:
+        """Re-uploading swaps the file atomically, even if it is read-only."""
+        client.put("/mounts/a.txt", content=b"old", headers=SESSION)
+        client.put("/mounts/a.txt", content=b"new", headers=SESSION)
+        assert (temp_dir / "session_s1" / "mounts" / "a.txt").read_bytes() == b"new"
@@ -0,0 +1,111 @@
+"""Unit tests for server.sandbox.archive."""
+
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.archive import detect_format, extract_archive
+
+
+def _zip(path: Path, members: dict[str, bytes]) -> Path:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def _targz(path: Path, members: dict[str, bytes]) -> Path:
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return path
+
+
+class TestExtractArchive:
+    """Test archive extraction and its safety limits."""
+
+    def test_detect_format(self) -> None:
+        """Formats are inferred from suffixes, ignoring query strings."""
+        assert detect_format("https://x/data.tar.gz?sig=1") == "tar.gz"
+        assert detect_format("set.TGZ") == "tar.gz"
+        assert detect_format("a.tar.zst") == "tar.zst"
+        assert detect_format("a.zip") == "zip"
+        assert detect_format("a.csv") is None
+
+    @pytest.mark.parametrize(("builder", "fmt"), [(_zip, "zip"), (_targz, "tar.gz")])
+    def test_extracts_members(self, temp_dir: Path, builder, fmt: str) -> None:
+        """Members land under dest and are read-only."""
+        archive = builder(
+            temp_dir / f"a.{fmt}", {"x.csv": b"1,2\n", "sub/y.txt": b"hello"}
+        )
+        dest = temp_dir / "mounts" / "data"
+        with archive.open("rb") as fh:
+            info = extract_archive(fh, dest, fmt)
+
+        assert info == {"files": 2, "bytes": 9}
+        assert (dest / "sub" / "y.txt").read_bytes() == b"hello"
+        assert not (dest / "x.csv").stat().st_mode & 0o222
+
+    def test_rejects_path_traversal(self, temp_dir: Path) -> None:
+        """Members escaping the destination abort extraction."""
+        archive = _targz(temp_dir / "evil.tar.gz", {"../escape.txt": b"x"})
+        with archive.open("rb") as fh, pytest.raises(ValueError, match="Unsafe"):
+            extract_archive(fh, temp_dir / "out", "tar.gz")
+        assert not (temp_dir / "escape.txt").exists()
+        assert not (temp_dir / "out").exists()
+
+    def test_rejects_symlinks(self, temp_dir: Path) -> None:
+        """Link members are refused."""
+        archive = temp_dir / "link.tar"
+        with tarfile.open(archive, "w") as tf:
+            info = tarfile.TarInfo("passwd")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "/etc/passwd"
+            tf.addfile(info)
+        with archive.open("rb") as fh, pytest.raises(ValueError, match="links"):
+            extract_archive(fh, temp_dir / "out", "tar")
+
+    def test_rejects_duplicate_members(self, temp_dir: Path) -> None:
+        """A name appearing twice aborts extraction instead of overwriting."""
+        archive = temp_dir / "dup.zip"
+        with zipfile.ZipFile(archive, "w") as zf, pytest.warns(UserWarning):
+            zf.writestr("x.csv", b"1")
+            zf.writestr("x.csv", b"2")
+        with archive.open("rb") as fh, pytest.raises(ValueError, match="Duplicate"):
+            extract_archive(fh, temp_dir / "out", "zip")
+        assert not (temp_dir / "out").exists()
+
+    def test_ratio_cap_stops_zip_bombs(self, temp_dir: Path) -> None:
+        """Highly compressible payloads trip the expansion ratio cap."""
+        archive = _zip(temp_dir / "bomb.zip", {"zeros": b"\0" * 5_000_000})
+        with archive.open("rb") as fh, pytest.raises(ValueError, match="limit"):
+            extract_archive(fh, temp_dir / "out", "zip", max_ratio=10)
+        assert not (temp_dir / "out").exists()
+
+    def test_failed_extraction_keeps_previous_contents(self, temp_dir: Path) -> None:
+        """A failure leaves an earlier extraction in place."""
+        dest = temp_dir / "out"
+        good = _zip(temp_dir / "good.zip", {"keep.txt": b"keep"})
+        with good.open("rb") as fh:
+            extract_archive(fh, dest, "zip")
+
+        big = _zip(temp_dir / "big.zip", {"big": b"x" * 1000})
+        with big.open("rb") as fh, pytest.raises(ValueError):
+            extract_archive(fh, dest, "zip", max_bytes=100)
+        assert (dest / "keep.txt").read_bytes() == b"keep"
+
+    def test_replaces_a_file_at_dest(self, temp_dir: Path) -> None:
+        """An existing file at dest is swapped out without leaving it behind."""
+        dest = temp_dir / "out"
+        dest.write_text("old")
+        archive = _zip(temp_dir / "a.zip", {"x.txt": b"new"})
+        with archive.open("rb") as fh:
+            extract_archive(fh, dest, "zip")
+
+        assert (dest / "x.txt").read_bytes() == b"new"
+        assert sorted(p.name for p in temp_dir.iterdir()) == ["a.zip", "out"]
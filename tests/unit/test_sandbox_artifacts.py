@@ -0,0 +1,73 @@
+"""Unit tests for server.sandbox.artifacts (incremental artifact index)."""
+
+from pathlib import Path
+
+from server.sandbox.artifacts import ArtifactIndex
+
+
+def _paths(items: list) -> list[str]:
+    return sorted(a["relative_path"] for a in items)
+
+
+class TestArtifactIndex:
+    """Test change detection between runs."""
+
+    def test_reports_only_changes(self, temp_dir: Path) -> None:
+        """Each refresh reports created, modified and deleted files once."""
+        out = temp_dir / "output"
+        (out / "sub").mkdir(parents=True)
+        (out / "a.csv").write_text("1")
+        (out / "sub" / "b.png").write_bytes(b"x")
+
+        first = ArtifactIndex(temp_dir).refresh()
+        assert _paths(first["created"]) == ["a.csv", "sub/b.png"]
+        assert first["modified"] == first["deleted"] == []
+        png = next(a for a in first["created"] if a["name"] == "b.png")
+        assert png["mime"] == "image/png"
+
+        assert ArtifactIndex(temp_dir).refresh() == {
+            "created": [],
+            "modified": [],
+            "deleted": [],
+        }
+
+        (out / "a.csv").write_text("12")
+        (out / "sub" / "b.png").unlink()
+        (out / "c.txt").write_text("new")
+        changes = ArtifactIndex(temp_dir).refresh()
+        assert _paths(changes["created"]) == ["c.txt"]
+        assert _paths(changes["modified"]) == ["a.csv"]
+        assert changes["deleted"] == ["sub/b.png"]
+
+    def test_listing_is_complete(self, temp_dir: Path) -> None:
+        """listing() returns all indexed artifacts, not just the last changes."""
+        (temp_dir / "output").mkdir()
+        (temp_dir / "output" / "a.txt").write_text("a")
+        ArtifactIndex(temp_dir).refresh()
+        (temp_dir / "output" / "b.txt").write_text("b")
+        index = ArtifactIndex(temp_dir)
+        index.refresh()
+
+        assert _paths(index.listing()) == ["a.txt", "b.txt"]
+
+    def test_refresh_selected_paths(self, temp_dir: Path) -> None:
+        """With explicit paths only those files are examined."""
+        out = temp_dir / "output"
+        out.mkdir()
+        (out / "a.txt").write_text("a")
+        index = ArtifactIndex(temp_dir)
+        index.refresh()
+        (out / "b.txt").write_text("b")
+        (out / "a.txt").unlink()
+
+        changes = index.refresh(["a.txt"])
+        assert changes["deleted"] == ["a.txt"]
+        assert changes["created"] == []
+
+    def test_optional_hash(self, temp_dir: Path) -> None:
+        """Hashes are recorded only when enabled."""
+        (temp_dir / "output").mkdir()
+        (temp_dir / "output" / "a.txt").write_text("a")
+
+        [meta] = ArtifactIndex(temp_dir, hash_files=True).refresh()["created"]
+        assert meta["sha256"].startswith("ca978112")
@@ -0,0 +1,70 @@
+"""Unit tests for server.sandbox.bytecode (shared compiled-module cache)."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from server.sandbox.bytecode import precompile, prune
+
+TAG = sys.implementation.cache_tag
+
+
+def _venv(root: Path) -> Path:
+    site = root / "lib" / "python3.x" / "site-packages" / "pkg"
+    site.mkdir(parents=True)
+    (site / "__init__.py").write_text("")
+    (site / "mod.py").write_text(
+        "def where():\n    return where.__code__.co_filename\n"
+    )
+    (site / "py2.py").write_text("print 'legacy'\n")
+    return root
+
+
+class TestBytecodeCache:
+    """Test compiling once and sharing the result."""
+
+    def test_second_environment_links_cached_pycs(self, temp_dir: Path) -> None:
+        """Identical sources compile once; later builds hardlink the pyc."""
+        store = temp_dir / "pycache"
+        first = precompile(_venv(temp_dir / "a"), store)
+        assert (first["compiled"], first["cached"]) == (2, 0)
+
+        second = precompile(_venv(temp_dir / "b"), store)
+        assert (second["compiled"], second["cached"]) == (0, 2)
+
+        pyc = f"lib/python3.x/site-packages/pkg/__pycache__/mod.{TAG}.pyc"
+        a, b = temp_dir / "a" / pyc, temp_dir / "b" / pyc
+        assert a.stat().st_ino == b.stat().st_ino
+        assert not (temp_dir / "b" / pyc).with_name(f"py2.{TAG}.pyc").exists()
+
+    def test_cached_pyc_is_used_from_another_location(self, temp_dir: Path) -> None:
+        """The interpreter accepts the shared pyc and reports the real path."""
+        store = temp_dir / "pycache"
+        precompile(_venv(temp_dir / "a"), store)
+        venv = _venv(temp_dir / "b")
+        precompile(venv, store)
+        site = venv / "lib" / "python3.x" / "site-packages"
+
+        proc = subprocess.run(
+            [sys.executable, "-v", "-c", "import pkg.mod; print(pkg.mod.where())"],
+            env={**os.environ, "PYTHONPATH": str(site), "PYTHONDONTWRITEBYTECODE": "1"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert proc.stdout.strip() == str(site / "pkg" / "mod.py")
+        assert f"code object from '{site / 'pkg' / '__pycache__'}" in proc.stderr
+
+    def test_prune_removes_unreferenced_entries(self, temp_dir: Path) -> None:
+        """Entries are dropped once no environment links to them."""
+        store = temp_dir / "pycache"
+        venv = _venv(temp_dir / "a")
+        precompile(venv, store)
+        assert prune(0, store) == 0  # still linked from the venv
+
+        for pyc in venv.rglob("*.pyc"):
+            pyc.unlink()
+        assert prune(3600, store) == 0  # too recent
+        assert prune(0, store) == 2
+        assert list(store.glob("??/*.pyc")) == []
@@ -0,0 +1,350 @@
+"""Unit tests for server.sandbox.downloader and the shared blob store."""
+
+import asyncio
+import io
+import zipfile
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from server.sandbox import downloader
+from server.sandbox.blobstore import BlobStore
+from server.sandbox.downloader import download_files
+
+
+@pytest.fixture
+async def file_server() -> AsyncGenerator[tuple[TestServer, dict[str, int]]]:
+    """Serve a couple of static bodies and count requests per path."""
+    hits: dict[str, int] = {}
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, "w") as zf:
+        zf.writestr("inner.csv", b"1,2")
+    bodies = {
+        "/data.csv": b"a,b\n1,2\n",
+        "/copy.csv": b"a,b\n1,2\n",
+        "/fresh.csv": b"fresh",
+        "/etag.csv": b"validated",
+        "/slow.csv": b"slow body",
+        "/bundle.zip": bundle.getvalue(),
+    }
+
+    async def handler(request: web.Request) -> web.Response:
+        hits[request.path] = hits.get(request.path, 0) + 1
+        if request.path == "/slow.csv":
+            await asyncio.sleep(0.2)
+        if request.path == "/broken.csv":
+            await asyncio.sleep(0.1)
+            return web.Response(status=500)
+        if request.path == "/fresh.csv":
+            return web.Response(
+                body=bodies[request.path], headers={"Cache-Control": "max-age=600"}
+            )
+        if request.path == "/etag.csv":
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304, headers={"ETag": '"v1"'})
+            return web.Response(
+                body=bodies[request.path],
+                headers={"ETag": '"v1"', "Cache-Control": "no-cache"},
+            )
+        return web.Response(body=bodies[request.path])
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield server, hits
+    finally:
+        await server.close()
+
+
+class TestDownloadFiles:
+    """Test mount downloads through the blob store."""
+
+    @pytest.mark.asyncio
+    async def test_same_url_downloaded_once_across_sessions(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """A URL mounted by two sessions is fetched once and hardlinked."""
+        server, hits = file_server
+        store = BlobStore(temp_dir / "blobs")
+        url = str(server.make_url("/fresh.csv"))
+
+        a = temp_dir / "session_a" / "mounts"
+        b = temp_dir / "session_b" / "mounts"
+        await download_files([{"url": url, "mountPath": "d/data.csv"}], a, store)
+        await download_files([{"url": url, "mountPath": "data.csv"}], b, store)
+
+        assert hits["/fresh.csv"] == 1
+        first, second = a / "d" / "data.csv", b / "data.csv"
+        assert first.read_bytes() == b"fresh"
+        assert first.stat().st_ino == second.stat().st_ino
+        assert not first.stat().st_mode & 0o222  # read-only
+
+    @pytest.mark.asyncio
+    async def test_identical_content_stored_once(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """Two URLs with the same body share a single blob."""
+        server, _ = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [
+            {"url": str(server.make_url("/data.csv")), "mountPath": "one.csv"},
+            {"url": str(server.make_url("/copy.csv")), "mountPath": "two.csv"},
+        ]
+        await download_files(files, temp_dir / "mounts", store)
+
+        blobs = [p for p in (temp_dir / "blobs" / "objects").rglob("*") if p.is_file()]
+        assert len(blobs) == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_status_reporting(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """Fresh entries are hits, validated entries 304s, others misses."""
+        server, hits = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [
+            {"url": str(server.make_url("/fresh.csv")), "mountPath": "fresh.csv"},
+            {"url": str(server.make_url("/etag.csv")), "mountPath": "etag.csv"},
+            {"url": str(server.make_url("/data.csv")), "mountPath": "data.csv"},
+        ]
+
+        first = await download_files(files, temp_dir / "mounts", store)
+        assert [m["cache"] for m in first] == ["miss", "miss", "miss"]
+
+        second = await download_files(files, temp_dir / "mounts", store)
+        assert [m["cache"] for m in second] == ["hit", "revalidated", "miss"]
+        assert hits == {"/fresh.csv": 1, "/etag.csv": 2, "/data.csv": 2}
+        assert (temp_dir / "mounts" / "etag.csv").read_bytes() == b"validated"
+        assert second[1]["bytes"] == len(b"validated")
+
+    @pytest.mark.asyncio
+    async def test_extract_archive_mount(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """extract=true unpacks the archive into mounts/<mountPath>/."""
+        server, _ = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [
+            {
+                "url": str(server.make_url("/bundle.zip")),
+                "mountPath": "bundle",
+                "extract": True,
+            }
+        ]
+
+        [info] = await download_files(files, temp_dir / "mounts", store)
+
+        assert info["archive_format"] == "zip"
+        assert info["extracted_files"] == 1
+        assert (temp_dir / "mounts" / "bundle" / "inner.csv").read_bytes() == b"1,2"
+
+    @pytest.mark.asyncio
+    async def test_convert_writes_cached_sidecar(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """convert writes a columnar sidecar that later mounts reuse."""
+        pytest.importorskip("pyarrow")
+        server, _ = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [
+            {
+                "url": str(server.make_url("/data.csv")),
+                "mountPath": "data.csv",
+                "convert": "parquet",
+            }
+        ]
+
+        [info] = await download_files(files, temp_dir / "s1", store)
+        [again] = await download_files(files, temp_dir / "s2", store)
+
+        assert info["sidecar"] == "data.csv.parquet"
+        assert info["table"] == {
+            "format": "parquet",
+            "rows": 1,
+            "columns": {"a": "int64", "b": "int64"},
+        }
+        assert again["table"] == info["table"]
+        first = (temp_dir / "s1" / "data.csv.parquet").stat()
+        second = (temp_dir / "s2" / "data.csv.parquet").stat()
+        assert first.st_ino == second.st_ino  # one stored conversion
+
+    @pytest.mark.asyncio
+    async def test_failed_conversion_keeps_the_mount(
+        self,
+        temp_dir: Path,
+        file_server: tuple[TestServer, dict[str, int]],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """A table pyarrow cannot convert is still mounted, with a warning."""
+
+        def fail(*_args: object) -> None:
+            raise ValueError("CSV conversion error to int64: invalid value 'x'")
+
+        monkeypatch.setattr(downloader.tabular, "convert_table", fail)
+        server, _ = file_server
+        files = [
+            {
+                "url": str(server.make_url("/data.csv")),
+                "mountPath": "data.csv",
+                "convert": "parquet",
+            }
+        ]
+
+        [info] = await download_files(
+            files, temp_dir / "mounts", BlobStore(temp_dir / "blobs")
+        )
+
+        assert (temp_dir / "mounts" / "data.csv").read_bytes() == b"a,b\n1,2\n"
+        assert "table" not in info and "sidecar" not in info
+        assert "invalid value 'x'" in info["sidecar_error"]
+        assert not (temp_dir / "mounts" / "data.csv.parquet").exists()
+
+    @pytest.mark.asyncio
+    async def test_convert_rejects_non_tabular_mount(self, temp_dir: Path) -> None:
+        """Only CSV/TSV/JSONL mounts can be converted."""
+        with pytest.raises(ValueError, match="only .csv"):
+            await download_files(
+                [{"url": "http://x.invalid/a.bin", "mountPath": "a.bin", "convert": 1}],
+                temp_dir / "mounts",
+                BlobStore(temp_dir / "blobs"),
+            )
+
+    @pytest.mark.asyncio
+    async def test_traversing_mount_path_rejected(self, temp_dir: Path) -> None:
+        """mountPath may not escape the mounts directory."""
+        with pytest.raises(ValueError, match=r"'\.\.'"):
+            await download_files(
+                [{"url": "http://example.invalid/x", "mountPath": "../x"}],
+                temp_dir / "mounts",
+                BlobStore(temp_dir / "blobs"),
+            )
+
+    @pytest.mark.asyncio
+    async def test_missing_mount_path_rejected(self, temp_dir: Path) -> None:
+        """Entries without a mountPath are rejected."""
+        store = BlobStore(temp_dir / "blobs")
+        with pytest.raises(ValueError, match="mountPath"):
+            await download_files(
+                [{"url": "http://example.invalid/x"}], temp_dir / "mounts", store
+            )
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical downloads."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_fetch(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """Twenty simultaneous mounts of one URL issue a single request."""
+        server, hits = file_server
+        store = BlobStore(temp_dir / "blobs")
+        url = str(server.make_url("/slow.csv"))
+
+        results = await asyncio.gather(
+            *(
+                download_files(
+                    [{"url": url, "mountPath": "slow.csv"}],
+                    temp_dir / f"session_{i}" / "mounts",
+                    store,
+                )
+                for i in range(20)
+            )
+        )
+
+        assert hits["/slow.csv"] == 1
+        assert all(r[0]["bytes"] == len(b"slow body") for r in results)
+        assert not downloader._inflight
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """A failed shared fetch raises in all callers."""
+        server, hits = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [{"url": str(server.make_url("/broken.csv")), "mountPath": "b.csv"}]
+
+        results = await asyncio.gather(
+            download_files(files, temp_dir / "a", store),
+            download_files(files, temp_dir / "b", store),
+            return_exceptions=True,
+        )
+
+        assert hits["/broken.csv"] == 1
+        assert all(isinstance(r, aiohttp.ClientResponseError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelling_one_waiter_keeps_flight_alive(
+        self, temp_dir: Path, file_server: tuple[TestServer, dict[str, int]]
+    ) -> None:
+        """Only the last departing waiter cancels the download."""
+        server, hits = file_server
+        store = BlobStore(temp_dir / "blobs")
+        files = [{"url": str(server.make_url("/slow.csv")), "mountPath": "s.csv"}]
+
+        quitter = asyncio.create_task(download_files(files, temp_dir / "a", store))
+        stayer = asyncio.create_task(download_files(files, temp_dir / "b", store))
+        await asyncio.sleep(0.05)
+        quitter.cancel()
+
+        mounted = await stayer
+        assert mounted[0]["bytes"] == len(b"slow body")
+        assert hits["/slow.csv"] == 1
+
+        # No validators on /slow.csv, so this caller starts a fresh flight.
+        lonely = asyncio.create_task(download_files(files, temp_dir / "c", store))
+        await asyncio.sleep(0.05)
+        flight = next(iter(downloader._inflight.values()))
+        lonely.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lonely
+        await asyncio.sleep(0)
+        assert flight.task.cancelled()
+
+
+class TestCacheMeta:
+    """Test freshness parsing of response headers."""
+
+    @pytest.mark.parametrize(("age", "max_age"), [("30", 70.0), ("soon", 100.0)])
+    def test_age_reduces_max_age(self, age: str, max_age: float) -> None:
+        """A valid Age counts against max-age; a malformed one is ignored."""
+        meta = downloader._cache_meta({"Cache-Control": "max-age=100", "Age": age})
+        assert meta["max_age"] == max_age
+
+
+class TestBlobStore:
+    """Test blob store bookkeeping and eviction."""
+
+    def _add(self, store: BlobStore, digest: str, data: bytes, url: str) -> Path:
+        tmp = store.temp_path()
+        tmp.write_bytes(data)
+        return store.add(tmp, digest, url)
+
+    def test_index_persists_across_instances(self, temp_dir: Path) -> None:
+        """The URL index survives a restart."""
+        store = BlobStore(temp_dir / "blobs")
+        self._add(store, "ab" * 32, b"payload", "http://x/1")
+
+        reopened = BlobStore(temp_dir / "blobs")
+        entry = reopened.lookup("http://x/1")
+        assert entry is not None
+        assert entry["size"] == len(b"payload")
+
+    def test_evicts_unreferenced_lru_blobs(self, temp_dir: Path) -> None:
+        """Only unreferenced blobs are evicted once over budget."""
+        store = BlobStore(temp_dir / "blobs", budget_bytes=10)
+        self._add(store, "aa" * 32, b"123456", "http://x/old")
+        store.materialize("aa" * 32, temp_dir / "mounts" / "old")  # referenced
+        self._add(store, "bb" * 32, b"654321", "http://x/mid")
+        self._add(store, "cc" * 32, b"abcdef", "http://x/new")
+
+        assert store.lookup("http://x/old") is not None
+        assert store.lookup("http://x/mid") is None
+        assert store.lookup("http://x/new") is not None
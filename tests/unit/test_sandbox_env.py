@@ -6,7 +6,12 @@ from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
-from server.sandbox.env import _DEFAULT_PACKAGES, create_virtualenv
+from server.sandbox.env import _DEFAULT_PACKAGES, _LAYERS_PTH, create_virtualenv
+
+
+def _pth(run_dir: Path) -> Path:
+    [pth] = (run_dir / "venv").glob(f"**/site-packages/{_LAYERS_PTH}")
+    return pth
 
 
 class TestCreateVirtualenv:
@@ -14,156 +19,94 @@ class TestCreateVirtualenv:
 
     @pytest.mark.asyncio
     async def test_create_virtualenv_success(self, temp_dir: Path) -> None:
-        """Test successful virtual environment creation."""
+        """The venv gets no packages of its own, only the composed layers."""
         requirements = ["numpy", "pandas"]
+        sites = [temp_dir / "layers" / "top", temp_dir / "layers" / "base"]
 
         with (
             patch("server.sandbox.env.venv") as mock_venv,
             patch(
-                "server.sandbox.env.asyncio.create_subprocess_exec"
-            ) as mock_subprocess,
+                "server.sandbox.env.layers.compose", AsyncMock(return_value=sites)
+            ) as mock_compose,
         ):
-            # Mock venv creation
             mock_builder = Mock()
             mock_venv.EnvBuilder.return_value = mock_builder
 
-            # Mock subprocess for pip install
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(return_value=(b"", b""))
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
-
-            # Call function
             python_path = await create_virtualenv(requirements, temp_dir)
 
-            # Verify venv creation
-            mock_venv.EnvBuilder.assert_called_once_with(with_pip=True, clear=True)
-            mock_builder.create.assert_called_once()
-
-            # Verify pip install call
-            mock_subprocess.assert_called_once()
-            args = mock_subprocess.call_args[0]
-
-            # Check that python executable path is correct
-            expected_python = (
-                temp_dir
-                / "venv"
-                / ("Scripts" if sys.platform.startswith("win") else "bin")
-                / "python"
-            )
-            assert Path(args[0]) == expected_python
-            assert args[1:4] == ("-m", "pip", "install")
-            assert "--no-cache-dir" in args
-
-            # Check that requirements include both custom and default packages
-            install_args = args[4:]  # Skip python, -m, pip, install
-            install_args = [arg for arg in install_args if arg != "--no-cache-dir"]
-
-            expected_packages = list(dict.fromkeys(requirements + _DEFAULT_PACKAGES))
-            for package in expected_packages:
-                assert package in install_args
-
-            # Check return value
-            assert python_path == expected_python
+            mock_venv.EnvBuilder.assert_called_once_with(with_pip=False, clear=True)
+            mock_builder.create.assert_called_once_with(temp_dir / "venv")
+            mock_compose.assert_awaited_once_with(requirements, _DEFAULT_PACKAGES)
+
+        expected_python = (
+            temp_dir
+            / "venv"
+            / ("Scripts" if sys.platform.startswith("win") else "bin")
+            / "python"
+        )
+        assert python_path == expected_python
+        # Topmost layer first, added with addsitedir so its .pth files apply.
+        assert _pth(temp_dir).read_text().splitlines() == [
+            f"import site; site.addsitedir({str(site)!r})" for site in sites
+        ]
 
     @pytest.mark.asyncio
-    async def test_create_virtualenv_pip_failure(self, temp_dir: Path) -> None:
-        """Test virtual environment creation with pip install failure."""
-        requirements = ["invalid-package"]
-
+    async def test_create_virtualenv_layer_failure(self, temp_dir: Path) -> None:
+        """A failed layer build fails the environment."""
         with (
-            patch("server.sandbox.env.venv") as mock_venv,
+            patch("server.sandbox.env.venv"),
             patch(
-                "server.sandbox.env.asyncio.create_subprocess_exec"
-            ) as mock_subprocess,
+                "server.sandbox.env.layers.compose",
+                AsyncMock(side_effect=RuntimeError("pip install failed: boom")),
+            ),
+            pytest.raises(RuntimeError, match="pip install failed"),
         ):
-            # Mock venv creation
-            mock_builder = Mock()
-            mock_venv.EnvBuilder.return_value = mock_builder
-
-            # Mock subprocess for pip install failure
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(
-                return_value=(b"", b"ERROR: Could not find package")
-            )
-            mock_process.returncode = 1
-            mock_subprocess.return_value = mock_process
-
-            # Should raise RuntimeError
-            with pytest.raises(RuntimeError, match="pip install failed"):
-                _ = await create_virtualenv(requirements, temp_dir)
+            await create_virtualenv(["invalid-package"], temp_dir)
 
     @pytest.mark.asyncio
     async def test_create_virtualenv_no_requirements(self, temp_dir: Path) -> None:
-        """Test virtual environment creation with no additional requirements."""
-        requirements: list[str] = []
-
+        """Without requirements the default packages still form the base."""
         with (
-            patch("server.sandbox.env.venv") as mock_venv,
+            patch("server.sandbox.env.venv"),
             patch(
-                "server.sandbox.env.asyncio.create_subprocess_exec"
-            ) as mock_subprocess,
+                "server.sandbox.env.layers.compose", AsyncMock(return_value=[])
+            ) as mock_compose,
         ):
-            # Mock venv creation
-            mock_builder = Mock()
-            mock_venv.EnvBuilder.return_value = mock_builder
-
-            # Mock subprocess for pip install
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(return_value=(b"", b""))
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
+            await create_virtualenv([], temp_dir)
 
-            # Call function
-            _ = await create_virtualenv(requirements, temp_dir)
+        mock_compose.assert_awaited_once_with([], _DEFAULT_PACKAGES)
 
-            # Should still install default packages
-            mock_subprocess.assert_called_once()
-            args = mock_subprocess.call_args[0]
-            install_args = args[4:]  # Skip python, -m, pip, install
-            install_args = [arg for arg in install_args if arg != "--no-cache-dir"]
+    @pytest.mark.asyncio
+    async def test_create_virtualenv_without_defaults(self, temp_dir: Path) -> None:
+        """Without defaults no base layer is stacked; nothing needs no layers."""
+        with (
+            patch("server.sandbox.env.venv"),
+            patch(
+                "server.sandbox.env.layers.compose", AsyncMock(return_value=[])
+            ) as mock_compose,
+        ):
+            await create_virtualenv(["scikit-learn"], temp_dir, defaults=[])
+            mock_compose.assert_awaited_once_with(["scikit-learn"], [])
 
-            for package in _DEFAULT_PACKAGES:
-                assert package in install_args
+            mock_compose.reset_mock()
+            await create_virtualenv([], temp_dir, defaults=[])
+            mock_compose.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_create_virtualenv_duplicate_requirements(
         self, temp_dir: Path
     ) -> None:
         """Test that duplicate requirements are deduplicated."""
-        requirements = [
-            "pandas",
-            "numpy",
-            "pandas",
-        ]  # pandas is duplicated and also in defaults
-
         with (
-            patch("server.sandbox.env.venv") as mock_venv,
+            patch("server.sandbox.env.venv"),
             patch(
-                "server.sandbox.env.asyncio.create_subprocess_exec"
-            ) as mock_subprocess,
+                "server.sandbox.env.layers.compose", AsyncMock(return_value=[])
+            ) as mock_compose,
         ):
-            # Mock venv creation
-            mock_builder = Mock()
-            mock_venv.EnvBuilder.return_value = mock_builder
-
-            # Mock subprocess for pip install
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(return_value=(b"", b""))
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
-
-            # Call function
-            _ = await create_virtualenv(requirements, temp_dir)
+            await create_virtualenv(["pandas", "numpy", "pandas"], temp_dir)
 
-            # Check that duplicates are removed
-            args = mock_subprocess.call_args[0]
-            install_args = args[4:]  # Skip python, -m, pip, install
-            install_args = [arg for arg in install_args if arg != "--no-cache-dir"]
-
-            # pandas should appear only once
-            pandas_count = install_args.count("pandas")
-            assert pandas_count == 1
+        requirements, _ = mock_compose.call_args[0]
+        assert requirements == ["pandas", "numpy"]
 
     def test_default_packages_constant(self) -> None:
         """Test that default packages are properly defined."""
@@ -176,28 +119,11 @@ class TestCreateVirtualenv:
     @pytest.mark.asyncio
     async def test_create_virtualenv_windows_path(self, temp_dir: Path) -> None:
         """Test that Windows-style paths are handled correctly."""
-        requirements = ["numpy"]
-
         with (
-            patch("server.sandbox.env.venv") as mock_venv,
-            patch(
-                "server.sandbox.env.asyncio.create_subprocess_exec"
-            ) as mock_subprocess,
+            patch("server.sandbox.env.venv"),
+            patch("server.sandbox.env.layers.compose", AsyncMock(return_value=[])),
             patch("server.sandbox.env.sys.platform", "win32"),
         ):
-            # Mock venv creation
-            mock_builder = Mock()
-            mock_venv.EnvBuilder.return_value = mock_builder
-
-            # Mock subprocess for pip install
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(return_value=(b"", b""))
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
-
-            # Call function
-            python_path = await create_virtualenv(requirements, temp_dir)
+            python_path = await create_virtualenv(["numpy"], temp_dir)
 
-            # Check that Windows path is used
-            expected_python = temp_dir / "venv" / "Scripts" / "python"
-            assert python_path == expected_python
+        assert python_path == temp_dir / "venv" / "Scripts" / "python"
@@ -0,0 +1,95 @@
+"""Unit tests for server.sandbox.export (streaming workspace archives)."""
+
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.export import (
+    parse_since,
+    resolve_subtree,
+    select_files,
+    stream_archive,
+)
+
+
+@pytest.fixture
+def workspace(temp_dir: Path) -> Path:
+    out = temp_dir / "output"
+    (out / "plots").mkdir(parents=True)
+    (out / "report.csv").write_text("a,b\n1,2\n")
+    (out / "plots" / "a.png").write_bytes(b"png-a")
+    (out / "plots" / "b.png").write_bytes(b"png-b")
+    os.utime(out / "report.csv", (1_000_000_000, 1_000_000_000))
+    (out / "link.txt").symlink_to("/etc/hostname")
+    return temp_dir
+
+
+async def _collect(files, fmt: str) -> bytes:  # type: ignore[no-untyped-def]
+    return b"".join([chunk async for chunk in stream_archive(files, fmt)])
+
+
+class TestExport:
+    """Test file selection and archive streaming."""
+
+    def test_select_filters(self, workspace: Path) -> None:
+        """Glob and modified-since filters apply; symlinks are skipped."""
+        base = workspace / "output"
+        names = sorted(f["arcname"] for f in select_files(base))
+        assert names == ["plots/a.png", "plots/b.png", "report.csv"]
+        assert [f["arcname"] for f in select_files(base, "*.png")] == [
+            "plots/a.png",
+            "plots/b.png",
+        ]
+        assert [f["arcname"] for f in select_files(base, "plots/a*")] == ["plots/a.png"]
+        recent = select_files(base, since=parse_since("2010-01-01T00:00:00Z"))
+        assert "report.csv" not in [f["arcname"] for f in recent]
+
+    def test_resolve_subtree_rejects_escape(self, workspace: Path) -> None:
+        """Export paths stay inside the workspace."""
+        assert resolve_subtree(workspace, "output/plots").name == "plots"
+        with pytest.raises(ValueError):
+            resolve_subtree(workspace, "../")
+        with pytest.raises(FileNotFoundError):
+            resolve_subtree(workspace, "nope")
+
+    @pytest.mark.asyncio
+    async def test_zip_stream(self, workspace: Path) -> None:
+        """The streamed zip is valid and contains the selected files."""
+        data = await _collect(select_files(workspace / "output"), "zip")
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.read("plots/a.png") == b"png-a"
+            assert zf.read("report.csv") == b"a,b\n1,2\n"
+
+    @pytest.mark.parametrize("fmt", ["tar", "tar.gz", "tar.zst"])
+    @pytest.mark.asyncio
+    async def test_tar_streams(self, workspace: Path, fmt: str) -> None:
+        """tar, tar.gz and tar.zst streams round-trip."""
+        data = await _collect(select_files(workspace / "output", "*.png"), fmt)
+        if fmt == "tar.zst":
+            zstandard = pytest.importorskip("zstandard")
+            data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+            assert sorted(tf.getnames()) == ["plots/a.png", "plots/b.png"]
+            member = tf.extractfile("plots/b.png")
+            assert member is not None and member.read() == b"png-b"
+
+    @pytest.mark.asyncio
+    async def test_large_export_streams_in_chunks(self, temp_dir: Path) -> None:
+        """Big exports arrive as many bounded chunks and can be abandoned."""
+        out = temp_dir / "output"
+        out.mkdir()
+        for i in range(4):
+            (out / f"f{i}.bin").write_bytes(os.urandom(1024 * 1024))
+
+        stream = stream_archive(select_files(out), "tar")
+        sizes = []
+        async for chunk in stream:
+            sizes.append(len(chunk))
+            if len(sizes) == 3:
+                break
+        await stream.aclose()  # stops the producer thread
+        assert max(sizes) <= 512 * 1024
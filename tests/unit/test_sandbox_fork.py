@@ -0,0 +1,91 @@
+"""Unit tests for server.sandbox.fork (copy-on-write session forks)."""
+
+from pathlib import Path
+
+import pytest
+
+from server.sandbox import sessions
+from server.sandbox.artifacts import ArtifactIndex
+from server.sandbox.fork import fork_session, fork_workspace
+from server.sandbox.metadata import MetadataStore
+
+
+@pytest.fixture
+def parent(temp_dir: Path) -> Path:
+    work = temp_dir / "session_parent"
+    (work / "mounts").mkdir(parents=True)
+    (work / "mounts" / "data.csv").write_text("a,b\n")
+    (work / "mounts" / "data.csv").chmod(0o444)
+    (work / "output").mkdir()
+    (work / "output" / "result.txt").write_text("parent")
+    (work / "venv" / "lib").mkdir(parents=True)
+    (work / "venv" / "lib" / "mod.py").write_text("x = 1")
+    (work / "mounts" / "local").symlink_to(temp_dir)
+    return work
+
+
+class TestForkWorkspace:
+    """Test what is shared and what is private in a fork."""
+
+    def test_shares_read_only_files_and_isolates_writable_ones(
+        self, temp_dir: Path, parent: Path
+    ) -> None:
+        """Mounts and venv are hardlinked; outputs are independent copies."""
+        child = temp_dir / "session_child"
+        info = fork_workspace(parent, child)
+
+        assert info["files"] == 3
+        assert info["hardlinked"] == 2
+        for rel in ("mounts/data.csv", "venv/lib/mod.py"):
+            assert (child / rel).stat().st_ino == (parent / rel).stat().st_ino
+        assert (child / "mounts" / "local").readlink() == temp_dir
+
+        out = child / "output" / "result.txt"
+        assert (
+            out.stat().st_mtime_ns
+            == (parent / "output" / "result.txt").stat().st_mtime_ns
+        )
+        out.write_text("child")
+        assert (parent / "output" / "result.txt").read_text() == "parent"
+
+
+class TestForkSession:
+    """Test forking through the session lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_replaces_target_and_copies_metadata(
+        self,
+        mock_tmp_dir: Path,
+        metadata_store: MetadataStore,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """The target's old files go; mounts and artifact index carry over."""
+        monkeypatch.setattr(sessions, "_active", sessions.Counter())
+        parent = mock_tmp_dir / "session_parent"
+        (parent / "output").mkdir(parents=True)
+        (parent / "output" / "a.txt").write_text("a")
+        ArtifactIndex(parent).refresh()
+        metadata_store.record_mount("session_parent", "d.csv", "https://x/d", 4)
+        child = mock_tmp_dir / "session_child"
+        child.mkdir()
+        (child / "stale.txt").write_text("old")
+
+        await fork_session(parent, child)
+
+        assert not (child / "stale.txt").exists()
+        assert (child / "output" / "a.txt").read_text() == "a"
+        assert [m["url"] for m in metadata_store.mounts("session_child")] == [
+            "https://x/d"
+        ]
+        index = ArtifactIndex(child)
+        assert index.refresh() == {"created": [], "modified": [], "deleted": []}
+        assert list((mock_tmp_dir / ".forking").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_missing_source(self, mock_tmp_dir: Path) -> None:
+        """Forking an unknown session fails and leaves no debris."""
+        with pytest.raises(FileNotFoundError):
+            await fork_session(
+                mock_tmp_dir / "session_nope", mock_tmp_dir / "session_child"
+            )
+        assert not (mock_tmp_dir / "session_child").exists()
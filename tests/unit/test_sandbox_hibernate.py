@@ -0,0 +1,108 @@
+"""Unit tests for server.sandbox.hibernate (workspace snapshots)."""
+
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.blobstore import BlobStore
+from server.sandbox.hibernate import hibernate, restore
+from server.sandbox.metadata import MountRecord
+
+
+def _blob(store: BlobStore, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    tmp = store.temp_path()
+    tmp.write_bytes(content)
+    store.add(tmp, digest, "https://example.com/data.csv")
+    return digest
+
+
+@pytest.fixture
+def workspace(temp_dir: Path) -> Path:
+    work = temp_dir / "session_a"
+    (work / "output" / "plots").mkdir(parents=True)
+    (work / "output" / "plots" / "p.png").write_bytes(b"png")
+    (work / "state.txt").write_text("state")
+    (work / "venv" / "bin").mkdir(parents=True)
+    (work / "venv" / "bin" / "python").write_text("#!")
+    return work
+
+
+class TestHibernate:
+    """Test the snapshot round trip."""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip_skips_venv_and_links_blobs(
+        self, temp_dir: Path, workspace: Path
+    ) -> None:
+        """Files come back; venv/ is left out and store mounts are relinked."""
+        store = BlobStore(temp_dir / "blobs")
+        digest = _blob(store, b"a,b\n1,2\n")
+        (workspace / "mounts").mkdir()
+        store.materialize(digest, workspace / "mounts" / "data.csv")
+        mounts: list[MountRecord] = [
+            {
+                "mount_path": "data.csv",
+                "url": "https://example.com/data.csv",
+                "bytes": 8,
+                "sha256": digest,
+            }
+        ]
+
+        info = hibernate(workspace, temp_dir / "hibernated", mounts, store)
+        snapshot = Path(info["path"])
+        assert snapshot.is_file()
+        assert info["linked_blobs"] == 1
+
+        restored = temp_dir / "restored"
+        result = await restore(snapshot, restored, mounts, store)
+
+        assert (restored / "output" / "plots" / "p.png").read_bytes() == b"png"
+        assert (restored / "state.txt").read_text() == "state"
+        assert not (restored / "venv").exists()
+        mount = restored / "mounts" / "data.csv"
+        assert mount.stat().st_ino == store.blob_path(digest).stat().st_ino
+        assert result["relinked"] == 1 and result["downloaded"] == 0
+        assert not snapshot.exists()
+        assert not (restored / ".hibernate.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_evicted_blob_is_downloaded_again(
+        self,
+        temp_dir: Path,
+        workspace: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """A blob evicted while the session slept is fetched from its URL."""
+        store = BlobStore(temp_dir / "blobs")
+        digest = _blob(store, b"data")
+        (workspace / "mounts").mkdir()
+        store.materialize(digest, workspace / "mounts" / "data.csv")
+        mounts: list[MountRecord] = [
+            {
+                "mount_path": "data.csv",
+                "url": "https://example.com/data.csv",
+                "bytes": 4,
+                "sha256": digest,
+            }
+        ]
+        info = hibernate(workspace, temp_dir / "hibernated", mounts, store)
+        store.blob_path(digest).chmod(0o644)
+        store.blob_path(digest).unlink()
+
+        fetched: list[dict[str, str]] = []
+
+        async def fake_download(
+            files: list[dict[str, str]], mount_dir: Path, **_: object
+        ) -> list[dict[str, object]]:
+            fetched.extend(files)
+            return []
+
+        monkeypatch.setattr("server.sandbox.hibernate.download_files", fake_download)
+        result = await restore(Path(info["path"]), temp_dir / "restored", mounts, store)
+
+        assert fetched == [
+            {"url": "https://example.com/data.csv", "mountPath": "data.csv"}
+        ]
+        assert result["downloaded"] == 1
@@ -0,0 +1,121 @@
+"""Unit tests for server.sandbox.imports (requirement inference)."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from server.sandbox import imports
+
+CODE = """
+import os, json
+import numpy as np
+from sklearn.linear_model import LinearRegression
+import matplotlib.pyplot as plt
+from . import sibling
+import helpers
+import mystery_pkg
+"""
+
+
+class TestScanImports:
+    """Test static import discovery."""
+
+    def test_top_level_absolute_imports(self) -> None:
+        """Nested, dotted and aliased imports reduce to top-level modules."""
+        code = CODE + "def f():\n    import yaml\n"
+        assert imports.scan_imports(code) == {
+            "os",
+            "json",
+            "numpy",
+            "sklearn",
+            "matplotlib",
+            "helpers",
+            "mystery_pkg",
+            "yaml",
+        }
+
+    def test_unparsable_code(self) -> None:
+        """Syntax errors are left for the run to report."""
+        assert imports.scan_imports("import (") == set()
+
+
+class TestStdlibOnly:
+    """Test fast-lane eligibility."""
+
+    def test_stdlib_imports(self) -> None:
+        """Standard library (and __future__) imports qualify."""
+        code = "from __future__ import annotations\nimport os.path, json\n"
+        assert imports.stdlib_only(code)
+        assert imports.stdlib_only("print(1)")
+
+    def test_third_party_local_or_unparsable(self) -> None:
+        """Anything else needs an environment."""
+        assert not imports.stdlib_only(CODE)
+        assert not imports.stdlib_only("import helpers")
+        assert not imports.stdlib_only("import (")
+
+
+class TestInfer:
+    """Test mapping imports to an installation plan."""
+
+    def test_adds_known_skips_defaults_reports_unknown(self) -> None:
+        """Missing known packages are added and unused defaults dropped."""
+        result = imports.infer(
+            CODE, ["numpy==1.26.4"], local={"helpers"}, defaults=["pandas", "requests"]
+        )
+        assert result["imports"] == ["matplotlib", "mystery_pkg", "numpy", "sklearn"]
+        assert result["added"] == ["matplotlib", "scikit-learn"]
+        assert result["requirements"] == ["numpy==1.26.4", "matplotlib", "scikit-learn"]
+        assert result["skipped_defaults"] == ["pandas", "requests"]
+        assert result["unknown"] == ["mystery_pkg"]
+
+    def test_imported_defaults_bring_companions(self) -> None:
+        """pandas keeps openpyxl so read_excel works without importing it."""
+        result = imports.infer("import pandas as pd\n", [])
+        assert result["requirements"] == ["pandas", "openpyxl"]
+        assert result["skipped_defaults"] == ["requests"]
+
+    def test_requested_names_are_normalised(self) -> None:
+        """A requirement spelled differently still satisfies the import."""
+        result = imports.infer("import sklearn\n", ["Scikit_Learn>=1.4"], defaults=[])
+        assert result["added"] == []
+        assert result["requirements"] == ["Scikit_Learn>=1.4"]
+
+    def test_workspace_modules_bring_their_imports(self, temp_dir: Path) -> None:
+        """Imports of local modules (and the modules they import) count too."""
+        (temp_dir / "helper.py").write_text("import pandas\nimport util\n")
+        (temp_dir / "util").mkdir()
+        (temp_dir / "util" / "__init__.py").write_text("from .fit import model\n")
+        (temp_dir / "util" / "fit.py").write_text("from sklearn import linear_model\n")
+        local = {"helper", "util"}
+
+        result = imports.infer("import helper\n", [], local, workspace=temp_dir)
+
+        assert result["imports"] == ["pandas", "sklearn"]
+        assert result["requirements"] == ["pandas", "openpyxl", "scikit-learn"]
+        assert result["skipped_defaults"] == ["requests"]
+
+    def test_unreadable_local_module_keeps_defaults(self, temp_dir: Path) -> None:
+        """A compiled local module may import anything, so defaults stay."""
+        (temp_dir / "fast.cpython-313-x86_64-linux-gnu.so").write_bytes(b"\x7fELF")
+        result = imports.infer(
+            "import fast\n", [], {"fast"}, defaults=["pandas"], workspace=temp_dir
+        )
+        assert result["requirements"] == ["pandas"]
+        assert result["skipped_defaults"] == []
+
+    def test_mapping_file_overrides(
+        self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A configured table adds mappings and can block auto-install."""
+        table = temp_dir / "map.json"
+        table.write_text(json.dumps({"mystery_pkg": "mystery", "numpy": None}))
+        monkeypatch.setattr(imports, "IMPORT_MAP_FILE", str(table))
+        imports._mapping.cache_clear()
+        try:
+            result = imports.infer(CODE, [], local={"helpers"}, defaults=[])
+        finally:
+            imports._mapping.cache_clear()
+        assert result["added"] == ["matplotlib", "mystery", "scikit-learn"]
+        assert result["unknown"] == []
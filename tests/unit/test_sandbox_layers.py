@@ -0,0 +1,162 @@
+"""Unit tests for server.sandbox.layers (layered environments)."""
+
+import asyncio
+import os
+import re
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from server.sandbox import layers
+
+
+@pytest.fixture
+def installs(
+    temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> list[tuple[list[str], list[Path]]]:
+    """Fake pip: each spec becomes a module and a dist-info in the prefix."""
+    calls: list[tuple[list[str], list[Path]]] = []
+
+    async def fake_install(
+        python: Path, specs: list[str], prefix: Path, below: list[Path]
+    ) -> None:
+        calls.append((list(specs), list(below)))
+        site = prefix / "lib" / "python3.13" / "site-packages"
+        site.mkdir(parents=True)
+        for spec in specs:
+            name = re.match(r"[\w.-]+", spec).group(0).replace("-", "_")
+            (site / f"{name}-1.0.dist-info").mkdir()
+            (site / f"{name}.py").write_text("VALUE = 1\n")
+
+    monkeypatch.setattr(layers, "_install", fake_install)
+    monkeypatch.setattr(layers, "_builder", AsyncMock(return_value=Path("python")))
+    monkeypatch.setattr("server.sandbox.bytecode.PYCACHE_DIR", temp_dir / "pycache")
+    monkeypatch.setattr(layers, "ENV_PROFILES", {"ml": ["scikit-learn", "scipy"]})
+    return calls
+
+
+def _names(sites: list[Path]) -> list[list[str]]:
+    return [sorted(p.name for p in site.glob("*.py")) for site in sites]
+
+
+class TestCompose:
+    """Test building and stacking layers."""
+
+    @pytest.mark.asyncio
+    async def test_base_layer_is_built_once(
+        self, temp_dir: Path, installs: list
+    ) -> None:
+        """Later environments reuse the base; what it provides is not reinstalled."""
+        root = temp_dir / "layers"
+        first = await layers.compose(["pandas"], ["pandas", "requests"], root)
+        second = await layers.compose(["requests"], ["pandas", "requests"], root)
+
+        assert first == second
+        assert _names(first) == [["pandas.py", "requests.py"]]
+        assert installs == [(["pandas", "requests"], [])]
+
+    @pytest.mark.asyncio
+    async def test_extras_and_profiles_stack_on_base(
+        self, temp_dir: Path, installs: list
+    ) -> None:
+        """Only missing packages are installed, topmost layer first on the path."""
+        root = temp_dir / "layers"
+        sites = await layers.compose(
+            ["scikit-learn", "pandas", "rich", "pandas==2.2"], ["pandas"], root
+        )
+
+        assert _names(sites) == [
+            ["pandas.py", "rich.py"],
+            ["scikit_learn.py", "scipy.py"],
+            ["pandas.py"],
+        ]
+        _, profile, base = (site.parents[2] for site in sites)
+        assert installs[1] == (["scikit-learn", "scipy"], [base])
+        # Pinned specs always reach pip, which skips them if satisfied.
+        assert installs[2] == (["rich", "pandas==2.2"], [base, profile])
+
+        # The same request is served entirely from existing layers.
+        assert (
+            await layers.compose(
+                ["scikit-learn", "pandas", "rich", "pandas==2.2"], ["pandas"], root
+            )
+            == sites
+        )
+        assert len(installs) == 3
+
+    @pytest.mark.asyncio
+    async def test_without_base_only_requirements_are_stacked(
+        self, temp_dir: Path, installs: list
+    ) -> None:
+        """An empty base builds no default layer; profiles then stand alone."""
+        sites = await layers.compose(["rich", "scipy"], [], temp_dir / "layers")
+
+        assert _names(sites) == [["rich.py"], ["scikit_learn.py", "scipy.py"]]
+        assert installs[0] == (["scikit-learn", "scipy"], [])
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_build(
+        self, temp_dir: Path, installs: list
+    ) -> None:
+        """Environments built at the same time wait for a single layer build."""
+        root = temp_dir / "layers"
+        results = await asyncio.gather(
+            *(layers.compose([], ["pandas"], root) for _ in range(3))
+        )
+
+        assert len(installs) == 1
+        assert results[0] == results[1] == results[2]
+
+    @pytest.mark.asyncio
+    async def test_layers_are_read_only_and_compiled(
+        self, temp_dir: Path, installs: list
+    ) -> None:
+        """Layer files are frozen and get their bytecode from the shared cache."""
+        [site] = await layers.compose([], ["pandas"], temp_dir / "layers")
+
+        assert not (site / "pandas.py").stat().st_mode & 0o222
+        assert list((site / "__pycache__").glob("pandas.*.pyc"))
+        assert not list((temp_dir / "layers" / ".building").iterdir())
+
+    @pytest.mark.asyncio
+    async def test_failed_build_leaves_nothing(
+        self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """pip failures propagate and the half-built layer is discarded."""
+        root = temp_dir / "layers"
+        monkeypatch.setattr(layers, "_builder", AsyncMock(return_value=Path("py")))
+        with patch("server.sandbox.layers.asyncio.create_subprocess_exec") as mock_exec:
+            mock_proc = AsyncMock()
+            mock_proc.communicate = AsyncMock(return_value=(b"", b"no such package"))
+            mock_proc.returncode = 1
+            mock_exec.return_value = mock_proc
+            with pytest.raises(RuntimeError, match="pip install failed"):
+                await layers.compose([], ["nope"], root)
+
+        args = mock_exec.call_args[0]
+        assert args[:4] == ("py", "-m", "pip", "install")
+        assert "--prefix" in args and "--no-compile" in args
+        assert [p.name for p in root.iterdir()] == [".building"]
+        assert not list((root / ".building").iterdir())
+
+
+class TestPrune:
+    """Test removal of unused layers."""
+
+    def test_prune_old_layers(self, temp_dir: Path) -> None:
+        """Layers unused for max_age go; recent ones and the pip venv stay."""
+        for name in ("old", "new", ".pip", ".building/stale"):
+            (temp_dir / name).mkdir(parents=True)
+        past = time.time() - 3600
+        for name in ("old", ".pip", ".building/stale"):
+            os.utime(temp_dir / name, (past, past))
+
+        assert layers.prune(60, temp_dir) == 1
+        assert sorted(p.name for p in temp_dir.iterdir()) == [
+            ".building",
+            ".pip",
+            "new",
+        ]
+        assert not (temp_dir / ".building" / "stale").exists()
@@ -0,0 +1,78 @@
+"""Unit tests for server.sandbox.localmount (zero-copy local mounts)."""
+
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.blobstore import BlobStore
+from server.sandbox.downloader import download_files
+from server.sandbox.localmount import link_local, resolve_local
+
+
+@pytest.fixture
+def dataset_root(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """An allow-listed root holding a small dataset."""
+    root = temp_dir / "datasets"
+    (root / "nested").mkdir(parents=True)
+    (root / "nested" / "big.csv").write_text("a,b\n1,2\n")
+    monkeypatch.setattr("server.sandbox.localmount.LOCAL_MOUNT_ROOTS", [root])
+    return root
+
+
+class TestLocalMounts:
+    """Test mounts of files that already live on the server."""
+
+    def test_resolve_inside_root(self, dataset_root: Path) -> None:
+        """file:// URLs under an allowed root resolve to real paths."""
+        url = (dataset_root / "nested" / "big.csv").as_uri()
+        assert resolve_local(url) == (dataset_root / "nested" / "big.csv").resolve()
+
+    def test_paths_outside_roots_rejected(
+        self, temp_dir: Path, dataset_root: Path
+    ) -> None:
+        """Neither '..' nor symlinks can escape the allowed roots."""
+        secret = temp_dir / "secret.txt"
+        secret.write_text("x")
+        (dataset_root / "escape").symlink_to(secret)
+
+        for url in (
+            secret.as_uri(),
+            f"file://{dataset_root}/../secret.txt",
+            (dataset_root / "escape").as_uri(),
+        ):
+            with pytest.raises(ValueError, match="allowed local root"):
+                resolve_local(url)
+
+    def test_disabled_without_roots(self, temp_dir: Path) -> None:
+        """With no configured roots, local mounts are refused."""
+        with pytest.raises(ValueError, match="PRIMCS_LOCAL_ROOTS"):
+            resolve_local(temp_dir.as_uri(), roots=[])
+
+    def test_link_shares_data(self, temp_dir: Path, dataset_root: Path) -> None:
+        """Files are linked, not copied; directories become symlinks."""
+        src = dataset_root / "nested" / "big.csv"
+        mode = link_local(src, temp_dir / "m" / "big.csv")
+        assert mode in {"reflink", "hardlink", "symlink"}
+        if mode == "hardlink":
+            assert (temp_dir / "m" / "big.csv").stat().st_ino == src.stat().st_ino
+
+        assert link_local(dataset_root / "nested", temp_dir / "m" / "dir") == "symlink"
+        assert (temp_dir / "m" / "dir" / "big.csv").read_text() == "a,b\n1,2\n"
+
+    @pytest.mark.asyncio
+    async def test_download_files_links_local_url(
+        self, temp_dir: Path, dataset_root: Path
+    ) -> None:
+        """download_files mounts file:// URLs without hashing or the network."""
+        store = BlobStore(temp_dir / "blobs")
+        url = (dataset_root / "nested" / "big.csv").as_uri()
+
+        [info] = await download_files(
+            [{"url": url, "mountPath": "data/big.csv"}], temp_dir / "mounts", store
+        )
+
+        assert info["cache"] == "local"
+        assert info["bytes"] == 8
+        assert "sha256" not in info
+        assert (temp_dir / "mounts" / "data" / "big.csv").read_text() == "a,b\n1,2\n"
+        assert store.usage() == 0
@@ -0,0 +1,61 @@
+"""Unit tests for server.sandbox.metadata (SQLite session metadata store)."""
+
+from pathlib import Path
+
+from server.sandbox.metadata import MetadataStore
+
+
+class TestMetadataStore:
+    """Test session, mount and artifact records."""
+
+    def test_sessions_by_last_use(self, temp_dir: Path) -> None:
+        """Records keep their creation time and sort by last use."""
+        store = MetadataStore(temp_dir / "m.db")
+        store.touch("session_a", 10)
+        store.touch("session_b", 20)
+        store.touch("session_a", 30)
+
+        assert [r["name"] for r in store.least_recently_used()] == [
+            "session_b",
+            "session_a",
+        ]
+        record = store.get("session_a")
+        assert record is not None
+        assert (record["created"], record["last_used"]) == (10, 30)
+        assert store.get("session_c") is None
+
+        store.set_env_hash("session_a", "abc")
+        store.set_usage("session_a", 1000, 7)
+        store.set_usage("session_b", 24, 1)
+        assert store.get("session_a")["env_hash"] == "abc"  # type: ignore[index]
+        assert store.total_usage() == 1024
+
+        mode = store._read("PRAGMA journal_mode")[0][0]
+        assert mode == "wal"
+
+    def test_mounts_and_artifacts_are_forgotten_together(self, temp_dir: Path) -> None:
+        """forget() drops every row belonging to a workspace."""
+        store = MetadataStore(temp_dir / "m.db")
+        assert store.artifacts("session_a") is None
+        store.record_mount("session_a", "data.csv", "https://x/data.csv", 5, "f" * 64)
+        store.update_artifacts(
+            "session_a",
+            {"a.txt": {"size": 1, "mtime_ns": 2, "mime": "text/plain"}},
+            [],
+        )
+        store.update_artifacts("session_a", {}, ["missing.txt"])
+
+        assert store.mounts("session_a")[0]["url"] == "https://x/data.csv"
+        assert store.artifacts("session_a") == {
+            "a.txt": {"size": 1, "mtime_ns": 2, "mime": "text/plain"}
+        }
+
+        # The data survives reopening the database.
+        store.close()
+        store = MetadataStore(temp_dir / "m.db")
+        assert list(store.artifacts("session_a") or {}) == ["a.txt"]
+
+        store.forget("session_a")
+        assert store.get("session_a") is None
+        assert store.mounts("session_a") == []
+        assert store.artifacts("session_a") is None
@@ -0,0 +1,155 @@
+"""Unit tests for server.sandbox.mounts (background mounts)."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from server.sandbox import mounts, sessions
+from server.sandbox.blobstore import BlobStore
+
+
+@pytest.fixture(autouse=True)
+def isolated_store(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Point the default blob store at a temporary directory."""
+    monkeypatch.setattr(
+        "server.sandbox.blobstore._default", BlobStore(temp_dir / "blobs")
+    )
+    monkeypatch.setattr("server.sandbox.mounts._jobs", {})
+
+
+@pytest.fixture
+async def slow_server() -> AsyncGenerator[TestServer]:
+    """Stream a body in two chunks with a pause in between."""
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        if request.path == "/missing.csv":
+            return web.Response(status=404)
+        resp = web.StreamResponse(headers={"Content-Length": "8"})
+        await resp.prepare(request)
+        await resp.write(b"1234")
+        await asyncio.sleep(0.2)
+        await resp.write(b"5678")
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+class TestBackgroundMounts:
+    """Test background mount jobs."""
+
+    @pytest.mark.asyncio
+    async def test_status_progresses_to_done(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """A job reports progress while downloading and completes."""
+        url = str(slow_server.make_url("/big.csv"))
+        job = mounts.start_mount("s1", url, "data/big.csv", temp_dir / "mounts")
+
+        await asyncio.sleep(0.1)
+        status = job.status()
+        assert status["state"] == "downloading"
+        assert status["total_bytes"] == 8
+        assert status["bytes_done"] == 4
+
+        await job.task
+        status = job.status()
+        assert status["state"] == "done"
+        assert status["eta_seconds"] == 0.0
+        assert status["cache"] == "miss"
+        assert (temp_dir / "mounts" / "data" / "big.csv").read_bytes() == b"12345678"
+        assert mounts.session_jobs("s1") == [job]
+
+    @pytest.mark.asyncio
+    async def test_wait_only_for_referenced_mounts(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """run_code waits for mounts its code names, not unrelated ones."""
+        a = mounts.start_mount(
+            "s1", str(slow_server.make_url("/a.csv")), "a.csv", temp_dir / "m"
+        )
+        b = mounts.start_mount(
+            "s1", str(slow_server.make_url("/b.csv")), "b.csv", temp_dir / "m"
+        )
+
+        waited = await mounts.wait_for_mounts("s1", "open('mounts/a.csv')")
+        assert waited == [a]
+        assert a.state == "done"
+
+        assert await mounts.wait_for_mounts("s1", "print(1)") == []
+        await b.task
+
+    @pytest.mark.asyncio
+    async def test_generic_mounts_access_waits_for_all(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """Code that lists mounts/ waits for every pending mount."""
+        for name in ("a.csv", "b.csv"):
+            mounts.start_mount(
+                "s1", str(slow_server.make_url(f"/{name}")), name, temp_dir / "m"
+            )
+
+        waited = await mounts.wait_for_mounts("s1", "os.listdir('mounts')")
+        assert len(waited) == 2
+        assert all(j.state == "done" for j in waited)
+
+    @pytest.mark.asyncio
+    async def test_failed_mount_raises_for_waiters(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """A failed background mount surfaces as an error in run_code."""
+        job = mounts.start_mount(
+            "s1", str(slow_server.make_url("/missing.csv")), "x.csv", temp_dir / "m"
+        )
+
+        with pytest.raises(RuntimeError, match="Background mount failed"):
+            await mounts.wait_for_mounts("s1", "open('mounts/x.csv')")
+        assert job.status()["state"] == "failed"
+        assert "404" in job.status()["error"]
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """Finished jobs are dropped after MOUNT_STATUS_TTL; running ones stay."""
+        done = mounts.start_mount(
+            "s1", str(slow_server.make_url("/missing.csv")), "x.csv", temp_dir / "m"
+        )
+        await asyncio.wait([done.task])
+        running = mounts.start_mount(
+            "s1", str(slow_server.make_url("/a.csv")), "a.csv", temp_dir / "m"
+        )
+
+        mounts._prune(done.finished_at + mounts.MOUNT_STATUS_TTL + 1)
+        assert mounts.get_job(done.mount_id) is None
+        assert mounts.session_jobs("s1") == [running]
+        await asyncio.wait([running.task])
+
+    @pytest.mark.asyncio
+    async def test_discarded_session_forgets_its_jobs(
+        self, temp_dir: Path, slow_server: TestServer
+    ) -> None:
+        """Discarding a workspace cancels and drops the session's mount jobs."""
+        job = mounts.start_mount(
+            "s1", str(slow_server.make_url("/a.csv")), "a.csv", temp_dir / "m"
+        )
+        other = mounts.start_mount(
+            "s2", str(slow_server.make_url("/b.csv")), "b.csv", temp_dir / "n"
+        )
+
+        sessions.discard(temp_dir / "session_s1")
+        await asyncio.wait([job.task])
+        assert job.task.cancelled()
+        assert mounts.session_jobs("s1") == []
+        assert mounts.session_jobs("s2") == [other]
+        await asyncio.wait([other.task])
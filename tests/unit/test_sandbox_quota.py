@@ -0,0 +1,125 @@
+"""Unit tests for server.sandbox.quota (per-session disk and inode quotas)."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from server.sandbox import quota, sessions
+from server.sandbox.metadata import MetadataStore
+
+
+@pytest.fixture
+def small_quota(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(quota, "QUOTA_BYTES", 1024 * 1024)
+    monkeypatch.setattr(quota, "QUOTA_INODES", 50)
+
+
+async def _python(code: str, cwd: Path) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        code,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        preexec_fn=quota.limit_file_size(cwd),
+    )
+
+
+class TestQuota:
+    """Test pre-checks and enforcement while a process runs."""
+
+    @pytest.mark.usefixtures("small_quota")
+    def test_check_uses_recorded_usage(
+        self, temp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """Recorded bytes plus the incoming size must fit; inodes too."""
+        work = temp_dir / "session_a"
+        quota.check(work, incoming_bytes=1024)  # nothing recorded yet
+        metadata_store.touch(work.name)
+        metadata_store.set_usage(work.name, 1024 * 1024 - 10, 5)
+        quota.check(work)
+        with pytest.raises(quota.QuotaExceededError, match="disk quota"):
+            quota.check(work, incoming_bytes=11)
+        metadata_store.set_usage(work.name, 0, 51)
+        with pytest.raises(quota.QuotaExceededError, match="inode quota"):
+            quota.check(work)
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("small_quota")
+    async def test_sampler_kills_process_over_inode_quota(self, temp_dir: Path) -> None:
+        """A process creating too many files is stopped with a clear error."""
+        proc = await _python(
+            "import time\n"
+            "for i in range(100):\n"
+            "    open(f'f{i}', 'w').close()\n"
+            "time.sleep(30)\n",
+            temp_dir,
+        )
+        with pytest.raises(quota.QuotaExceededError, match="inode quota"):
+            async with quota.enforce(temp_dir, proc, interval=0.05):
+                await asyncio.wait_for(proc.communicate(), timeout=10)
+        assert proc.returncode is not None and proc.returncode < 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("small_quota")
+    @pytest.mark.skipif(sys.platform.startswith("win"), reason="POSIX rlimits")
+    async def test_file_size_limit(self, temp_dir: Path) -> None:
+        """A single file cannot grow past the byte quota."""
+        proc = await _python(
+            "open('big', 'wb').write(b'x' * 2 * 1024 * 1024)", temp_dir
+        )
+        async with quota.enforce(temp_dir, proc, interval=10):
+            _, err = await proc.communicate()
+        assert proc.returncode != 0
+        assert b"File too large" in err
+        assert (temp_dir / "big").stat().st_size <= 1024 * 1024
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("small_quota")
+    async def test_mounts_larger_than_the_quota(self, temp_dir: Path) -> None:
+        """Read-only mounted data does not count; files written there do."""
+        blob = temp_dir / "blob"
+        blob.write_bytes(b"x" * 2 * 1024 * 1024)
+        blob.chmod(0o444)
+        work = temp_dir / "session_a"
+        (work / "mounts").mkdir(parents=True)
+        (work / "mounts" / "big.bin").hardlink_to(blob)
+
+        proc = await _python("import time; time.sleep(0.3)", work)
+        async with quota.enforce(work, proc, interval=0.05):
+            await asyncio.wait_for(proc.communicate(), timeout=10)
+        assert proc.returncode == 0
+
+        (work / "mounts" / "mine.bin").write_bytes(b"y" * 10)
+        assert sessions.tree_usage(work) == (10, 2)  # mounts/, mine.bin
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("small_quota")
+    async def test_explicit_limits_replace_session_quotas(self, temp_dir: Path) -> None:
+        """Shared builds pass their own limits; session quotas are ignored."""
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            "for i in range(100):\n    open(f'f{i}', 'wb').write(b'x' * 32 * 1024)\n",
+            cwd=temp_dir,
+            preexec_fn=quota.limit_file_size(temp_dir, 0),
+        )
+        async with quota.enforce(
+            temp_dir, proc, interval=0.05, max_bytes=10 * 1024 * 1024, max_inodes=0
+        ):
+            await asyncio.wait_for(proc.wait(), timeout=10)
+        assert proc.returncode == 0
+        assert len(list(temp_dir.iterdir())) == 100
+
+    @pytest.mark.asyncio
+    async def test_disabled(
+        self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """With both quotas at 0 nothing is checked or limited."""
+        monkeypatch.setattr(quota, "QUOTA_BYTES", 0)
+        monkeypatch.setattr(quota, "QUOTA_INODES", 0)
+        assert quota.limit_file_size(temp_dir) is None
+        quota.check(temp_dir, incoming_bytes=10**15)
@@ -1,5 +1,7 @@
 """Unit tests for server.sandbox.runner module."""
 
+import asyncio
+import sys
 from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -216,6 +218,66 @@ class TestRunCode:
             png_artifact = next(a for a in artifacts if a["name"] == "plot.png")
             assert png_artifact["mime"] == "image/png"
 
+    @pytest.mark.asyncio
+    async def test_run_code_reports_only_changed_artifacts(
+        self,
+        mock_tmp_dir: Path,
+        session_id: str,
+        run_id: str,
+        mock_download_success: None,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """Later runs report only new or modified artifacts and deletions."""
+        output_dir = mock_tmp_dir / f"session_{session_id}" / "output"
+        output_dir.mkdir(parents=True)
+        (output_dir / "keep.txt").write_text("same")
+        (output_dir / "gone.txt").write_text("bye")
+
+        def second_run() -> None:
+            (output_dir / "gone.txt").unlink()
+            (output_dir / "new.txt").write_text("hi")
+
+        with (
+            patch(
+                "server.sandbox.runner.create_virtualenv",
+                AsyncMock(return_value=mock_virtualenv_creation),
+            ),
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            runs = iter([lambda: None, second_run])
+            events: list[tuple[str, str]] = []
+
+            async def communicate() -> tuple[bytes, bytes]:
+                next(runs)()  # what the user code does to output/
+                await asyncio.sleep(0.05)
+                return b"ok", b""
+
+            async def on_artifact(event: str, relative_path: str) -> None:
+                events.append((event, relative_path))
+
+            mock_process = AsyncMock()
+            mock_process.communicate = communicate
+            mock_process.returncode = 0
+            mock_subprocess.return_value = mock_process
+
+            kwargs = {
+                "code": "print('ok')",
+                "requirements": [],
+                "files": [],
+                "run_id": run_id,
+                "session_id": session_id,
+            }
+            first = await run_code(**kwargs)
+            second = await run_code(**kwargs, on_artifact=on_artifact)
+
+        assert len(first["artifacts"]) == 2
+        assert [a["relative_path"] for a in second["artifacts"]] == ["new.txt"]
+        assert second["deleted_artifacts"] == ["gone.txt"]
+        assert ("completed", "new.txt") in events
+        assert ("deleted", "gone.txt") in events
+
     @pytest.mark.asyncio
     async def test_run_code_script_naming(
         self,
@@ -259,10 +321,12 @@ class TestRunCode:
                 session_id=None,
             )
 
-            # Check generic script name
+            # Check generic script name; the stateless workspace itself is
+            # deleted once the result has been collected.
             run_dir = mock_tmp_dir / f"run_{run_id}"
-            expected_script = run_dir / "script.py"
-            assert expected_script.exists()
+            script_arg = mock_subprocess.call_args[0][-1]
+            assert script_arg == str(run_dir / "script.py")
+            assert not run_dir.exists()
 
     @pytest.mark.asyncio
     async def test_run_code_directory_creation(
@@ -299,6 +363,201 @@ class TestRunCode:
             assert (session_dir / "mounts").exists()
             assert (session_dir / "output").exists()
 
+    @pytest.mark.asyncio
+    async def test_run_code_stages_overlap_and_are_timed(
+        self,
+        mock_tmp_dir: Path,
+        run_id: str,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """Downloads and environment build run concurrently and are timed."""
+
+        async def slow_download(files: list, dest: Path) -> list:
+            await asyncio.sleep(0.2)
+            return []
+
+        async def slow_env(
+            requirements: list[str], run_dir: Path, defaults: list[str] | None
+        ) -> Path:
+            await asyncio.sleep(0.2)
+            return mock_virtualenv_creation
+
+        with (
+            patch("server.sandbox.runner.download_files", slow_download),
+            patch("server.sandbox.runner.create_virtualenv", slow_env),
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_process = AsyncMock()
+            mock_process.communicate = AsyncMock(return_value=(b"ok", b""))
+            mock_subprocess.return_value = mock_process
+
+            result = await run_code(
+                code="import pandas\nprint('ok')",
+                requirements=[],
+                files=[],
+                run_id=run_id,
+                session_id=None,
+            )
+
+        timings = result["timings"]
+        assert {"mounts", "environment", "script", "setup", "execute"} <= set(timings)
+        assert timings["mounts"] >= 0.2 and timings["environment"] >= 0.2
+        assert timings["setup"] < timings["mounts"] + timings["environment"]
+
+    @pytest.mark.asyncio
+    async def test_run_code_failed_download_cancels_environment(
+        self,
+        mock_tmp_dir: Path,
+        run_id: str,
+    ) -> None:
+        """A failing stage cancels its siblings and the error propagates."""
+        env_cancelled = asyncio.Event()
+
+        async def failing_download(files: list, dest: Path) -> list:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("download failed")
+
+        async def slow_env(
+            requirements: list[str], run_dir: Path, defaults: list[str] | None
+        ) -> Path:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                env_cancelled.set()
+                raise
+            return run_dir
+
+        with (
+            patch("server.sandbox.runner.download_files", failing_download),
+            patch("server.sandbox.runner.create_virtualenv", slow_env),
+            pytest.raises(RuntimeError, match="download failed"),
+        ):
+            await run_code(
+                code="import pandas\nprint('never')",
+                requirements=[],
+                files=[{"url": "https://example.com/x", "mountPath": "x"}],
+                run_id=run_id,
+                session_id=None,
+            )
+
+        assert env_cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_run_code_infers_requirements(
+        self,
+        mock_tmp_dir: Path,
+        mock_subprocess_success: AsyncMock,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """Imports decide what is installed, and the inference is reported."""
+        with (
+            patch("server.sandbox.runner.create_virtualenv") as mock_venv,
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_venv.return_value = mock_virtualenv_creation
+            mock_subprocess.return_value = mock_subprocess_success
+            result = await run_code(
+                code="import sklearn\nimport mystery\n",
+                requirements=["numpy"],
+                files=[],
+                run_id="r1",
+            )
+
+        requirements, _, defaults = mock_venv.call_args[0]
+        assert requirements == ["numpy", "scikit-learn"]
+        assert defaults == []
+        assert result["inferred"]["added"] == ["scikit-learn"]
+        assert result["inferred"]["unknown"] == ["mystery"]
+        assert "pandas" in result["inferred"]["skipped_defaults"]
+
+    @pytest.mark.asyncio
+    async def test_run_code_infers_through_workspace_modules(
+        self,
+        mock_tmp_dir: Path,
+        mock_subprocess_success: AsyncMock,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """A helper module left by an earlier run brings its own imports."""
+        work = mock_tmp_dir / "session_s1"
+        work.mkdir()
+        (work / "helper.py").write_text("import pandas as pd\n")
+        with (
+            patch("server.sandbox.runner.create_virtualenv") as mock_venv,
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_venv.return_value = mock_virtualenv_creation
+            mock_subprocess.return_value = mock_subprocess_success
+            await run_code(
+                code="import helper\n",
+                requirements=[],
+                files=[],
+                run_id="r1",
+                session_id="s1",
+            )
+
+        requirements, _, defaults = mock_venv.call_args[0]
+        assert requirements == ["pandas", "openpyxl"]
+        assert defaults == []
+
+    @pytest.mark.asyncio
+    async def test_run_code_stdlib_fast_lane(
+        self,
+        mock_tmp_dir: Path,
+        mock_subprocess_success: AsyncMock,
+    ) -> None:
+        """Stdlib-only code runs on the isolated base interpreter without a venv."""
+        with (
+            patch("server.sandbox.runner.create_virtualenv") as mock_venv,
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_subprocess.return_value = mock_subprocess_success
+            result = await run_code(
+                code="import json, os.path\nprint(json.dumps({}))",
+                requirements=[],
+                files=[],
+                run_id="r1",
+            )
+
+        mock_venv.assert_not_called()
+        assert mock_subprocess.call_args[0][:3] == (sys.executable, "-I", "-S")
+        assert result["lane"] == "stdlib"
+        assert "environment" not in result["timings"]
+
+    @pytest.mark.asyncio
+    async def test_run_code_requirements_take_venv_lane(
+        self,
+        mock_tmp_dir: Path,
+        mock_subprocess_success: AsyncMock,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """Explicit requirements always get an environment."""
+        with (
+            patch("server.sandbox.runner.create_virtualenv") as mock_venv,
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_venv.return_value = mock_virtualenv_creation
+            mock_subprocess.return_value = mock_subprocess_success
+            result = await run_code(
+                code="print('hi')",
+                requirements=["rich"],
+                files=[],
+                run_id="r1",
+            )
+
+        mock_venv.assert_called_once()
+        assert mock_subprocess.call_args[0][0] == str(mock_virtualenv_creation)
+        assert result["lane"] == "venv"
+
     def test_artifact_meta_type(self) -> None:
         """Test ArtifactMeta type definition."""
         artifact: ArtifactMeta = {
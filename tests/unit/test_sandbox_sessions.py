@@ -0,0 +1,206 @@
+"""Unit tests for server.sandbox.sessions (workspace lifecycle)."""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from server import metrics
+from server.sandbox import sessions
+from server.sandbox.metadata import MetadataStore
+
+
+def _workspace(root: Path, name: str, last_used: float) -> Path:
+    path = root / name
+    (path / "output").mkdir(parents=True)
+    (path / "output" / "a.txt").write_text("a")
+    os.utime(path, (last_used, last_used))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sessions, "_active", sessions.Counter())
+
+
+class TestSessions:
+    """Test access tracking, background deletion and sweeping."""
+
+    @pytest.mark.asyncio
+    async def test_discard_frees_the_name_immediately(self, mock_tmp_dir: Path) -> None:
+        """The workspace is gone at once; its bytes are removed in the background."""
+        work = _workspace(mock_tmp_dir, "run_1", 0)
+        task = sessions.discard(work)
+        assert not work.exists()
+        assert task is not None
+        await task
+        assert list((mock_tmp_dir / ".trash").iterdir()) == []
+        assert sessions.discard(work) is None
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry_spares_recent_and_active(
+        self, mock_tmp_dir: Path
+    ) -> None:
+        """Idle workspaces past the TTL go; recent and in-use ones stay."""
+        now = 100_000.0
+        old = _workspace(mock_tmp_dir, "session_old", now - 500)
+        busy = _workspace(mock_tmp_dir, "session_busy", now - 500)
+        recent = _workspace(mock_tmp_dir, "session_recent", now - 10)
+        stale_run = _workspace(mock_tmp_dir, "run_crashed", now - 500)
+        (mock_tmp_dir / "blobs").mkdir()
+        sessions.reconcile()
+
+        async with sessions.in_use(busy):
+            result = await sessions.sweep(now=now + 1, ttl=100, high_water=1.0)
+
+        assert sorted(result["expired"]) == ["run_crashed", "session_old"]
+        assert not old.exists() and not stale_run.exists()
+        assert busy.exists() and recent.exists()
+        assert (mock_tmp_dir / "blobs").exists()
+
+    @pytest.mark.asyncio
+    async def test_touch_renews_the_lease(
+        self, mock_tmp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """A touched workspace counts as used now; gone ones are forgotten."""
+        work = _workspace(mock_tmp_dir, "session_a", 0)
+        sessions.reconcile()
+        assert sessions.last_used(work) == 0
+        sessions.touch(work)
+        assert sessions.last_used(work) > 1_000_000
+        result = await sessions.sweep(ttl=3600, high_water=1.0)
+        assert result["expired"] == [] and work.exists()
+
+        sessions.touch(mock_tmp_dir / "session_missing")
+        assert metadata_store.get("session_missing") is None
+        (mock_tmp_dir / "session_a" / "output" / "a.txt").unlink()
+        (mock_tmp_dir / "session_a" / "output").rmdir()
+        work.rmdir()
+        sessions.reconcile()
+        assert metadata_store.least_recently_used() == []
+
+    @pytest.mark.asyncio
+    async def test_measure_records_usage(
+        self, mock_tmp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """Disk usage is computed off the event loop and stored."""
+        work = _workspace(mock_tmp_dir, "session_a", 0)
+        (work / "output" / "b.bin").write_bytes(b"x" * 100)
+        sessions.touch(work)
+        await sessions.measure(work)
+        record = metadata_store.get("session_a")
+        assert record is not None
+        assert record["disk_bytes"] == 101
+        assert record["inodes"] == 3  # output/, a.txt, b.bin
+
+    @pytest.mark.asyncio
+    async def test_high_water_evicts_least_recently_used(
+        self, mock_tmp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Above the high-water mark, the oldest idle workspaces go first."""
+        for i, name in enumerate(["session_c", "session_a", "session_b"]):
+            _workspace(mock_tmp_dir, name, 1000 + i)
+
+        def disk_used(root: Path) -> float:
+            # Pretend each workspace fills a third of the disk.
+            return len(list(root.glob("session_*"))) / 3
+
+        monkeypatch.setattr(sessions, "_disk_used", disk_used)
+        sessions.reconcile()
+        result = await sessions.sweep(now=2000, ttl=0, high_water=0.5)
+
+        assert result["evicted"] == ["session_c", "session_a"]
+        assert result["disk_used"] == pytest.approx(1 / 3, abs=1e-3)
+        assert (mock_tmp_dir / "session_b").exists()
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_hibernate_and_restore(
+        self, mock_tmp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """Idle sessions shrink to a snapshot and come back on first use."""
+        now = 100_000.0
+        idle = _workspace(mock_tmp_dir, "session_idle", now - 500)
+        recent = _workspace(mock_tmp_dir, "session_recent", now - 10)
+        run = _workspace(mock_tmp_dir, "run_x", now - 500)
+        sessions.reconcile()
+        restores = metrics.RESTORE_SECONDS.count
+
+        result = await sessions.sweep(
+            now=now, ttl=0, high_water=1.0, hibernate_after=100
+        )
+
+        assert result["hibernated"] == ["session_idle"]
+        assert not idle.exists()
+        assert recent.exists() and run.exists()
+        record = metadata_store.get("session_idle")
+        assert record is not None and record["snapshot"]
+        sessions.reconcile()  # a hibernated record is not a stale one
+        assert metadata_store.get("session_idle") is not None
+
+        info = await sessions.ensure_ready(idle)
+        assert info is not None
+        assert (idle / "output" / "a.txt").read_text() == "a"
+        assert metadata_store.get("session_idle")["snapshot"] is None  # type: ignore[index]
+        assert metrics.RESTORE_SECONDS.count == restores + 1
+        assert await sessions.ensure_ready(idle) is None
+
+    @pytest.mark.asyncio
+    async def test_active_sessions_are_not_hibernated(self, mock_tmp_dir: Path) -> None:
+        """A workspace in use is skipped."""
+        busy = _workspace(mock_tmp_dir, "session_busy", 0)
+        sessions.reconcile()
+        async with sessions.in_use(busy):
+            # in_use() renews the lease, so look far enough ahead.
+            result = await sessions.sweep(
+                now=time.time() + 10_000, ttl=0, high_water=1.0, hibernate_after=100
+            )
+        assert result["hibernated"] == []
+        assert busy.exists()
+
+    @pytest.mark.asyncio
+    async def test_discard_deletes_a_hibernated_snapshot(
+        self, mock_tmp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """Discarding a hibernated session leaves no snapshot behind."""
+        snapshot = mock_tmp_dir / "hibernated" / "session_h.tar.zst"
+        snapshot.parent.mkdir()
+        snapshot.write_bytes(b"snapshot")
+        metadata_store.touch("session_h")
+        metadata_store.set_snapshot("session_h", str(snapshot))
+
+        assert sessions.discard(mock_tmp_dir / "session_h") is None
+        assert not snapshot.exists()
+        assert metadata_store.get("session_h") is None
+
+    @pytest.mark.asyncio
+    async def test_sweep_removes_abandoned_fork_staging(
+        self, mock_tmp_dir: Path
+    ) -> None:
+        """Staging left by a crashed fork goes; a running fork's is kept."""
+        staging = mock_tmp_dir / sessions.FORK_STAGING
+        (staging / "session_gone.1f2e").mkdir(parents=True)
+        (staging / "session_live.3a4b").mkdir()
+
+        async with sessions.in_use(mock_tmp_dir / "session_live"):
+            await sessions.sweep(ttl=0, high_water=1.0, hibernate_after=0)
+
+        assert [p.name for p in staging.iterdir()] == ["session_live.3a4b"]
+
+    @pytest.mark.asyncio
+    async def test_shared_stores_are_never_swept(
+        self, mock_tmp_dir: Path, metadata_store: MetadataStore
+    ) -> None:
+        """Only session_/run_ names are recorded or deleted by the sweep."""
+        blobs = mock_tmp_dir / "blobs"
+        blobs.mkdir()
+        (mock_tmp_dir / "session_x").mkdir()
+        sessions.touch(mock_tmp_dir / "session_x" / ".." / "blobs")
+        assert metadata_store.get("blobs") is None
+
+        metadata_store.touch("blobs", 0)  # e.g. written by an older server
+        result = await sessions.sweep(now=100_000, ttl=100, high_water=1.0)
+
+        assert result["expired"] == []
+        assert blobs.is_dir()
+        assert metadata_store.get("blobs") is None
@@ -0,0 +1,68 @@
+"""Unit tests for server.sandbox.tabular."""
+
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.tabular import convert_table, detect_kind
+
+pa = pytest.importorskip("pyarrow")
+
+
+class TestConvertTable:
+    """Test conversion of text tables to columnar sidecars."""
+
+    def test_detect_kind(self) -> None:
+        """Table flavours are inferred from suffixes, ignoring query strings."""
+        assert detect_kind("data/sales.CSV") == "csv"
+        assert detect_kind("x.tsv?sig=1") == "tsv"
+        assert detect_kind("events.ndjson") == "jsonl"
+        assert detect_kind("a.parquet") is None
+
+    def test_csv_to_parquet(self, temp_dir: Path) -> None:
+        """A CSV becomes Parquet with its inferred schema and row count."""
+        import pyarrow.parquet as pq
+
+        src = temp_dir / "data.csv"
+        src.write_text("id,name,score\n1,a,0.5\n2,b,1.5\n3,c,2.5\n")
+
+        info = convert_table(src, temp_dir / "out.parquet", "csv", "parquet")
+
+        assert info == {
+            "format": "parquet",
+            "rows": 3,
+            "columns": {"id": "int64", "name": "string", "score": "double"},
+        }
+        table = pq.read_table(temp_dir / "out.parquet")
+        assert table.column("name").to_pylist() == ["a", "b", "c"]
+
+    def test_tsv_to_memory_mappable_feather(self, temp_dir: Path) -> None:
+        """Feather sidecars can be memory-mapped as Arrow IPC files."""
+        src = temp_dir / "data.tsv"
+        src.write_text("x\ty\n1\t2\n3\t4\n")
+
+        info = convert_table(src, temp_dir / "out.feather", "tsv", "feather")
+
+        assert info["rows"] == 2
+        with pa.memory_map(str(temp_dir / "out.feather")) as source:
+            table = pa.ipc.open_file(source).read_all()
+        assert table.column("y").to_pylist() == [2, 4]
+
+    def test_jsonl(self, temp_dir: Path) -> None:
+        """JSON lines are converted too."""
+        src = temp_dir / "events.jsonl"
+        src.write_text('{"a": 1, "b": "x"}\n{"a": 2, "b": "y"}\n')
+
+        info = convert_table(src, temp_dir / "out.parquet", "jsonl", "parquet")
+
+        assert info["rows"] == 2
+        assert info["columns"] == {"a": "int64", "b": "string"}
+
+    def test_failed_conversion_leaves_no_output(self, temp_dir: Path) -> None:
+        """A malformed table raises and leaves no partial sidecar behind."""
+        src = temp_dir / "bad.csv"
+        src.write_text("a,b\n1,2\n1,2,3\n")
+
+        with pytest.raises(pa.ArrowInvalid):
+            convert_table(src, temp_dir / "out.parquet", "csv", "parquet")
+        assert list(temp_dir.iterdir()) == [src]
@@ -0,0 +1,72 @@
+"""Unit tests for server.sandbox.tmpfs (RAM-backed stateless workspaces)."""
+
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from server.sandbox import quota, tmpfs
+from server.sandbox.runner import run_code
+
+
+@pytest.fixture
+def shm(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = temp_dir / "shm"
+    monkeypatch.setattr(tmpfs, "EPHEMERAL_DIR", path)
+    monkeypatch.setattr(tmpfs, "EPHEMERAL_MAX_BYTES", 1024)
+    return path
+
+
+class TestEphemeralRoot:
+    """Test where stateless workspaces are placed."""
+
+    def test_prefers_ram_while_it_has_room(
+        self, temp_dir: Path, shm: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """The RAM directory is used unless it lacks the per-run cap."""
+        disk = temp_dir / "disk"
+        assert tmpfs.ephemeral_root(disk) == shm
+        monkeypatch.setattr(tmpfs, "EPHEMERAL_MAX_BYTES", 2**62)
+        assert tmpfs.ephemeral_root(disk) == disk
+        monkeypatch.setattr(tmpfs, "EPHEMERAL_DIR", None)
+        assert tmpfs.ephemeral_root(disk) == disk
+
+    def test_ram_workspaces_have_the_tighter_quota(
+        self, temp_dir: Path, shm: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """The per-run RAM cap applies on top of the session quota."""
+        monkeypatch.setattr(quota, "EPHEMERAL_MAX_BYTES", 1024)
+        monkeypatch.setattr(quota, "QUOTA_BYTES", 4096)
+        assert quota.byte_limit(shm / "run_1" / "venv") == 1024
+        assert quota.byte_limit(temp_dir / "session_a") == 4096
+
+    def test_clear_removes_leftover_runs(self, shm: Path) -> None:
+        """Runs left by a previous process are deleted at startup."""
+        (shm / "run_old" / "output").mkdir(parents=True)
+        (shm / ".trash" / "run_x").mkdir(parents=True)
+        (shm / "other").mkdir()
+        tmpfs.clear()
+        assert [p.name for p in shm.iterdir()] == ["other"]
+
+    @pytest.mark.asyncio
+    async def test_stateless_run_lives_in_ram(
+        self,
+        mock_tmp_dir: Path,
+        shm: Path,
+        mock_subprocess_success: AsyncMock,
+        mock_virtualenv_creation: Path,
+    ) -> None:
+        """run_<id> is created under the RAM directory and removed after."""
+        with (
+            patch("server.sandbox.runner.create_virtualenv") as mock_venv,
+            patch(
+                "server.sandbox.runner.asyncio.create_subprocess_exec"
+            ) as mock_subprocess,
+        ):
+            mock_venv.return_value = mock_virtualenv_creation
+            mock_subprocess.return_value = mock_subprocess_success
+            await run_code(code="print(1)", requirements=[], files=[], run_id="r1")
+
+        assert mock_subprocess.call_args[1]["cwd"] == shm / "run_r1"
+        assert not (shm / "run_r1").exists()
+        assert not (mock_tmp_dir / "run_r1").exists()
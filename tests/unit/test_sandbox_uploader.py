@@ -0,0 +1,211 @@
+"""Unit tests for server.sandbox.uploader against an S3-like stand-in."""
+
+import asyncio
+import hashlib
+import os
+import re
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from server.sandbox.uploader import multipart_upload, plan_parts, upload_batch
+
+
+class FakeS3:
+    """Just enough of the S3 multipart API: UploadPart and CompleteMultipartUpload."""
+
+    def __init__(self) -> None:
+        self.parts: dict[int, bytes] = {}
+        self.objects: dict[str, bytes] = {}
+        self.fail_once: set[int] = set()
+        self.in_flight = self.max_in_flight = 0
+        self.chunked = False
+
+    async def upload_part(self, request: web.Request) -> web.Response:
+        number = int(request.query["partNumber"])
+        self.chunked |= "Content-Length" not in request.headers
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.read()
+            await asyncio.sleep(0.02)  # hold the slot so overlap is observable
+        finally:
+            self.in_flight -= 1
+        if number in self.fail_once:
+            self.fail_once.discard(number)
+            return web.Response(status=503)
+        self.parts[number] = body
+        return web.Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    async def complete(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        listed = re.findall(r'<PartNumber>(\d+)</PartNumber><ETag>"(\w+)"</ETag>', body)
+        if not listed:
+            return web.Response(
+                status=400, text="<Error><Code>MalformedXML</Code></Error>"
+            )
+        data = b""
+        for number, etag in listed:
+            part = self.parts[int(number)]
+            if hashlib.md5(part).hexdigest() != etag:
+                return web.Response(text="<Error><Code>InvalidPart</Code></Error>")
+            data += part
+        self.objects[request.match_info["key"]] = data
+        return web.Response(text="<CompleteMultipartUploadResult/>")
+
+
+@pytest.fixture
+async def s3(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncGenerator[tuple[FakeS3, TestServer]]:
+    monkeypatch.setattr("server.sandbox.uploader.MIN_PART_BYTES", 64 * 1024)
+    monkeypatch.setattr("server.sandbox.uploader._BACKOFF_SECONDS", 0.01)
+    fake = FakeS3()
+    app = web.Application()
+    app.router.add_put("/bucket/{key}", fake.upload_part)
+    app.router.add_post("/bucket/{key}", fake.complete)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield fake, server
+    finally:
+        await server.close()
+
+
+def _part_urls(server: TestServer, n: int) -> list[str]:
+    return [
+        str(server.make_url(f"/bucket/out.bin?partNumber={i}&uploadId=u1"))
+        for i in range(1, n + 1)
+    ]
+
+
+class TestMultipartUpload:
+    """Test parallel part uploads, retries, progress and completion."""
+
+    def test_plan_parts(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Parts are spread over the URLs but never below the minimum size."""
+        monkeypatch.setattr("server.sandbox.uploader.MIN_PART_BYTES", 100)
+        assert plan_parts(1000, 4) == 250
+        assert plan_parts(150, 4) == 100
+        with pytest.raises(ValueError, match="part URLs"):
+            plan_parts(1000, 2, part_size=100)
+
+    @pytest.mark.asyncio
+    async def test_upload_and_complete(
+        self, temp_dir: Path, s3: tuple[FakeS3, TestServer]
+    ) -> None:
+        """The object is assembled from parallel parts and completed."""
+        fake, server = s3
+        data = os.urandom(64 * 1024 * 5 + 123)
+        (temp_dir / "out.bin").write_bytes(data)
+        seen: list[tuple[int, int]] = []
+
+        async def progress(done: int, total: int) -> None:
+            seen.append((done, total))
+
+        result = await multipart_upload(
+            temp_dir / "out.bin",
+            _part_urls(server, 10),
+            str(server.make_url("/bucket/out.bin?uploadId=u1")),
+            concurrency=3,
+            progress=progress,
+        )
+
+        assert fake.objects["out.bin"] == data
+        assert result["parts"] == 6
+        assert result["status"] == 200
+        assert result["uploaded_bytes"] == len(data)
+        assert 1 < fake.max_in_flight <= 3
+        assert not fake.chunked
+        assert seen[-1] == (len(data), len(data))
+
+    @pytest.mark.asyncio
+    async def test_failed_parts_are_retried(
+        self, temp_dir: Path, s3: tuple[FakeS3, TestServer]
+    ) -> None:
+        """A transient 503 on a part is retried; progress does not double count."""
+        fake, server = s3
+        fake.fail_once = {2}
+        data = os.urandom(64 * 1024 * 3)
+        (temp_dir / "out.bin").write_bytes(data)
+        peak = 0
+
+        async def progress(done: int, total: int) -> None:
+            nonlocal peak
+            peak = max(peak, done)
+
+        result = await multipart_upload(
+            temp_dir / "out.bin", _part_urls(server, 3), progress=progress
+        )
+
+        assert result["retries"] == 1
+        assert result["status"] is None  # caller completes the upload
+        assert b"".join(fake.parts[n] for n in (1, 2, 3)) == data
+        assert peak == len(data)
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(
+        self, temp_dir: Path, s3: tuple[FakeS3, TestServer]
+    ) -> None:
+        """Persistent failures surface as an error."""
+        fake, server = s3
+        fake.fail_once = {1}
+        (temp_dir / "out.bin").write_bytes(b"x" * 10)
+
+        with pytest.raises(RuntimeError, match="after 1 attempts"):
+            await multipart_upload(
+                temp_dir / "out.bin", _part_urls(server, 1), retries=0
+            )
+
+
+class TestUploadBatch:
+    """Test concurrent single-PUT uploads of many files."""
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_each_file(self, temp_dir: Path) -> None:
+        """Files upload concurrently; a failure is reported, not raised."""
+        stored: dict[str, bytes] = {}
+        in_flight = peak = 0
+
+        async def put(request: web.Request) -> web.Response:
+            nonlocal in_flight, peak
+            name = request.match_info["name"]
+            if name == "bad.txt":
+                return web.Response(status=403)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            stored[name] = await request.read()
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_put("/store/{name:.*}", put)
+        server = TestServer(app)
+        await server.start_server()
+        names = [f"f{i}.txt" for i in range(6)] + ["bad.txt"]
+        for name in names:
+            (temp_dir / name).write_text(name * 3)
+        try:
+            results = await upload_batch(
+                temp_dir,
+                [
+                    {"relative_path": n, "url": str(server.make_url(f"/store/{n}"))}
+                    for n in names
+                ],
+                concurrency=2,
+            )
+        finally:
+            await server.close()
+
+        assert [r["relative_path"] for r in results] == names
+        assert all(r["ok"] for r in results[:-1])
+        assert stored["f3.txt"] == b"f3.txtf3.txtf3.txt"
+        assert results[0]["uploaded_bytes"] == 18
+        assert results[-1]["ok"] is False
+        assert results[-1]["status"] == 403
+        assert "403" in results[-1]["error"]
+        assert peak == 2
@@ -0,0 +1,75 @@
+"""Unit tests for server.sandbox.watcher (live artifact events)."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from server.sandbox.watcher import OutputWatcher
+
+
+async def _write_files(out: Path) -> None:
+    (out / "plots").mkdir()
+    (out / "plots" / "a.png").write_bytes(b"png")
+    (out / "old.txt").unlink()
+    await asyncio.sleep(0.2)
+
+
+class TestOutputWatcher:
+    """Test both watcher backends."""
+
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    @pytest.mark.asyncio
+    async def test_events_and_changed_paths(
+        self, temp_dir: Path, use_inotify: bool
+    ) -> None:
+        """Creations, completions and deletions are reported while running."""
+        out = temp_dir / "output"
+        out.mkdir()
+        (out / "old.txt").write_text("x")
+        events: list[tuple[str, str]] = []
+
+        async def record(event: str, rel: str) -> None:
+            events.append((event, rel))
+
+        async with OutputWatcher(
+            out, record, poll_interval=0.05, use_inotify=use_inotify
+        ) as watcher:
+            await _write_files(out)
+
+        if use_inotify:
+            assert watcher.backend == "inotify"
+        assert ("completed", "plots/a.png") in events
+        assert ("deleted", "old.txt") in events
+        assert watcher.paths() == {"plots/a.png", "old.txt"}
+
+    @pytest.mark.asyncio
+    async def test_inotify_reports_create_before_close(self, temp_dir: Path) -> None:
+        """A file still being written is announced before it is completed."""
+        out = temp_dir / "output"
+        events: list[tuple[str, str]] = []
+
+        async def record(event: str, rel: str) -> None:
+            events.append((event, rel))
+
+        async with OutputWatcher(out, record) as watcher:
+            if watcher.backend != "inotify":
+                pytest.skip("inotify unavailable")
+            with (out / "part.csv").open("w") as fh:
+                fh.write("a")
+                await asyncio.sleep(0.05)
+                assert events == [("created", "part.csv")]
+            await asyncio.sleep(0.05)
+        assert events == [("created", "part.csv"), ("completed", "part.csv")]
+
+    @pytest.mark.asyncio
+    async def test_callback_errors_are_contained(self, temp_dir: Path) -> None:
+        """A failing notification callback does not break the run."""
+
+        async def broken(event: str, rel: str) -> None:
+            raise RuntimeError("client gone")
+
+        async with OutputWatcher(temp_dir / "output", broken, 0.05) as watcher:
+            (temp_dir / "output" / "x.txt").write_text("x")
+            await asyncio.sleep(0.1)
+        assert watcher.paths() == {"x.txt"}